@@ -14,6 +14,9 @@ from .serializers import AdminPageSerializer
 class PagesAdminAPIEndpoint(PagesAPIEndpoint):
     base_serializer_class = AdminPageSerializer
 
+    # Responses depend on the user's permissions and include draft pages
+    cache_responses = False
+
     # Use unrestricted child_of/descendant_of filters
     # Add has_children filter
     filter_backends = [
@@ -2,6 +2,8 @@ import collections
 import datetime
 import json
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
@@ -210,6 +212,25 @@ class TestAdminPageListing(AdminAPITestCase, TestPageListing):
                 'title': "Blog index"
             })
 
+    def test_fields_parent_is_prefetched(self):
+        def get_query_count(limit):
+            with CaptureQueriesContext(connection) as queries:
+                self.get_response(type='demosite.BlogEntryPage', fields='_,id,parent', limit=limit)
+
+            return len(queries.captured_queries)
+
+        # Make sure the site root paths are cached
+        self.get_response(type='demosite.BlogEntryPage', fields='_,id,parent')
+
+        self.assertEqual(get_query_count(1), get_query_count(3))
+
+    def test_fields_parent_not_visible(self):
+        response = self.get_response(fields='_,id,parent', id=2)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        # The root page isn't visible through the API
+        self.assertIsNone(content['items'][0]['meta']['parent'])
+
     def test_fields_descendants(self):
         response = self.get_response(fields='descendants')
         content = json.loads(response.content.decode('UTF-8'))
@@ -0,0 +1,68 @@
+"""
+A server-side cache of API responses, used by the endpoints when
+WAGTAILAPI_CACHE_RESPONSES is set.
+
+Responses are cached under a key built from the request path, the site, the
+response format and the (sorted) query parameters, along with a "generation"
+token. Rather than finding and deleting every cached listing that an object
+appears in, publishing or unpublishing a page, or saving or deleting an image or
+document, replaces the generation token, so that no earlier response is used again.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+GENERATION_KEY = 'wagtailapi:generation'
+
+
+def is_enabled():
+    return getattr(settings, 'WAGTAILAPI_CACHE_RESPONSES', False)
+
+
+def get_cache():
+    return caches[getattr(settings, 'WAGTAILAPI_CACHE', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'WAGTAILAPI_CACHE_TIMEOUT', 300)
+
+
+def get_generation():
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+
+    if generation is None:
+        # add() rather than set(), in case another process has just created it
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+
+    return generation
+
+
+def invalidate():
+    get_cache().set(GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+def get_cache_key(request, response_format):
+    # Ignore jQuery's cache-busting parameter, as the cached responses are
+    # invalidated when the content changes
+    query_parameters = sorted(
+        (key, value)
+        for key, values in request.GET.lists() if key != '_'
+        for value in values
+    )
+
+    key = repr((
+        get_generation(),
+        request.path,
+        request.site.pk if request.site else None,
+        response_format,
+        query_parameters,
+    ))
+    return 'wagtailapi:response:' + hashlib.md5(key.encode('utf-8')).hexdigest()
+
+
+def get_etag(content):
+    return '"%s"' % hashlib.md5(content).hexdigest()
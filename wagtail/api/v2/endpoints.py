@@ -1,9 +1,12 @@
 from collections import OrderedDict
+from functools import lru_cache
 
 from django.conf.urls import url
 from django.core.exceptions import FieldDoesNotExist
-from django.http import Http404
+from django.db.models import prefetch_related_objects
+from django.http import Http404, HttpResponse, HttpResponseNotModified
 from django.urls import reverse
+from django.utils.http import parse_etags
 from modelcluster.fields import ParentalKey
 from rest_framework import status
 from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
@@ -13,13 +16,15 @@ from rest_framework.viewsets import GenericViewSet
 from wagtail.api import APIField
 from wagtail.core.models import Page
 
+from . import cache
 from .filters import (
     FieldsFilter, OrderingFilter, RestrictedChildOfFilter, RestrictedDescendantOfFilter,
     SearchFilter)
 from .pagination import WagtailPagination
 from .serializers import BaseSerializer, PageSerializer, get_serializer_class
 from .utils import (
-    BadRequestError, filter_page_type, page_models_from_string, parse_fields_parameter)
+    BadRequestError, filter_page_type, freeze_fields_config, page_models_from_string,
+    pages_for_site, parse_fields_parameter)
 
 
 class BaseAPIEndpoint(GenericViewSet):
@@ -33,6 +38,8 @@ class BaseAPIEndpoint(GenericViewSet):
     known_query_parameters = frozenset([
         'limit',
         'offset',
+        'cursor',
+        'count',
         'fields',
         'order',
         'search',
@@ -51,6 +58,18 @@ class BaseAPIEndpoint(GenericViewSet):
     detail_only_fields = []
     name = None  # Set on subclass.
 
+    # The field that listings are ordered by when paginated with a cursor. It
+    # must be unique and should be indexed
+    cursor_field = 'id'
+
+    # A mapping of page paths to the parent pages to output for them, for
+    # serializers with a "parent" field. Set by listings of pages
+    parents = None
+
+    # Whether responses are cached when WAGTAILAPI_CACHE_RESPONSES is set. Only
+    # use this for endpoints whose responses are the same for every user
+    cache_responses = True
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -60,22 +79,95 @@ class BaseAPIEndpoint(GenericViewSet):
         # summary of the used types to the response.
         self.seen_types = OrderedDict()
 
+        # The key that the response to this request will be cached under. Set
+        # by get_cached_response, before the queryset is evaluated, so that a
+        # response built from data that changed in the meantime is stored under
+        # the cache generation that it was read in
+        self.response_cache_key = None
+
     def get_queryset(self):
         return self.model.objects.all().order_by('id')
 
     def listing_view(self, request):
+        cached_response = self.get_cached_response()
+        if cached_response is not None:
+            return cached_response
+
         queryset = self.get_queryset()
         self.check_query_parameters(queryset)
         queryset = self.filter_queryset(queryset)
         queryset = self.paginate_queryset(queryset)
+        queryset = self.prefetch_related(list(queryset))
         serializer = self.get_serializer(queryset, many=True)
         return self.get_paginated_response(serializer.data)
 
     def detail_view(self, request, pk):
+        cached_response = self.get_cached_response()
+        if cached_response is not None:
+            return cached_response
+
         instance = self.get_object()
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
+    def get_response_cache_key(self):
+        """
+        Returns the key to cache the response to this request under, or None if
+        the response shouldn't be cached
+        """
+        if not (self.cache_responses and cache.is_enabled()):
+            return
+
+        if self.action not in ('listing_view', 'detail_view'):
+            return
+
+        # Don't cache the browsable API, as it shows the current user
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        if renderer is None or renderer.format != 'json':
+            return
+
+        return cache.get_cache_key(self.request, renderer.format)
+
+    def get_cached_response(self):
+        self.response_cache_key = cache_key = self.get_response_cache_key()
+        if cache_key is None:
+            return
+
+        cached = cache.get_cache().get(cache_key)
+        if cached is None:
+            return
+
+        content, content_type, etag = cached
+        response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        cache_key = self.response_cache_key
+        if cache_key is None or response.status_code != 200:
+            return response
+
+        if isinstance(response, Response):
+            # Render the response now, so the content can be cached
+            response.render()
+            response['ETag'] = cache.get_etag(response.content)
+            cache.get_cache().set(cache_key, (response.content, response['Content-Type'], response['ETag']), cache.get_timeout())
+
+        # Conditional GET
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            # If-None-Match uses the weak comparison, as proxies that compress
+            # the response may have made the ETag weak
+            etags = [etag[2:] if etag.startswith('W/') else etag for etag in parse_etags(if_none_match)]
+            if '*' in etags or response['ETag'] in etags:
+                not_modified = HttpResponseNotModified()
+                not_modified['ETag'] = response['ETag']
+                return not_modified
+
+        return response
+
     def handle_exception(self, exc):
         if isinstance(exc, Http404):
             data = {'message': str(exc)}
@@ -164,6 +256,13 @@ class BaseAPIEndpoint(GenericViewSet):
 
     @classmethod
     def _get_serializer_class(cls, router, model, fields_config, show_details=False, nested=False):
+        # Building a serializer class and its fields is slow, and an endpoint only
+        # gets a handful of different fields parameters, so reuse the classes
+        return cls._build_serializer_class(router, model, freeze_fields_config(fields_config), show_details, nested)
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _build_serializer_class(cls, router, model, fields_config, show_details, nested):
         # Get all available fields
         body_fields = cls.get_body_fields_names(model)
         meta_fields = cls.get_meta_fields_names(model)
@@ -287,16 +386,31 @@ class BaseAPIEndpoint(GenericViewSet):
 
         return self._get_serializer_class(self.request.wagtailapi_router, model, fields_config, show_details=show_details)
 
+    def prefetch_related(self, objects):
+        """
+        Fetches the related objects that the serializer outputs for all of the
+        objects on the page at once, rather than for each object in turn.
+        """
+        if objects:
+            prefetch_related_objects(objects, *self.get_serializer_class().get_prefetch_lookups())
+
+        return objects
+
     def get_serializer_context(self):
         """
         The serialization context differs between listing and detail views.
         """
-        return {
+        context = {
             'request': self.request,
             'view': self,
             'router': self.request.wagtailapi_router
         }
 
+        if self.parents is not None:
+            context['parents'] = self.parents
+
+        return context
+
     def get_renderer_context(self):
         context = super().get_renderer_context()
         context['indent'] = 4
@@ -370,6 +484,9 @@ class PagesAPIEndpoint(BaseAPIEndpoint):
     name = 'pages'
     model = Page
 
+    # Keep pages in tree order
+    cursor_field = 'path'
+
     def get_queryset(self):
         request = self.request
 
@@ -402,6 +519,27 @@ class PagesAPIEndpoint(BaseAPIEndpoint):
 
         return queryset
 
+    def prefetch_related(self, objects):
+        objects = super().prefetch_related(objects)
+
+        if objects and 'parent' in self.get_serializer_class().Meta.fields:
+            self.parents = self.get_parents(objects)
+
+        return objects
+
+    def get_parents(self, pages):
+        """
+        Returns a mapping of the parent path of each page to the parent page,
+        or None if the parent isn't visible on the current site.
+        """
+        parent_paths = set(page.path[:-page.steplen] for page in pages if page.depth > 1)
+        parents = dict.fromkeys(parent_paths)
+
+        for parent in pages_for_site(self.request.site).filter(path__in=parent_paths):
+            parents[parent.path] = parent
+
+        return parents
+
     def get_object(self):
         base = super().get_object()
         return base.specific
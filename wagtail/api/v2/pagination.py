@@ -1,10 +1,13 @@
+import base64
+import binascii
+import json
 from collections import OrderedDict
 
 from django.conf import settings
 from rest_framework.pagination import BasePagination
 from rest_framework.response import Response
 
-from .utils import BadRequestError
+from .utils import BadRequestError, parse_boolean
 
 
 class WagtailPagination(BasePagination):
@@ -28,18 +31,85 @@ class WagtailPagination(BasePagination):
         except (ValueError, AssertionError):
             raise BadRequestError("limit must be a positive integer")
 
+        try:
+            count = parse_boolean(request.GET.get('count', 'true'))
+        except ValueError:
+            raise BadRequestError("count must be 'true' or 'false'")
+
+        self.view = view
+        self.total_count = queryset.count() if count else None
+
+        if 'cursor' in request.GET:
+            if limit == 0:
+                # The next cursor would be the same as this one
+                raise BadRequestError("limit must be greater than 0 when cursor is used")
+
+            self.use_cursor = True
+            return self.paginate_queryset_by_cursor(queryset, request, limit)
+
+        self.use_cursor = False
+
         start = offset
         stop = offset + limit
 
-        self.view = view
-        self.total_count = queryset.count()
         return queryset[start:stop]
 
+    def paginate_queryset_by_cursor(self, queryset, request, limit):
+        """
+        Returns the items after the cursor, ordered by the view's cursor_field.
+
+        Rather than skipping the rows before the page with an OFFSET, which
+        the database has to find and discard, the page is fetched with a
+        filter on the (indexed) cursor field, so it takes the same time however
+        deep it is.
+        """
+        for parameter in ['offset', 'order', 'search']:
+            if parameter in request.GET:
+                raise BadRequestError("cursor cannot be used with %s" % parameter)
+
+        cursor_field = getattr(self.view, 'cursor_field', 'pk')
+        queryset = queryset.order_by(cursor_field)
+
+        cursor = request.GET['cursor']
+        if cursor:
+            queryset = queryset.filter(**{cursor_field + '__gt': self.decode_cursor(cursor)})
+
+        # Fetch one more item than needed to find out if there is another page
+        items = list(queryset[:limit + 1])
+
+        if len(items) > limit:
+            items = items[:limit]
+            self.next_cursor = self.encode_cursor(getattr(items[-1], cursor_field))
+        else:
+            self.next_cursor = None
+
+        return items
+
+    def encode_cursor(self, value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            value = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        except (UnicodeError, binascii.Error, ValueError):
+            value = None
+
+        if not isinstance(value, (int, str)) or isinstance(value, bool):
+            raise BadRequestError("cursor is not valid")
+
+        return value
+
     def get_paginated_response(self, data):
+        meta = OrderedDict()
+
+        if self.total_count is not None:
+            meta['total_count'] = self.total_count
+
+        if self.use_cursor:
+            meta['next_cursor'] = self.next_cursor
+
         data = OrderedDict([
-            ('meta', OrderedDict([
-                ('total_count', self.total_count),
-            ])),
+            ('meta', meta),
             ('items', data),
         ])
         return Response(data)
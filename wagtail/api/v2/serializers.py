@@ -1,6 +1,10 @@
+import copy
 from collections import OrderedDict
+from functools import lru_cache
 
+from django.core.exceptions import FieldDoesNotExist
 from django.urls.exceptions import NoReverseMatch
+from modelcluster.contrib.taggit import ClusterTaggableManager
 from modelcluster.models import get_all_child_relations
 from rest_framework import relations, serializers
 from rest_framework.fields import Field, SkipField
@@ -66,7 +70,9 @@ class PageHtmlUrlField(Field):
 
     def to_representation(self, page):
         try:
-            return page.full_url
+            # Pass the request, so the site root paths are looked up once for
+            # all of the pages in the response
+            return page.get_full_url(self.context.get('request'))
         except NoReverseMatch:
             return None
 
@@ -124,6 +130,13 @@ class PageParentField(relations.RelatedField):
     The representation is the same as the RelatedField class.
     """
     def get_attribute(self, instance):
+        # Listings look up the parents of all of their pages at once
+        parents = self.context.get('parents')
+        if parents is not None:
+            parent_path = instance.path[:-instance.steplen]
+            if parent_path in parents:
+                return parents[parent_path]
+
         parent = instance.get_parent()
 
         site_pages = pages_for_site(self.context['request'].site)
@@ -131,7 +144,7 @@ class PageParentField(relations.RelatedField):
             return parent
 
     def to_representation(self, value):
-        serializer_class = get_serializer_class(value.__class__, ['id', 'type', 'detail_url', 'html_url', 'title'], meta_fields=['type', 'detail_url', 'html_url'], base=PageSerializer)
+        serializer_class = get_parent_serializer_class(value.__class__)
         serializer = serializer_class(context=self.context)
         return serializer.to_representation(value)
 
@@ -239,7 +252,9 @@ class TagsField(Field):
     "tags": ["bird", "wagtail"]
     """
     def to_representation(self, value):
-        return list(value.all().order_by('name').values_list('name', flat=True))
+        # Sort the tags here rather than in the database, so that tags
+        # prefetched by the endpoint are used
+        return sorted(tag.name for tag in value.all())
 
 
 class BaseSerializer(serializers.ModelSerializer):
@@ -254,6 +269,50 @@ class BaseSerializer(serializers.ModelSerializer):
     type = TypeField(read_only=True)
     detail_url = DetailUrlField(read_only=True)
 
+    def get_fields(self):
+        # Building the fields introspects the model, which is slow. As the
+        # fields only depend on the class, build them once and give each
+        # serializer its own copy to bind
+        cls = type(self)
+        if '_fields_cache' not in cls.__dict__:
+            cls._fields_cache = super().get_fields()
+
+        return copy.deepcopy(cls._fields_cache)
+
+    @classmethod
+    def get_prefetch_lookups(cls, prefix=''):
+        """
+        Returns the prefetch_related lookups that fetch all of the related
+        objects (including those of nested serializers) that this serializer
+        class outputs.
+        """
+        model = cls.Meta.model
+        lookups = []
+
+        for field_name in cls.Meta.fields:
+            try:
+                django_field = model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                continue
+
+            if not django_field.is_relation:
+                continue
+
+            if isinstance(django_field, ClusterTaggableManager):
+                # ClusterTaggableManager reads the tags through the tagged items
+                # relation, so that is what needs to be prefetched
+                through_name = django_field.through._meta.get_field('content_object').remote_field.get_accessor_name()
+                lookups.append(prefix + through_name + '__tag')
+                continue
+
+            lookups.append(prefix + field_name)
+
+            child_serializer_class = cls.child_serializer_classes.get(field_name)
+            if child_serializer_class is not None:
+                lookups.extend(child_serializer_class.get_prefetch_lookups(prefix=prefix + field_name + '__'))
+
+        return lookups
+
     def to_representation(self, instance):
         data = OrderedDict()
         fields = [field for field in self.fields.values() if not field.write_only]
@@ -352,3 +411,8 @@ def get_serializer_class(model, field_names, meta_fields, field_serializer_overr
         attrs.update(field_serializer_overrides)
 
     return type(str(model_.__name__ + 'Serializer'), (base, ), attrs)
+
+
+@lru_cache(maxsize=None)
+def get_parent_serializer_class(model):
+    return get_serializer_class(model, ['id', 'type', 'detail_url', 'html_url', 'title'], meta_fields=['type', 'detail_url', 'html_url'], base=PageSerializer)
@@ -7,6 +7,7 @@ from wagtail.core.signals import page_published, page_unpublished
 from wagtail.documents.models import get_document_model
 from wagtail.images import get_image_model
 
+from . import cache
 from .utils import get_base_url
 
 
@@ -53,3 +54,37 @@ def unregister_signal_handlers():
     post_delete.disconnect(purge_image_from_cache, sender=Image)
     post_save.disconnect(purge_document_from_cache, sender=Document)
     post_delete.disconnect(purge_document_from_cache, sender=Document)
+
+
+def invalidate_response_cache(**kwargs):
+    cache.invalidate()
+
+
+def register_response_cache_signal_handlers():
+    Image = get_image_model()
+    Document = get_document_model()
+
+    for model in get_page_models():
+        page_published.connect(invalidate_response_cache, sender=model)
+        page_unpublished.connect(invalidate_response_cache, sender=model)
+        post_delete.connect(invalidate_response_cache, sender=model)
+
+    post_save.connect(invalidate_response_cache, sender=Image)
+    post_delete.connect(invalidate_response_cache, sender=Image)
+    post_save.connect(invalidate_response_cache, sender=Document)
+    post_delete.connect(invalidate_response_cache, sender=Document)
+
+
+def unregister_response_cache_signal_handlers():
+    Image = get_image_model()
+    Document = get_document_model()
+
+    for model in get_page_models():
+        page_published.disconnect(invalidate_response_cache, sender=model)
+        page_unpublished.disconnect(invalidate_response_cache, sender=model)
+        post_delete.disconnect(invalidate_response_cache, sender=model)
+
+    post_save.disconnect(invalidate_response_cache, sender=Image)
+    post_delete.disconnect(invalidate_response_cache, sender=Image)
+    post_save.disconnect(invalidate_response_cache, sender=Document)
+    post_delete.disconnect(invalidate_response_cache, sender=Document)
@@ -0,0 +1,148 @@
+import json
+
+import mock
+from django.core.cache import caches
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from wagtail.api.v2 import cache, signal_handlers
+from wagtail.core.models import Page
+from wagtail.images.models import Image
+
+
+@override_settings(
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'api': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'api'},
+    },
+    WAGTAILAPI_CACHE_RESPONSES=True,
+    WAGTAILAPI_CACHE='api',
+)
+class TestResponseCache(TestCase):
+    fixtures = ['demosite.json']
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        signal_handlers.register_response_cache_signal_handlers()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        signal_handlers.unregister_response_cache_signal_handlers()
+
+    def setUp(self):
+        self.addCleanup(caches['api'].clear)
+
+    def get_response(self, url_name, *args, **params):
+        return self.client.get(reverse('wagtailapi_v2:' + url_name, args=args), params)
+
+    def get_titles(self, response):
+        return [page['title'] for page in json.loads(response.content.decode('UTF-8'))['items']]
+
+    def test_listing_is_cached(self):
+        response = self.get_response('pages:listing', fields='title')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+
+        with self.assertNumQueries(0):
+            cached_response = self.get_response('pages:listing', fields='title')
+
+        self.assertEqual(cached_response.status_code, 200)
+        self.assertEqual(cached_response.content, response.content)
+        self.assertEqual(cached_response['ETag'], response['ETag'])
+        self.assertEqual(cached_response['Content-Type'], response['Content-Type'])
+
+    def test_detail_is_cached(self):
+        response = self.get_response('pages:detail', 16)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(0):
+            cached_response = self.get_response('pages:detail', 16)
+
+        self.assertEqual(cached_response.content, response.content)
+
+    def test_query_parameters_are_normalised(self):
+        self.get_response('pages:listing', fields='title', limit=5)
+
+        # The order of the parameters and jQuery's cache-busting parameter don't matter
+        with self.assertNumQueries(0):
+            self.client.get(reverse('wagtailapi_v2:pages:listing') + '?limit=5&_=123&fields=title')
+
+    def test_generation_is_read_once(self):
+        with mock.patch('wagtail.api.v2.cache.get_generation', wraps=cache.get_generation) as get_generation:
+            self.get_response('pages:listing', fields='title')
+
+        # The response is stored under the generation that was current before it was built
+        self.assertEqual(get_generation.call_count, 1)
+
+    def test_different_parameters_arent_cached_together(self):
+        response = self.get_response('pages:listing', limit=5)
+        other_response = self.get_response('pages:listing', limit=2)
+
+        self.assertEqual(len(self.get_titles(response)), 5)
+        self.assertEqual(len(self.get_titles(other_response)), 2)
+
+    def test_errors_arent_cached(self):
+        self.get_response('pages:detail', 100000)
+
+        response = self.get_response('pages:detail', 100000)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+    def test_not_modified(self):
+        response = self.get_response('pages:detail', 16)
+
+        not_modified = self.client.get(reverse('wagtailapi_v2:pages:detail', args=(16, )), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(not_modified.content, b'')
+
+        # Weak ETags match too
+        not_modified = self.client.get(reverse('wagtailapi_v2:pages:detail', args=(16, )), HTTP_IF_NONE_MATCH='W/' + response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+        modified = self.client.get(reverse('wagtailapi_v2:pages:detail', args=(16, )), HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(modified.status_code, 200)
+
+    def test_publish_invalidates_cache(self):
+        response = self.get_response('pages:detail', 16)
+
+        page = Page.objects.get(id=16).specific
+        page.title = "New title"
+        page.save_revision().publish()
+
+        new_response = self.get_response('pages:detail', 16)
+        self.assertEqual(json.loads(new_response.content.decode('UTF-8'))['title'], "New title")
+        self.assertNotEqual(new_response['ETag'], response['ETag'])
+
+    def test_unpublish_invalidates_cache(self):
+        self.assertIn("Blog post", self.get_titles(self.get_response('pages:listing', fields='title', limit=20)))
+
+        Page.objects.get(id=16).unpublish()
+
+        self.assertNotIn("Blog post", self.get_titles(self.get_response('pages:listing', fields='title', limit=20)))
+
+    def test_image_save_invalidates_cache(self):
+        self.get_response('images:detail', 5)
+
+        image = Image.objects.get(id=5)
+        image.title = "New title"
+        image.save()
+
+        response = self.get_response('images:detail', 5)
+        self.assertEqual(json.loads(response.content.decode('UTF-8'))['title'], "New title")
+
+    def test_browsable_api_isnt_cached(self):
+        self.get_response('pages:listing', format='api')
+
+        response = self.get_response('pages:listing', format='api')
+        self.assertNotIn('ETag', response)
+
+    @override_settings(WAGTAILAPI_CACHE_RESPONSES=False)
+    def test_disabled(self):
+        self.get_response('pages:listing')
+
+        response = self.get_response('pages:listing')
+        self.assertNotIn('ETag', response)
@@ -1,8 +1,9 @@
 import json
 
 import mock
+from django.db import connection
 from django.test import TestCase
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
 
 from wagtail.api.v2 import signal_handlers
@@ -156,6 +157,18 @@ class TestImageListing(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(content, {'message': "unknown fields: 123, abc"})
 
+    def test_tags_are_prefetched(self):
+        def get_query_count(limit):
+            with CaptureQueriesContext(connection) as queries:
+                self.get_response(fields='_,id,tags', limit=limit)
+
+            return len(queries.captured_queries)
+
+        # Make sure the site root paths are cached
+        self.get_response(fields='_,id,tags')
+
+        self.assertEqual(get_query_count(1), get_query_count(10))
+
 
     # FILTERING
 
@@ -2,8 +2,9 @@ import collections
 import json
 
 import mock
+from django.db import connection
 from django.test import TestCase
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
 
 from wagtail.api.v2 import signal_handlers
@@ -685,6 +686,102 @@ class TestPageListing(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(content, {'message': "offset must be a positive integer"})
 
+    # CURSOR
+
+    def test_cursor(self):
+        response = self.get_response(cursor='', limit=5)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(content['meta']['total_count'], get_total_page_count())
+        self.assertEqual(len(content['items']), 5)
+        self.assertTrue(content['meta']['next_cursor'])
+
+    def test_cursor_pages_follow_on(self):
+        content = json.loads(self.get_response(limit=20).content.decode('UTF-8'))
+        all_page_ids = self.get_page_id_list(content)
+
+        page_ids = []
+        cursor = ''
+        while cursor is not None:
+            response = self.get_response(cursor=cursor, limit=5)
+            content = json.loads(response.content.decode('UTF-8'))
+            page_ids.extend(self.get_page_id_list(content))
+            cursor = content['meta']['next_cursor']
+
+        # Cursor pagination keeps the pages in tree order
+        self.assertEqual(page_ids, all_page_ids)
+
+    def test_cursor_last_page(self):
+        response = self.get_response(cursor='', limit=20)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(len(content['items']), get_total_page_count())
+        self.assertIsNone(content['meta']['next_cursor'])
+
+    def test_cursor_with_filter(self):
+        response = self.get_response(cursor='', child_of=5, limit=2)
+        content = json.loads(response.content.decode('UTF-8'))
+        page_ids = self.get_page_id_list(content)
+
+        response = self.get_response(cursor=content['meta']['next_cursor'], child_of=5, limit=2)
+        content = json.loads(response.content.decode('UTF-8'))
+        page_ids.extend(self.get_page_id_list(content))
+
+        self.assertEqual(page_ids, [16, 18, 19])
+        self.assertIsNone(content['meta']['next_cursor'])
+
+    def test_count_false_skips_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.get_response(cursor='', limit=5, count='false')
+
+        page_queries = [query['sql'] for query in queries.captured_queries if 'FROM "wagtailcore_page" WHERE' in query['sql']]
+        self.assertEqual(len(page_queries), 1)
+        self.assertNotIn('COUNT(', page_queries[0])
+
+    def test_cursor_invalid_gives_error(self):
+        response = self.get_response(cursor='abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cursor is not valid"})
+
+    def test_cursor_with_zero_limit_gives_error(self):
+        response = self.get_response(cursor='', limit=0)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "limit must be greater than 0 when cursor is used"})
+
+    def test_cursor_with_offset_gives_error(self):
+        response = self.get_response(cursor='', offset=5)
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cursor cannot be used with offset"})
+
+    def test_cursor_with_ordering_gives_error(self):
+        response = self.get_response(cursor='', order='title')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "cursor cannot be used with order"})
+
+    # COUNT
+
+    def test_count_false_omits_total_count(self):
+        response = self.get_response(count='false')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertNotIn('total_count', content['meta'])
+        self.assertEqual(len(content['items']), get_total_page_count())
+
+    def test_count_invalid_gives_error(self):
+        response = self.get_response(count='abc')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(content, {'message': "count must be 'true' or 'false'"})
+
 
     # SEARCH
 
@@ -777,6 +874,34 @@ class TestPageListing(TestCase):
         self.assertEqual(response['Content-type'], 'application/json')
         self.assertEqual(content['meta']['total_count'], 0)
 
+    # QUERY COUNTS
+
+    def get_query_count(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_response(**params)
+
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries)
+
+    def test_related_objects_are_prefetched(self):
+        params = {
+            'type': 'demosite.BlogEntryPage',
+            'fields': '_,id,tags,feed_image,carousel_items(image),related_links(_,title)',
+        }
+
+        # Make sure the site root paths are cached
+        self.get_response(**params)
+
+        # The number of queries mustn't depend on the number of pages
+        self.assertEqual(self.get_query_count(limit=1, **params), self.get_query_count(limit=3, **params))
+
+    def test_tags_are_sorted(self):
+        response = self.get_response(type='demosite.BlogEntryPage', fields='tags')
+        content = json.loads(response.content.decode('UTF-8'))
+
+        for page in content['items']:
+            self.assertEqual(page['tags'], sorted(page['tags']))
+
     # REGRESSION TESTS
 
     def test_issue_3967(self):
@@ -1,6 +1,11 @@
 from unittest import TestCase
 
-from ..utils import FieldsParameterParseError, parse_boolean, parse_fields_parameter
+from wagtail.tests.demosite.models import BlogEntryPage
+from wagtail.tests.urls import api_router
+
+from ..endpoints import PagesAPIEndpoint
+from ..utils import (
+    FieldsParameterParseError, freeze_fields_config, parse_boolean, parse_fields_parameter)
 
 
 class TestParseFieldsParameter(TestCase):
@@ -235,6 +240,55 @@ class TestParseFieldsParameter(TestCase):
         self.assertEqual(str(e.exception), "'_' must be in the first position")
 
 
+class TestFreezeFieldsConfig(TestCase):
+    def test_freeze(self):
+        frozen = freeze_fields_config(parse_fields_parameter('*,test(foo,bar(baz)),-other'))
+
+        self.assertEqual(frozen, (
+            ('*', False, None),
+            ('test', False, (
+                ('foo', False, None),
+                ('bar', False, (
+                    ('baz', False, None),
+                )),
+            )),
+            ('other', True, None),
+        ))
+
+        # Must be hashable
+        hash(frozen)
+
+
+class TestSerializerClassCache(TestCase):
+    def get_serializer_class(self, fields, show_details=False):
+        return PagesAPIEndpoint._get_serializer_class(api_router, BlogEntryPage, parse_fields_parameter(fields), show_details=show_details)
+
+    def test_serializer_class_is_reused(self):
+        serializer_class = self.get_serializer_class('title,carousel_items(image)')
+
+        self.assertIs(self.get_serializer_class('title,carousel_items(image)'), serializer_class)
+        self.assertIs(
+            serializer_class.child_serializer_classes['carousel_items'],
+            self.get_serializer_class('carousel_items(image)').child_serializer_classes['carousel_items']
+        )
+
+    def test_different_fields_get_different_classes(self):
+        serializer_class = self.get_serializer_class('title')
+
+        self.assertIsNot(self.get_serializer_class('date'), serializer_class)
+        self.assertIsNot(self.get_serializer_class('title', show_details=True), serializer_class)
+
+    def test_serializers_get_their_own_fields(self):
+        serializer_class = self.get_serializer_class('title')
+        serializer = serializer_class(context={})
+        other_serializer = serializer_class(context={})
+
+        self.assertEqual(list(serializer.fields.keys()), list(other_serializer.fields.keys()))
+        self.assertIsNot(serializer.fields['title'], other_serializer.fields['title'])
+        self.assertIs(serializer.fields['title'].parent, serializer)
+        self.assertIs(other_serializer.fields['title'].parent, other_serializer)
+
+
 class TestParseBoolean(TestCase):
     # GOOD STUFF
 
@@ -217,6 +217,20 @@ def parse_fields_parameter(fields_str):
     return fields
 
 
+def freeze_fields_config(fields_config):
+    """
+    Converts the lists in the output of parse_fields_parameter into tuples, so it
+    can be used as a dictionary key.
+
+    >>> freeze_fields_config([('foo', False, [('bar', False, None)])])
+    (('foo', False, (('bar', False, None),)),)
+    """
+    return tuple(
+        (field_name, negated, freeze_fields_config(sub_fields) if sub_fields is not None else None)
+        for field_name, negated, sub_fields in fields_config
+    )
+
+
 def parse_boolean(value):
     """
     Parses strings into booleans using the following mapping (case-sensitive):
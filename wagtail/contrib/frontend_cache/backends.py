@@ -1,4 +1,6 @@
 import logging
+import socket
+import time
 import uuid
 from collections import defaultdict
 from urllib.error import HTTPError, URLError
@@ -34,6 +36,13 @@ class HTTPBackend(BaseBackend):
         self.cache_scheme = location_url_parsed.scheme
         self.cache_netloc = location_url_parsed.netloc
 
+        # Seconds to wait for the cache to respond to each request
+        self.timeout = params.pop('TIMEOUT', None)
+
+        # Number of times to retry requests that time out, can't connect or get
+        # a server error
+        self.retries = params.pop('RETRIES', 0)
+
     def purge(self, url):
         url_parsed = urlparse(url)
         host = url_parsed.hostname
@@ -57,12 +66,30 @@ class HTTPBackend(BaseBackend):
             }
         )
 
-        try:
-            urlopen(request)
-        except HTTPError as e:
-            logger.error("Couldn't purge '%s' from HTTP cache. HTTPError: %d %s", url, e.code, e.reason)
-        except URLError as e:
-            logger.error("Couldn't purge '%s' from HTTP cache. URLError: %s", url, e.reason)
+        # Use the default socket timeout if no timeout is set
+        urlopen_kwargs = {'timeout': self.timeout} if self.timeout is not None else {}
+
+        for attempt in range(self.retries + 1):
+            try:
+                urlopen(request, **urlopen_kwargs)
+                return
+            except HTTPError as e:
+                error = "HTTPError: %d %s" % (e.code, e.reason)
+                can_retry = e.code >= 500
+            except URLError as e:
+                error = "URLError: %s" % e.reason
+                can_retry = True
+            except socket.timeout:
+                error = "Timed out"
+                can_retry = True
+
+            if not can_retry or attempt == self.retries:
+                break
+
+            logger.warning("Retrying purge of '%s' from HTTP cache. %s", url, error)
+            time.sleep(min(2 ** attempt, 10))
+
+        logger.error("Couldn't purge '%s' from HTTP cache. %s", url, error)
 
 
 class CloudflareBackend(BaseBackend):
@@ -0,0 +1,155 @@
+"""
+Background purging of frontend caches.
+
+If WAGTAILFRONTENDCACHE_DISPATCHER is set, purge_urls_from_cache (and so the
+other purge functions, and the signal handlers that purge pages when they are
+published or unpublished) doesn't wait for the caches to respond. Once the
+current transaction has been committed, the URLs are added to a queue, which
+is sent to a pool of MAX_WORKERS threads WAIT seconds after the first URL was
+added. For example:
+
+    WAGTAILFRONTENDCACHE_DISPATCHER = {
+        'WAIT': 1,
+        'MAX_WORKERS': 4,
+    }
+
+A URL that is added more than once while it is queued (for example, when a page
+is published several times in quick succession) is only purged once. Backends
+that can't purge URLs in batches (such as HTTPBackend) are sent each URL as a
+separate task, so that the URLs are purged concurrently. HTTPBackend's TIMEOUT and
+RETRIES parameters stop an unresponsive cache from holding up the workers.
+
+Each process has its own queue, and URLs that haven't been sent yet are lost if
+the process is killed.
+"""
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+
+from .backends import BaseBackend
+
+logger = logging.getLogger('wagtail.frontendcache')
+
+
+class PurgeDispatcher:
+    def __init__(self, params):
+        self.wait = params.get('WAIT', 1)
+        self.executor = ThreadPoolExecutor(max_workers=params.get('MAX_WORKERS', 4))
+
+        self.lock = threading.Lock()
+        self.timer = None
+
+        # {backend_name: (backend, OrderedDict of URLs)}
+        self.queue = OrderedDict()
+
+    def enqueue(self, backends, urls):
+        """
+        Queues the URLs to be purged from each of the given backends ({name: backend})
+        """
+        # Don't let the caches fetch the pages again until the changes are visible
+        urls = list(urls)
+        transaction.on_commit(lambda: self.add(backends, urls))
+
+    def add(self, backends, urls):
+        with self.lock:
+            for backend_name, backend in backends.items():
+                queued_urls = self.queue.setdefault(backend_name, (backend, OrderedDict()))[1]
+                queued_urls.update(OrderedDict.fromkeys(urls))
+
+            if self.timer is None:
+                self.timer = threading.Timer(self.wait, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        """
+        Sends the queued URLs to the worker threads. Returns a list of futures,
+        one for each task.
+        """
+        with self.lock:
+            queue = self.queue
+            self.queue = OrderedDict()
+
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+        futures = []
+
+        for backend_name, (backend, urls) in queue.items():
+            urls = list(urls)
+
+            if type(backend).purge_batch is BaseBackend.purge_batch:
+                # The backend sends a request for each URL anyway, so send them concurrently
+                batches = [[url] for url in urls]
+            else:
+                batches = [urls]
+
+            for batch in batches:
+                futures.append(self.executor.submit(self.purge, backend_name, backend, batch))
+
+        return futures
+
+    def purge(self, backend_name, backend, urls):
+        for url in urls:
+            logger.info("[%s] Purging URL: %s", backend_name, url)
+
+        try:
+            backend.purge_batch(urls)
+        except Exception:  # noqa
+            logger.exception("[%s] Exception raised while purging URLs: %s", backend_name, ', '.join(urls))
+
+    def shutdown(self):
+        """
+        Sends the queued URLs and waits for all of the tasks to finish
+        """
+        self.flush()
+        self.executor.shutdown(wait=True)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+@receiver(setting_changed)
+def reset_dispatcher(setting, **kwargs):
+    global _dispatcher
+
+    if setting == 'WAGTAILFRONTENDCACHE_DISPATCHER':
+        with _dispatcher_lock:
+            if _dispatcher is not None:
+                _dispatcher.shutdown()
+
+            _dispatcher = None
+
+
+def get_dispatcher():
+    """
+    Return the purge dispatcher, or None if URLs should be purged as they're requested
+    """
+    global _dispatcher
+
+    dispatcher_settings = getattr(settings, 'WAGTAILFRONTENDCACHE_DISPATCHER', None)
+    if dispatcher_settings is None:
+        return None
+
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = PurgeDispatcher(dispatcher_settings)
+
+    return _dispatcher
+
+
+def shutdown():
+    if _dispatcher is not None:
+        _dispatcher.shutdown()
+
+
+atexit.register(shutdown)
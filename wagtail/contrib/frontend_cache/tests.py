@@ -1,3 +1,7 @@
+import socket
+from concurrent.futures import wait
+from urllib.error import HTTPError, URLError
+
 import mock
 from django.core.exceptions import ImproperlyConfigured
 from django.test import TestCase
@@ -5,6 +9,7 @@ from django.test.utils import override_settings
 
 from wagtail.contrib.frontend_cache.backends import (
     BaseBackend, CloudflareBackend, CloudfrontBackend, HTTPBackend)
+from wagtail.contrib.frontend_cache.dispatcher import PurgeDispatcher, get_dispatcher
 from wagtail.contrib.frontend_cache.utils import get_backends
 from wagtail.tests.testapp.models import EventIndex
 from wagtail.core.models import Page
@@ -127,6 +132,78 @@ class TestBackendConfiguration(TestCase):
         self.assertEqual(backends['default'].cache_scheme, 'http')
         self.assertEqual(backends['default'].cache_netloc, 'localhost:8000')
 
+    @override_settings(WAGTAILFRONTENDCACHE={
+        'varnish': {
+            'BACKEND': 'wagtail.contrib.frontend_cache.backends.HTTPBackend',
+            'LOCATION': 'http://localhost:8000',
+        },
+    })
+    def test_backends_are_reused(self):
+        backend = get_backends()['varnish']
+
+        self.assertIs(get_backends()['varnish'], backend)
+        self.assertIs(get_backends(backends=['varnish'])['varnish'], backend)
+
+        with self.settings(WAGTAILFRONTENDCACHE={
+            'varnish': {
+                'BACKEND': 'wagtail.contrib.frontend_cache.backends.HTTPBackend',
+                'LOCATION': 'http://localhost:9000',
+            },
+        }):
+            self.assertEqual(get_backends()['varnish'].cache_netloc, 'localhost:9000')
+
+
+@mock.patch('wagtail.contrib.frontend_cache.backends.time.sleep')
+@mock.patch('wagtail.contrib.frontend_cache.backends.urlopen')
+class TestHTTPBackend(TestCase):
+    def get_backend(self, **params):
+        params['LOCATION'] = 'http://localhost:8000'
+        return HTTPBackend(params)
+
+    def test_purge(self, urlopen, sleep):
+        self.get_backend().purge('http://www.example.com/foo/')
+
+        request = urlopen.call_args[0][0]
+        self.assertEqual(request.get_method(), 'PURGE')
+        self.assertEqual(request.full_url, 'http://localhost:8000/foo/')
+        self.assertEqual(request.get_header('Host'), 'www.example.com')
+        self.assertEqual(urlopen.call_args[1], {})
+
+    def test_timeout(self, urlopen, sleep):
+        self.get_backend(TIMEOUT=5).purge('http://www.example.com/foo/')
+
+        self.assertEqual(urlopen.call_args[1], {'timeout': 5})
+
+    def test_retries(self, urlopen, sleep):
+        urlopen.side_effect = [URLError('Connection refused'), socket.timeout(), None]
+
+        with self.assertLogs('wagtail.frontendcache', level='WARNING') as logs:
+            self.get_backend(RETRIES=2).purge('http://www.example.com/foo/')
+
+        self.assertEqual(urlopen.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(len(logs.records), 2)
+        self.assertTrue(all(record.levelname == 'WARNING' for record in logs.records))
+
+    def test_gives_up_after_retries(self, urlopen, sleep):
+        urlopen.side_effect = URLError('Connection refused')
+
+        with self.assertLogs('wagtail.frontendcache', level='ERROR') as logs:
+            self.get_backend(RETRIES=2).purge('http://www.example.com/foo/')
+
+        self.assertEqual(urlopen.call_count, 3)
+        self.assertEqual(logs.output, [
+            "ERROR:wagtail.frontendcache:Couldn't purge 'http://www.example.com/foo/' from HTTP cache. URLError: Connection refused",
+        ])
+
+    def test_doesnt_retry_client_errors(self, urlopen, sleep):
+        urlopen.side_effect = HTTPError('http://localhost:8000/foo/', 405, 'Method Not Allowed', {}, None)
+
+        with self.assertLogs('wagtail.frontendcache', level='ERROR'):
+            self.get_backend(RETRIES=2).purge('http://www.example.com/foo/')
+
+        self.assertEqual(urlopen.call_count, 1)
+
 
 PURGED_URLS = []
 
@@ -210,6 +287,119 @@ class TestCachePurgingSignals(TestCase):
         self.assertEqual(PURGED_URLS, [])
 
 
+class MockBatchBackend(BaseBackend):
+    def __init__(self, config):
+        pass
+
+    def purge_batch(self, urls):
+        PURGED_URLS.append(list(urls))
+
+
+class BrokenBackend(BaseBackend):
+    def __init__(self, config):
+        pass
+
+    def purge(self, url):
+        raise Exception("The cache is broken")
+
+
+class TestPurgeDispatcher(TestCase):
+    def setUp(self):
+        PURGED_URLS[:] = []
+        self.dispatcher = PurgeDispatcher({'WAIT': 60})
+        self.addCleanup(self.dispatcher.shutdown)
+
+    def flush(self):
+        wait(self.dispatcher.flush())
+
+    def test_coalesces_urls(self):
+        backends = {'varnish': MockBackend({})}
+        self.dispatcher.add(backends, ['http://localhost/foo', 'http://localhost/bar'])
+        self.dispatcher.add(backends, ['http://localhost/foo'])
+
+        futures = self.dispatcher.flush()
+        wait(futures)
+
+        # Each URL is purged concurrently, and only once
+        self.assertEqual(len(futures), 2)
+        self.assertEqual(sorted(PURGED_URLS), ['http://localhost/bar', 'http://localhost/foo'])
+
+        # The queue is empty now
+        self.flush()
+        self.assertEqual(len(PURGED_URLS), 2)
+
+    def test_batch_backend(self):
+        self.dispatcher.add({'cloudflare': MockBatchBackend({})}, ['http://localhost/foo', 'http://localhost/bar'])
+        self.dispatcher.add({'cloudflare': MockBatchBackend({})}, ['http://localhost/foo', 'http://localhost/baz'])
+        self.flush()
+
+        self.assertEqual(PURGED_URLS, [['http://localhost/foo', 'http://localhost/bar', 'http://localhost/baz']])
+
+    def test_flushes_after_wait(self):
+        dispatcher = PurgeDispatcher({'WAIT': 0.01})
+        dispatcher.add({'varnish': MockBackend({})}, ['http://localhost/foo'])
+
+        # Wait for the timer to flush the queue and the task to finish
+        dispatcher.timer.join()
+        dispatcher.shutdown()
+
+        self.assertEqual(PURGED_URLS, ['http://localhost/foo'])
+
+    def test_exceptions_are_logged(self):
+        self.dispatcher.add({'broken': BrokenBackend({}), 'varnish': MockBackend({})}, ['http://localhost/foo'])
+
+        with self.assertLogs('wagtail.frontendcache', level='ERROR') as logs:
+            self.flush()
+
+        self.assertIn("[broken] Exception raised while purging URLs: http://localhost/foo", logs.output[0])
+        self.assertEqual(PURGED_URLS, ['http://localhost/foo'])
+
+
+@override_settings(
+    WAGTAILFRONTENDCACHE={
+        'varnish': {
+            'BACKEND': 'wagtail.contrib.frontend_cache.tests.MockBackend',
+        },
+    },
+    WAGTAILFRONTENDCACHE_DISPATCHER={
+        'WAIT': 60,
+    },
+)
+class TestCachePurgingWithDispatcher(TestCase):
+
+    fixtures = ['test.json']
+
+    def setUp(self):
+        PURGED_URLS[:] = []
+
+        # The URLs are queued once the transaction has been committed, which never
+        # happens in a TestCase
+        patcher = mock.patch('wagtail.contrib.frontend_cache.dispatcher.transaction.on_commit', side_effect=lambda func: func())
+        self.on_commit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def flush(self):
+        wait(get_dispatcher().flush())
+
+    def test_purge_url_from_cache(self):
+        purge_url_from_cache('http://localhost/foo')
+
+        # Not purged until the dispatcher is flushed
+        self.assertTrue(self.on_commit.called)
+        self.assertEqual(PURGED_URLS, [])
+
+        self.flush()
+        self.assertEqual(PURGED_URLS, ['http://localhost/foo'])
+
+    def test_purge_on_publish(self):
+        page = EventIndex.objects.get(url_path='/home/events/')
+        page.save_revision().publish()
+        page.save_revision().publish()
+
+        self.flush()
+        self.assertEqual(sorted(PURGED_URLS), ['http://localhost/events/', 'http://localhost/events/past/'])
+
+
 class TestPurgeBatchClass(TestCase):
     # Tests the .add_*() methods on PurgeBatch. The .purge() method is tested
     # by TestCachePurgingFunctions.test_purge_batch above
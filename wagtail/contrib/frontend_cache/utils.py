@@ -1,9 +1,14 @@
 import logging
+import threading
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.module_loading import import_string
 
+from .dispatcher import get_dispatcher
+
 logger = logging.getLogger('wagtail.frontendcache')
 
 
@@ -11,10 +16,40 @@ class InvalidFrontendCacheBackendError(ImproperlyConfigured):
     pass
 
 
+# Backends that have been created from the WAGTAILFRONTENDCACHE setting, so that
+# they aren't imported and created again for every purge. {name: backend}
+_backends = None
+_backends_lock = threading.Lock()
+
+
+@receiver(setting_changed)
+def reset_backends(setting, **kwargs):
+    global _backends
+
+    if setting in ['WAGTAILFRONTENDCACHE', 'WAGTAILFRONTENDCACHE_LOCATION']:
+        with _backends_lock:
+            _backends = None
+
+
 def get_backends(backend_settings=None, backends=None):
+    global _backends
+
+    if backend_settings is not None:
+        return _create_backends(backend_settings, backends)
+
+    with _backends_lock:
+        if _backends is None:
+            _backends = _create_backends(get_backend_settings())
+
+    return {
+        backend_name: backend for backend_name, backend in _backends.items()
+        if backends is None or backend_name in backends
+    }
+
+
+def get_backend_settings():
     # Get backend settings from WAGTAILFRONTENDCACHE setting
-    if backend_settings is None:
-        backend_settings = getattr(settings, 'WAGTAILFRONTENDCACHE', None)
+    backend_settings = getattr(settings, 'WAGTAILFRONTENDCACHE', None)
 
     # Fallback to using WAGTAILFRONTENDCACHE_LOCATION setting (backwards compatibility)
     if backend_settings is None:
@@ -28,10 +63,11 @@ def get_backends(backend_settings=None, backends=None):
                 },
             }
 
-    # No settings found, return empty list
-    if backend_settings is None:
-        return {}
+    # No settings found
+    return backend_settings or {}
+
 
+def _create_backends(backend_settings, backends=None):
     backend_objects = {}
 
     for backend_name, _backend_config in backend_settings.items():
@@ -54,13 +90,21 @@ def get_backends(backend_settings=None, backends=None):
 
 
 def purge_url_from_cache(url, backend_settings=None, backends=None):
-    for backend_name, backend in get_backends(backend_settings, backends).items():
-        logger.info("[%s] Purging URL: %s", backend_name, url)
-        backend.purge(url)
+    purge_urls_from_cache([url], backend_settings, backends)
 
 
 def purge_urls_from_cache(urls, backend_settings=None, backends=None):
-    for backend_name, backend in get_backends(backend_settings, backends).items():
+    backend_objects = get_backends(backend_settings, backends)
+    if not backend_objects:
+        return
+
+    # Purge the URLs in the background if WAGTAILFRONTENDCACHE_DISPATCHER is set
+    dispatcher = get_dispatcher()
+    if dispatcher is not None:
+        dispatcher.enqueue(backend_objects, urls)
+        return
+
+    for backend_name, backend in backend_objects.items():
         for url in urls:
             logger.info("[%s] Purging URL: %s", backend_name, url)
 
@@ -1,9 +1,13 @@
+import csv
+import hashlib
+from io import StringIO
 from warnings import warn
 
 from django.contrib.postgres.search import SearchQuery as PostgresSearchQuery
 from django.contrib.postgres.search import SearchRank, SearchVector
+from django.core.exceptions import ImproperlyConfigured
 from django.db import DEFAULT_DB_ALIAS, NotSupportedError, connections, transaction
-from django.db.models import F, Manager, TextField, Value, Q
+from django.db.models import F, Func, Manager, TextField, Value, Q
 from django.db.models.constants import LOOKUP_SEP
 from django.db.models.functions import Cast
 from django.utils.encoding import force_text
@@ -16,13 +20,42 @@ from wagtail.search.utils import ADD, AND, OR
 
 from .models import IndexEntry
 from .utils import (
-    WEIGHTS_VALUES, get_ancestors_content_types_pks, get_content_type_pk,
+    WEIGHTS, WEIGHTS_VALUES, get_ancestors_content_types_pks, get_content_type_pk,
     get_descendants_content_types_pks, get_postgresql_connections, get_weight, unidecode)
 
 
 # TODO: Add autocomplete.
 
 
+RANK_FUNCTIONS = ('ts_rank', 'ts_rank_cd')
+
+
+class Rank(SearchRank):
+    """
+    Like Django's ``SearchRank``, but can use ``ts_rank_cd`` (cover density ranking)
+    instead of ``ts_rank``, and pass a normalization option to either of them.
+    """
+    def __init__(self, vector, query, function='ts_rank', normalization=0, **extra):
+        super().__init__(vector, query, function=function, **extra)
+        self.normalization = int(normalization)
+
+    def as_sql(self, compiler, connection, function=None, template=None):
+        extra_params = []
+        extra_context = {}
+        arguments = '%(expressions)s'
+        if self.weights:
+            weight_sql, extra_params = compiler.compile(self.weights)
+            extra_context['weights'] = weight_sql
+            arguments = '%(weights)s, ' + arguments
+        if self.normalization:
+            arguments += ', %d' % self.normalization
+        if template is None:
+            template = '%(function)s(' + arguments + ')'
+        sql, params = Func.as_sql(self, compiler, connection, function=function,
+                                  template=template, **extra_context)
+        return sql, extra_params + params
+
+
 class Index:
     def __init__(self, backend, model, db_alias=None):
         self.backend = backend
@@ -37,9 +70,57 @@ class Index:
         self.index_entries = IndexEntry._default_manager.using(self.db_alias)
         self.name = model._meta.label
         self.search_fields = self.model.get_search_fields()
+        self.bulk_loading = False
+
+    def get_partial_index_prefix(self, model):
+        return '%s_ct_%s_' % (IndexEntry._meta.db_table, get_content_type_pk(model))
+
+    def get_partial_index_name(self, model, content_type_pks):
+        # The name changes with the content types, so that adding a subclass
+        # of the model creates a new index rather than keeping an outdated one.
+        digest = hashlib.md5(','.join(map(str, sorted(content_type_pks))).encode()).hexdigest()
+        return self.get_partial_index_prefix(model) + digest[:10]
+
+    def add_partial_index(self, model):
+        """
+        Creates a GIN index on the index entries of this model and its subclasses,
+        so that searches on this model don't scan the entries of other models.
+
+        The index is built with ``CREATE INDEX CONCURRENTLY`` so that writes
+        to the index entries aren't blocked while it is built. This can't run
+        in a transaction, so inside one it is deferred until it is committed.
+        """
+        connection = connections[self.db_alias]
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self.add_partial_index(model),
+                                  using=self.db_alias)
+            return
+
+        content_type_pks = sorted(get_descendants_content_types_pks(model))
+        index_name = self.get_partial_index_name(model, content_type_pks)
+        prefix = self.get_partial_index_prefix(model)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT c.relname, i.indisvalid FROM pg_index i '
+                'JOIN pg_class c ON c.oid = i.indexrelid '
+                'WHERE c.relname LIKE %s',
+                [prefix.replace('_', r'\_') + '%'])
+            existing = dict(cursor.fetchall())
+            for name, valid in existing.items():
+                # Drops the indexes built for a previous set of content types,
+                # and any left invalid by a failed concurrent build.
+                if name != index_name or not valid:
+                    cursor.execute('DROP INDEX CONCURRENTLY IF EXISTS %s' % name)
+            if not existing.get(index_name):
+                cursor.execute(
+                    'CREATE INDEX CONCURRENTLY %s ON %s USING GIN(body_search) '
+                    'WHERE content_type_id IN (%s)'
+                    % (index_name, IndexEntry._meta.db_table,
+                       ', '.join(map(str, content_type_pks))))
 
     def add_model(self, model):
-        pass
+        if model._meta.label in self.backend.get_partial_index_models():
+            self.add_partial_index(model)
 
     def refresh(self):
         pass
@@ -94,17 +175,17 @@ class Index:
     def add_item(self, obj):
         self.add_items(self.model, [obj])
 
-    def add_items_upsert(self, connection, content_type_pk, objs, config):
+    def add_items_upsert(self, connection, content_type_pk, entries, config):
         vectors_sql = []
         data_params = []
         sql_template = ('to_tsvector(%s)' if config is None
                         else "to_tsvector('%s', %%s)" % config)
         sql_template = 'setweight(%s, %%s)' % sql_template
-        for obj in objs:
-            data_params.extend((content_type_pk, obj._object_id))
-            if obj._body_:
-                vectors_sql.append('||'.join(sql_template for _ in obj._body_))
-                data_params.extend([v for t in obj._body_ for v in t])
+        for object_id, body in entries:
+            data_params.extend((content_type_pk, object_id))
+            if body:
+                vectors_sql.append('||'.join(sql_template for _ in body))
+                data_params.extend([v for t in body for v in t])
             else:
                 vectors_sql.append("''::tsvector")
         data_sql = ', '.join(['(%%s, %%s, %s)' % s for s in vectors_sql])
@@ -116,55 +197,142 @@ class Index:
                 DO UPDATE SET body_search = EXCLUDED.body_search
                 """ % (IndexEntry._meta.db_table, data_sql), data_params)
 
-    def add_items_update_then_create(self, content_type_pk, objs, config):
-        ids_and_objs = {}
-        for obj in objs:
-            obj._search_vector = (
+    def add_items_update_then_create(self, content_type_pk, entries, config):
+        ids_and_vectors = {}
+        for object_id, body in entries:
+            ids_and_vectors[object_id] = (
                 ADD([SearchVector(Value(text), weight=weight, config=config)
-                     for text, weight in obj._body_])
-                if obj._body_ else SearchVector(Value('')))
-            ids_and_objs[obj._object_id] = obj
+                     for text, weight in body])
+                if body else SearchVector(Value('')))
         index_entries_for_ct = self.index_entries.filter(
             content_type_id=content_type_pk)
         indexed_ids = frozenset(
-            index_entries_for_ct.filter(object_id__in=ids_and_objs)
+            index_entries_for_ct.filter(object_id__in=ids_and_vectors)
             .values_list('object_id', flat=True))
         for indexed_id in indexed_ids:
-            obj = ids_and_objs[indexed_id]
-            index_entries_for_ct.filter(object_id=obj._object_id) \
-                .update(body_search=obj._search_vector)
+            index_entries_for_ct.filter(object_id=indexed_id) \
+                .update(body_search=ids_and_vectors[indexed_id])
         to_be_created = []
-        for object_id in ids_and_objs:
+        for object_id in ids_and_vectors:
             if object_id not in indexed_ids:
                 to_be_created.append(IndexEntry(
                     content_type_id=content_type_pk,
                     object_id=object_id,
-                    body_search=ids_and_objs[object_id]._search_vector,
+                    body_search=ids_and_vectors[object_id],
                 ))
         self.index_entries.bulk_create(to_be_created)
 
+    staging_table = 'postgres_search_indexentry_staging'
+
+    def start_bulk_load(self):
+        """
+        Starts loading objects with COPY rather than INSERT statements, which
+        is used by rebuilds.
+        """
+        connection = connections[self.db_alias]
+        if connection.pg_version < 90500:  # ON CONFLICT requires PostgreSQL 9.5
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE IF NOT EXISTS %s ('
+                'content_type_id integer, object_id text, position integer, '
+                'weight text, body text)' % self.staging_table)
+        self.bulk_loading = True
+
+    def finish_bulk_load(self):
+        if not self.bulk_loading:
+            return
+        self.bulk_loading = False
+        # Removes index entries of an ancestor model for the objects of this
+        # model, in one statement rather than one for each batch of objects.
+        content_type_pk = get_content_type_pk(self.model)
+        self.index_entries.filter(
+            content_type_id__in=get_ancestors_content_types_pks(self.model),
+            object_id__in=self.index_entries.filter(
+                content_type_id=content_type_pk).values('object_id'),
+        ).delete()
+
+    def add_items_copy(self, connection, content_type_pk, entries, config):
+        """
+        Copies the text of the objects into the staging table, then computes
+        all their vectors and adds them to the index in a single statement.
+        """
+        data = StringIO()
+        writer = csv.writer(data, quoting=csv.QUOTE_NONNUMERIC)
+        for object_id, body in entries:
+            # Objects without any text still need an entry.
+            body = body or [('', WEIGHTS[-1])]
+            for position, (text, weight) in enumerate(body):
+                writer.writerow((content_type_pk, object_id, position,
+                                 weight, text))
+        data.seek(0)
+
+        config_sql = '' if config is None else '%s::regconfig, '
+        vector_sql = ' || '.join(
+            "setweight(to_tsvector(%s COALESCE(string_agg(body, ' ' "
+            "ORDER BY position) FILTER (WHERE weight = '%s'), '')), '%s')"
+            % (config_sql, weight, weight) for weight in WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                'COPY %s (content_type_id, object_id, position, weight, body) '
+                'FROM STDIN WITH (FORMAT csv)' % self.staging_table, data)
+            cursor.execute("""
+                INSERT INTO %s(content_type_id, object_id, body_search)
+                (SELECT content_type_id, object_id, %s
+                 FROM %s GROUP BY content_type_id, object_id)
+                ON CONFLICT (content_type_id, object_id)
+                DO UPDATE SET body_search = EXCLUDED.body_search
+                """ % (IndexEntry._meta.db_table, vector_sql,
+                       self.staging_table),
+                [] if config is None else [config] * len(WEIGHTS))
+            cursor.execute('TRUNCATE %s' % self.staging_table)
+
     def add_items(self, model, objs):
+        self.add_prepared_items(model, self.prepare_items(model, objs))
+
+    def prepare_items(self, model, objs):
+        """
+        Returns a list of (object ID, body) tuples for the given objects, which
+        can be pickled and passed to add_prepared_items (see the update_index
+        command's --workers option).
+        """
+        return [(force_text(obj.pk), self.prepare_body(obj)) for obj in objs]
+
+    def add_prepared_items(self, model, entries):
         content_type_pk = get_content_type_pk(model)
         config = self.backend.get_config()
-        for obj in objs:
-            obj._object_id = force_text(obj.pk)
-            obj._body_ = self.prepare_body(obj)
+
+        connection = connections[self.db_alias]
+        if self.bulk_loading and model is self.model:
+            # Entries of ancestor models are removed by finish_bulk_load().
+            self.add_items_copy(connection, content_type_pk, entries, config)
+            return
 
         # Removes index entries of an ancestor model in case the descendant
         # model instance was created since.
         self.index_entries.filter(
             content_type_id__in=get_ancestors_content_types_pks(model)
-        ).filter(object_id__in=[obj._object_id for obj in objs]).delete()
+        ).filter(object_id__in=[object_id for object_id, body in entries]).delete()
 
-        connection = connections[self.db_alias]
         if connection.pg_version >= 90500:  # PostgreSQL >= 9.5
-            self.add_items_upsert(connection, content_type_pk, objs, config)
+            self.add_items_upsert(connection, content_type_pk, entries, config)
         else:
-            self.add_items_update_then_create(content_type_pk, objs, config)
+            self.add_items_update_then_create(content_type_pk, entries, config)
 
     def delete_item(self, item):
         item.index_entries.using(self.db_alias).delete()
 
+    def get_item_pks(self, model):
+        return self.index_entries.filter(
+            content_type_id=get_content_type_pk(model)
+        ).values_list('object_id', flat=True).iterator()
+
+    def delete_items(self, model, items):
+        self.index_entries.filter(
+            content_type_id=get_content_type_pk(model),
+            object_id__in=[force_text(item.pk) for item in items],
+        ).delete()
+
     def __str__(self):
         return self.name
 
@@ -217,7 +385,8 @@ class PostgresSearchQueryCompiler(BaseSearchQueryCompiler):
                     return self.get_boost(sub_field_name, field.fields)
                 return field.boost
 
-    def search(self, config, start, stop):
+    def search(self, config, start, stop, rank_function='ts_rank',
+               rank_normalization=0, rank_candidates=None):
         # TODO: Handle MatchAll nested inside other search query classes.
         if isinstance(self.query, MatchAll):
             return self.queryset[start:stop]
@@ -238,10 +407,17 @@ class PostgresSearchQueryCompiler(BaseSearchQueryCompiler):
             vector, search_query)
         query.where.add(lookup, 'AND')
         if self.order_by_relevance:
+            if rank_candidates is not None:
+                # Ranking every match is slow for common words, so only the first
+                # matches found using the GIN index are ranked.
+                candidates = queryset.order_by().values('pk')[:rank_candidates]
+                queryset = queryset.filter(pk__in=candidates)
             # Due to a Django bug, arrays are not automatically converted here.
             converted_weights = '{' + ','.join(map(str, WEIGHTS_VALUES)) + '}'
-            queryset = queryset.order_by(SearchRank(vector, search_query,
-                                                    weights=converted_weights).desc(),
+            queryset = queryset.order_by(Rank(vector, search_query,
+                                              function=rank_function,
+                                              normalization=rank_normalization,
+                                              weights=converted_weights).desc(),
                                          '-pk')
         elif not queryset.query.order_by:
             # Adds a default ordering to avoid issue #3729.
@@ -269,10 +445,12 @@ class PostgresSearchQueryCompiler(BaseSearchQueryCompiler):
 class PostgresSearchResults(BaseSearchResults):
     def _do_search(self):
         return list(self.query_compiler.search(self.backend.get_config(),
-                                               self.start, self.stop))
+                                               self.start, self.stop,
+                                               **self.backend.get_rank_options()))
 
     def _do_count(self):
-        return self.query_compiler.search(self.backend.get_config(), None, None).count()
+        return self.query_compiler.search(self.backend.get_config(), None, None,
+                                          **self.backend.get_rank_options()).count()
 
 
 class PostgresSearchRebuilder:
@@ -281,10 +459,11 @@ class PostgresSearchRebuilder:
 
     def start(self):
         self.index.delete_stale_entries()
+        self.index.start_bulk_load()
         return self.index
 
     def finish(self):
-        pass
+        self.index.finish_bulk_load()
 
 
 class PostgresSearchAtomicRebuilder(PostgresSearchRebuilder):
@@ -299,6 +478,7 @@ class PostgresSearchAtomicRebuilder(PostgresSearchRebuilder):
         return super().start()
 
     def finish(self):
+        super().finish()
         self.transaction.__exit__(None, None, None)
         self.transaction_opened = False
 
@@ -306,6 +486,7 @@ class PostgresSearchAtomicRebuilder(PostgresSearchRebuilder):
         # TODO: Implement a cleaner way to close the connection on failure.
         if self.transaction_opened:
             self.transaction.needs_rollback = True
+            self.index.bulk_loading = False
             self.finish()
 
 
@@ -320,11 +501,24 @@ class PostgresSearchBackend(BaseSearchBackend):
         self.params = params
         if params.get('ATOMIC_REBUILD', False):
             self.rebuilder_class = self.atomic_rebuilder_class
+        if self.params.get('RANK_FUNCTION', 'ts_rank') not in RANK_FUNCTIONS:
+            raise ImproperlyConfigured(
+                'RANK_FUNCTION must be one of: %s' % ', '.join(RANK_FUNCTIONS))
         IndexEntry.add_generic_relations()
 
     def get_config(self):
         return self.params.get('SEARCH_CONFIG')
 
+    def get_rank_options(self):
+        return {
+            'rank_function': self.params.get('RANK_FUNCTION', 'ts_rank'),
+            'rank_normalization': self.params.get('RANK_NORMALIZATION', 0),
+            'rank_candidates': self.params.get('RANK_CANDIDATES'),
+        }
+
+    def get_partial_index_models(self):
+        return self.params.get('PARTIAL_INDEXES', [])
+
     def get_index_for_model(self, model, db_alias=None):
         return Index(self, model, db_alias)
 
@@ -351,5 +545,9 @@ class PostgresSearchBackend(BaseSearchBackend):
     def delete(self, obj):
         self.get_index_for_object(obj).delete_item(obj)
 
+    def delete_bulk(self, model, obj_list):
+        if obj_list:
+            self.get_index_for_object(obj_list[0]).delete_items(model, obj_list)
+
 
 SearchBackend = PostgresSearchBackend
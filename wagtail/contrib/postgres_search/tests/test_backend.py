@@ -1,8 +1,17 @@
-from django.test import TestCase
+import unittest
 
+import mock
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from wagtail.search.backends import get_search_backend
 from wagtail.search.tests.test_backends import BackendTests
+from wagtail.tests.search import models
 
-from ..utils import BOOSTS_WEIGHTS, WEIGHTS_VALUES, determine_boosts_weights, get_weight
+from ..utils import (
+    BOOSTS_WEIGHTS, WEIGHTS_VALUES, determine_boosts_weights, get_content_type_pk,
+    get_descendants_content_types_pks, get_weight)
 
 
 class TestPostgresSearchBackend(BackendTests, TestCase):
@@ -35,3 +44,92 @@ class TestPostgresSearchBackend(BackendTests, TestCase):
                              [(6, 'A'), (4, 'B'), (2, 'C'), (0, 'D')])
         self.assertListEqual(determine_boosts_weights([-2, -1, 0, 1, 2, 3, 4]),
                              [(4, 'A'), (2, 'B'), (0, 'C'), (-2, 'D')])
+
+    def test_rank_candidates(self):
+        # Only the first match found is ranked and returned
+        with mock.patch.dict(self.backend.params, {'RANK_CANDIDATES': 1}):
+            results = self.backend.search("JavaScript", models.Book)
+
+            self.assertEqual(len(results), 1)
+            self.assertEqual(results.count(), 1)
+
+    def test_ts_rank_cd(self):
+        with mock.patch.dict(self.backend.params, {'RANK_FUNCTION': 'ts_rank_cd', 'RANK_NORMALIZATION': 32}):
+            results = list(self.backend.search("JavaScript Definitive", models.Book, operator='or'))
+
+        self.assertEqual(results[0].title, "JavaScript: The Definitive Guide")
+
+    def test_partial_index_deferred_in_transaction(self):
+        index = self.backend.get_index_for_model(models.Novel)
+        with mock.patch('django.db.transaction.on_commit') as on_commit:
+            index.add_partial_index(models.Novel)
+
+        # CREATE INDEX CONCURRENTLY can't run in a transaction
+        self.assertEqual(on_commit.call_count, 1)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM pg_indexes WHERE indexname LIKE %s',
+                           [index.get_partial_index_prefix(models.Novel) + '%'])
+            self.assertIsNone(cursor.fetchone())
+
+    def test_rebuild_removes_ancestor_entries(self):
+        from ..models import IndexEntry
+
+        novel = models.Novel.objects.first()
+        book = models.Book.objects.get(pk=novel.pk)
+        book_entries = IndexEntry.objects.filter(content_type_id=get_content_type_pk(models.Book),
+                                                 object_id=str(novel.pk))
+
+        self.backend.get_index_for_model(models.Book).add_items(models.Book, [book])
+        self.assertTrue(book_entries.exists())
+
+        # Rebuilding the Novel index loads the novels with COPY, then removes
+        # their entries as books
+        rebuilder = self.backend.rebuilder_class(self.backend.get_index_for_model(models.Novel))
+        index = rebuilder.start()
+        self.assertTrue(index.bulk_loading)
+        index.add_items(models.Novel, list(models.Novel.get_indexed_objects()))
+        rebuilder.finish()
+
+        self.assertFalse(book_entries.exists())
+        self.assertEqual(len(self.backend.search("Westeros", models.Novel)), 3)
+
+
+class TestPostgresPartialIndexes(TransactionTestCase):
+    def setUp(self):
+        if 'postgresql' not in settings.WAGTAILSEARCH_BACKENDS:
+            raise unittest.SkipTest("No WAGTAILSEARCH_BACKENDS entry for the PostgreSQL backend")
+
+        self.backend = get_search_backend('postgresql')
+        self.index = self.backend.get_index_for_model(models.Novel)
+
+    def tearDown(self):
+        with connection.cursor() as cursor:
+            for index_name in self.get_partial_indexes():
+                cursor.execute('DROP INDEX %s' % index_name)
+
+    def get_partial_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT indexname FROM pg_indexes WHERE indexname LIKE %s',
+                           [self.index.get_partial_index_prefix(models.Novel) + '%'])
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_add_model_creates_partial_index(self):
+        with mock.patch.dict(self.backend.params, {'PARTIAL_INDEXES': ['searchtests.Novel']}):
+            self.index.add_model(models.Novel)
+
+        index_name = self.index.get_partial_index_name(
+            models.Novel, get_descendants_content_types_pks(models.Novel))
+        self.assertEqual(self.get_partial_indexes(), [index_name])
+
+    def test_replaces_outdated_partial_index(self):
+        content_type_pks = get_descendants_content_types_pks(models.Novel)
+        self.index.add_partial_index(models.Novel)
+
+        # A subclass was added to the model since the index was created
+        new_content_type_pks = content_type_pks + [max(content_type_pks) + 1]
+        with mock.patch('wagtail.contrib.postgres_search.backend.get_descendants_content_types_pks',
+                        return_value=new_content_type_pks):
+            self.index.add_partial_index(models.Novel)
+
+        index_name = self.index.get_partial_index_name(models.Novel, new_content_type_pks)
+        self.assertEqual(self.get_partial_indexes(), [index_name])
@@ -186,7 +186,7 @@ class TestRoutablePageTemplateTag(TestCase):
         self.assertEqual(url, self.routable_page.url + 'external/joe-bloggs/')
 
     def test_templatetag_reverse_external_view_without_append_slash(self):
-        with mock.patch('wagtail.core.models.WAGTAIL_APPEND_SLASH', False):
+        with mock.patch('wagtail.core.url_routing.WAGTAIL_APPEND_SLASH', False):
             url = routablepageurl(self.context, self.routable_page,
                                   'external_view', 'joe-bloggs')
             expected = self.routable_page.url + '/' + 'external/joe-bloggs/'
@@ -2,7 +2,7 @@ import jinja2
 import jinja2.nodes
 from jinja2.ext import Extension
 
-from .templatetags.wagtailcore_tags import pageurl, richtext, slugurl, wagtail_version
+from .templatetags.wagtailcore_tags import pageurl, pageurls, richtext, slugurl, wagtail_version
 
 
 class WagtailCoreExtension(Extension):
@@ -13,6 +13,7 @@ class WagtailCoreExtension(Extension):
 
         self.environment.globals.update({
             'pageurl': jinja2.contextfunction(pageurl),
+            'pageurls': jinja2.contextfunction(pageurls),
             'slugurl': jinja2.contextfunction(slugurl),
             'wagtail_version': wagtail_version,
         })
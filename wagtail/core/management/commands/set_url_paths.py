@@ -1,18 +1,71 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
-from wagtail.core.models import Page
+from wagtail.core.models import Page, PageUrlPathRewrite, get_url_path_update_batch_size
 
 
 class Command(BaseCommand):
 
     help = 'Resets url_path fields on each page recursively'
 
-    def set_subtree(self, root, parent=None):
-        root.set_url_path(parent)
-        root.save(update_fields=['url_path'])
-        for child in root.get_children():
-            self.set_subtree(child, root)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pending-only', action='store_true', dest='pending_only', default=False,
+            help="Only complete deferred url_path updates, rather than resetting every page")
+        parser.add_argument(
+            '--batch-size', type=int, dest='batch_size', default=None,
+            help="The number of pages to update at a time")
+
+    def report_rewrite_progress(self, rewrite, num_updated):
+        self.stdout.write("Updated %d descendants of page %d (%s)" % (num_updated, rewrite.page.id, rewrite.new_url_path))
+
+    def set_url_paths(self, batch_size):
+        total = Page.objects.count()
+        num_processed = 0
+        num_changed = 0
+
+        # (path, url_path) of the ancestors of the current page, nearest last
+        ancestors = []
+        last_path = ''
+
+        while True:
+            batch = list(
+                Page.objects.filter(path__gt=last_path).order_by('path')
+                .values_list('id', 'path', 'slug', 'url_path')[:batch_size]
+            )
+            if not batch:
+                break
+
+            with transaction.atomic():
+                for page_id, path, slug, url_path in batch:
+                    parent_path = path[:-Page.steplen]
+                    while ancestors and not path.startswith(ancestors[-1][0]):
+                        ancestors.pop()
+
+                    if ancestors and ancestors[-1][0] == parent_path:
+                        new_url_path = ancestors[-1][1] + slug + '/'
+                    elif parent_path:
+                        self.stdout.write("Page %d has no parent; skipping. Run fixtree to fix this." % page_id)
+                        continue
+                    else:
+                        # a page without a parent is the tree root, which always has a url_path of '/'
+                        new_url_path = '/'
+
+                    if new_url_path != url_path:
+                        Page.objects.filter(id=page_id).update(url_path=new_url_path)
+                        num_changed += 1
+
+                    ancestors.append((path, new_url_path))
+
+            num_processed += len(batch)
+            last_path = batch[-1][1]
+            self.stdout.write("Processed %d of %d pages (%d changed)" % (num_processed, total, num_changed))
 
     def handle(self, *args, **options):
-        for node in Page.get_root_nodes():
-            self.set_subtree(node)
+        batch_size = options['batch_size'] or get_url_path_update_batch_size()
+
+        # Complete any url_path updates that have been deferred
+        PageUrlPathRewrite.run_pending(batch_size=batch_size, progress_callback=self.report_rewrite_progress)
+
+        if not options['pending_only']:
+            self.set_url_paths(batch_size)
@@ -0,0 +1,29 @@
+# Generated by Django 2.0.13 on 2026-10-17 06:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailcore', '0040_page_draft_title'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageUrlPathRewrite',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_url_path', models.TextField(verbose_name='old URL path')),
+                ('new_url_path', models.TextField(verbose_name='new URL path')),
+                ('last_path', models.CharField(blank=True, help_text='The tree path of the last descendant that has been updated', max_length=255, verbose_name='last path')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('page', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='wagtailcore.Page', verbose_name='page')),
+            ],
+            options={
+                'verbose_name': 'page URL path rewrite',
+                'verbose_name_plural': 'page URL path rewrites',
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 import json
 import logging
+import uuid
 from collections import defaultdict
 from io import StringIO
 from urllib.parse import urlparse
@@ -13,11 +14,10 @@ from django.core.exceptions import ValidationError
 from django.core.handlers.base import BaseHandler
 from django.core.handlers.wsgi import WSGIRequest
 from django.db import models, transaction
-from django.db.models import Q, Value
+from django.db.models import Case, Q, Value, When
 from django.db.models.functions import Concat, Substr
 from django.http import Http404
 from django.template.response import TemplateResponse
-from django.urls import reverse
 from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.text import capfirst, slugify
@@ -25,12 +25,12 @@ from django.utils.translation import ugettext_lazy as _
 from modelcluster.models import ClusterableModel, get_all_child_relations
 from treebeard.mp_tree import MP_Node
 
+from wagtail.core import page_cache
 from wagtail.core.query import PageQuerySet, TreeQuerySet
 from wagtail.core.signals import page_published, page_unpublished
-from wagtail.core.sites import get_site_for_hostname
-from wagtail.core.url_routing import RouteResult
-from wagtail.core.utils import (
-    WAGTAIL_APPEND_SLASH, camelcase_to_underscore, resolve_model_string)
+from wagtail.core.sites import get_site_for_hostname, invalidate_site_routing_table
+from wagtail.core.url_routing import PageUrlResolver, RouteResult
+from wagtail.core.utils import camelcase_to_underscore, resolve_model_string
 from wagtail.search import index
 
 logger = logging.getLogger('wagtail.core')
@@ -343,6 +343,8 @@ class Page(AbstractPage, index.Indexed, ClusterableModel, metaclass=PageBase):
         index.FilterField('latest_revision_created_at'),
     ]
 
+    search_timestamp_fields = ['latest_revision_created_at', 'last_published_at']
+
     # Do not allow plain Page instances to be created through the Wagtail admin
     is_creatable = False
 
@@ -379,7 +381,10 @@ class Page(AbstractPage, index.Indexed, ClusterableModel, metaclass=PageBase):
         been assigned a position in the tree, as far as treebeard is concerned.
         """
         if parent:
-            self.url_path = parent.url_path + self.slug + '/'
+            # If the parent's url_path is due to be rewritten, use its new value
+            parent_url_path = apply_url_path_rewrites(
+                PageUrlPathRewrite.get_pending(), parent.path, parent.url_path)
+            self.url_path = parent_url_path + self.slug + '/'
         else:
             # a page without a parent is the tree root, which always has a url_path of '/'
             self.url_path = '/'
@@ -467,9 +472,12 @@ class Page(AbstractPage, index.Indexed, ClusterableModel, metaclass=PageBase):
         if update_descendant_url_paths:
             self._update_descendant_url_paths(old_url_path, new_url_path)
 
-        # Check if this is a root page of any sites and clear the 'wagtail_site_root_paths' key if so
+        # Check if this is a root page of any sites and clear the 'wagtail_site_root_paths' key
+        # and the site routing table (which holds a copy of the root page) if so
         if Site.objects.filter(root_page=self).exists():
             cache.delete('wagtail_site_root_paths')
+            invalidate_site_routing_table()
+            transaction.on_commit(invalidate_site_routing_table)
 
         # Log
         if is_new:
@@ -556,6 +564,12 @@ class Page(AbstractPage, index.Indexed, ClusterableModel, metaclass=PageBase):
         return errors
 
     def _update_descendant_url_paths(self, old_url_path, new_url_path):
+        if url_path_updates_are_deferred():
+            # Leave the update to be completed by the set_url_paths command
+            PageUrlPathRewrite.objects.create(page=self, old_url_path=old_url_path, new_url_path=new_url_path)
+            PageUrlPathRewrite.invalidate_pending()
+            return
+
         (Page.objects
             .filter(path__startswith=self.path)
             .exclude(pk=self.pk)
@@ -617,6 +631,50 @@ class Page(AbstractPage, index.Indexed, ClusterableModel, metaclass=PageBase):
             else:
                 raise Http404
 
+    def _has_default_route(self):
+        """
+        Return True if this page's most specific class uses Page.route unchanged
+        """
+        specific_class = self.specific_class
+        return specific_class is None or specific_class.route is Page.route
+
+    def route_by_url_path(self, request, path_components):
+        """
+        Equivalent to ``self.specific.route(request, path_components)``, but
+        looks up every page along the path in a single query on ``url_path``,
+        rather than walking the tree one path component at a time. ``route``
+        is still called on the first page along the path whose class overrides
+        it (such as ``RoutablePageMixin``), with the remaining path components.
+        """
+        if not path_components or not self._has_default_route() or PageUrlPathRewrite.get_pending():
+            # Also walk the tree if any url_paths are out of date
+            return self.specific.route(request, path_components)
+
+        url_paths = []
+        url_path = self.url_path
+        for component in path_components:
+            url_path += component + '/'
+            url_paths.append(url_path)
+
+        pages_by_url_path = {
+            page.url_path: page
+            for page in Page.objects.filter(
+                path__startswith=self.path,
+                depth__gt=self.depth,
+                depth__lte=self.depth + len(path_components),
+                url_path__in=url_paths,
+            )
+        }
+
+        for num_components, url_path in enumerate(url_paths, 1):
+            try:
+                page = pages_by_url_path[url_path]
+            except KeyError:
+                raise Http404
+
+            if num_components == len(path_components) or not page._has_default_route():
+                return page.specific.route(request, path_components[num_components:])
+
     def get_admin_display_title(self):
         """
         Return the title for this page as it should appear in the admin backend;
@@ -742,6 +800,21 @@ class Page(AbstractPage, index.Indexed, ClusterableModel, metaclass=PageBase):
             cache_object._wagtail_cached_site_root_paths = Site.get_site_root_paths()
             return cache_object._wagtail_cached_site_root_paths
 
+    def _get_url_resolver(self, request=None):
+        """
+        Return a ``PageUrlResolver`` for the site root paths, using the cached
+        copy on the request object if available.
+        """
+        cache_object = request if request else self
+        try:
+            return cache_object._wagtail_cached_url_resolver
+        except AttributeError:
+            cache_object._wagtail_cached_url_resolver = PageUrlResolver(
+                self._get_site_root_paths(request),
+                url_path_rewrites=PageUrlPathRewrite.get_pending(),
+            )
+            return cache_object._wagtail_cached_url_resolver
+
     def get_url_parts(self, request=None):
         """
         Determine the URL for this page and return it as a tuple of
@@ -759,17 +832,7 @@ class Page(AbstractPage, index.Indexed, ClusterableModel, metaclass=PageBase):
         ``request`` directly, and should just pass it to the original method
         when calling ``super``.
         """
-        for (site_id, root_path, root_url) in self._get_site_root_paths(request):
-            if self.url_path.startswith(root_path):
-                page_path = reverse('wagtail_serve', args=(self.url_path[len(root_path):],))
-
-                # Remove the trailing slash from the URL reverse generates if
-                # WAGTAIL_APPEND_SLASH is False and we're not trying to serve
-                # the root path
-                if not WAGTAIL_APPEND_SLASH and page_path != '/':
-                    page_path = page_path.rstrip('/')
-
-                return (site_id, root_url, page_path)
+        return self._get_url_resolver(request).get_page_url_parts(self)
 
     def get_full_url(self, request=None):
         """Return the full URL (including protocol / domain) to this page, or None if it is not routable"""
@@ -1021,6 +1084,11 @@ class Page(AbstractPage, index.Indexed, ClusterableModel, metaclass=PageBase):
         new_self.save()
         new_self._update_descendant_url_paths(old_url_path, new_url_path)
 
+        # Cached responses may now have out of date URLs or menus. Invalidate them
+        # again once the move is committed, in case they were re-cached in between
+        page_cache.invalidate()
+        transaction.on_commit(page_cache.invalidate)
+
         # Log
         logger.info("Page moved: \"%s\" id=%d path=%s", self.title, self.id, new_url_path)
 
@@ -1372,6 +1440,165 @@ class Page(AbstractPage, index.Indexed, ClusterableModel, metaclass=PageBase):
         verbose_name_plural = _('pages')
 
 
+def get_url_path_update_batch_size():
+    return getattr(settings, 'WAGTAIL_URL_PATH_UPDATE_BATCH_SIZE', 1000)
+
+
+def url_path_updates_are_deferred():
+    return getattr(settings, 'WAGTAIL_DEFER_URL_PATH_UPDATES', False)
+
+
+PENDING_URL_PATH_REWRITES_VERSION_CACHE_KEY = 'wagtail_pending_url_path_rewrites_version'
+
+# (version, list of pending PageUrlPathRewrites) for the current process
+_pending_url_path_rewrites = (None, None)
+
+
+class PageUrlPathRewrite(models.Model):
+    """
+    A deferred update to the url_path of every descendant of a page, following a
+    change to that page's slug or position in the tree.
+
+    Rewrites are only created if WAGTAIL_DEFER_URL_PATH_UPDATES is set, and are
+    completed by the ``set_url_paths`` management command. Descendants are updated in
+    batches, in order of their tree path, and progress is recorded after each batch
+    so that an interrupted rewrite can be resumed.
+
+    The old url_path of the page may itself be out of date if a rewrite of one of
+    its ancestors is pending, so descendants are found by their tree path, and the
+    part of their url_path below the page is appended to ``new_url_path``.
+    """
+    page = models.ForeignKey('Page', verbose_name=_('page'), related_name='+', on_delete=models.CASCADE)
+    old_url_path = models.TextField(verbose_name=_('old URL path'))
+    new_url_path = models.TextField(verbose_name=_('new URL path'))
+    last_path = models.CharField(
+        verbose_name=_('last path'), max_length=255, blank=True,
+        help_text=_("The tree path of the last descendant that has been updated")
+    )
+    created_at = models.DateTimeField(verbose_name=_('created at'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('page URL path rewrite')
+        verbose_name_plural = _('page URL path rewrites')
+
+    @classmethod
+    def get_pending(cls):
+        """
+        Return the list of rewrites that have been deferred and not yet completed,
+        in the order they need to be applied. This is always empty unless
+        WAGTAIL_DEFER_URL_PATH_UPDATES is set.
+        """
+        global _pending_url_path_rewrites
+
+        if not url_path_updates_are_deferred():
+            return []
+
+        # The list is kept in memory until a rewrite is created or completed, so
+        # that routing and URL generation don't query for it every time
+        version = cache.get_or_set(PENDING_URL_PATH_REWRITES_VERSION_CACHE_KEY, lambda: uuid.uuid4().hex, None)
+        pending_version, pending = _pending_url_path_rewrites
+
+        if pending is None or pending_version != version:
+            pending = list(cls.objects.select_related('page').order_by('id'))
+            _pending_url_path_rewrites = (version, pending)
+
+        return pending
+
+    @classmethod
+    def invalidate_pending(cls):
+        """
+        Make every process reload the list of pending rewrites on next use. This
+        is done again once the transaction is committed, in case another process
+        reloaded it before the change was visible.
+        """
+        cache.delete(PENDING_URL_PATH_REWRITES_VERSION_CACHE_KEY)
+        transaction.on_commit(lambda: cache.delete(PENDING_URL_PATH_REWRITES_VERSION_CACHE_KEY))
+
+    @classmethod
+    def run_pending(cls, batch_size=None, progress_callback=None):
+        for rewrite in cls.objects.select_related('page').order_by('id'):
+            rewrite.run(batch_size=batch_size, progress_callback=progress_callback)
+
+    def rewrite_url_path(self, path, url_path):
+        """
+        Return the url_path that the page at the given tree path will have once this
+        rewrite is complete
+        """
+        page_path = self.page.path
+        if path.startswith(page_path) and path != page_path:
+            # Keep the slugs of the page's descendants, down to this one
+            depth = (len(path) - len(page_path)) // Page.steplen
+            slugs = url_path.strip('/').split('/')[-depth:]
+            return self.new_url_path + '/'.join(slugs) + '/'
+
+        return url_path
+
+    def run(self, batch_size=None, progress_callback=None):
+        """
+        Update the url_path of the page's descendants, ``batch_size`` pages at a time.
+        ``progress_callback`` is called with this rewrite and the number of pages
+        updated so far after each batch.
+        """
+        if batch_size is None:
+            batch_size = get_url_path_update_batch_size()
+
+        page = self.page
+        descendants = Page.objects.filter(path__startswith=page.path, depth__gt=page.depth).order_by()
+        num_updated = 0
+
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    descendants.filter(path__gt=self.last_path)
+                    .order_by('path').values_list('id', 'path', 'url_path')[:batch_size]
+                )
+                if not batch:
+                    break
+
+                # Pages that already have the right url_path (for example, because
+                # they were created or moved here since this rewrite was started)
+                # are left alone
+                new_url_paths = {}
+                for page_id, path, url_path in batch:
+                    new_url_path = self.rewrite_url_path(path, url_path)
+                    if new_url_path != url_path:
+                        new_url_paths[page_id] = new_url_path
+
+                if new_url_paths:
+                    Page.objects.filter(id__in=list(new_url_paths)).update(url_path=Case(
+                        *[When(id=page_id, then=Value(url_path)) for page_id, url_path in new_url_paths.items()],
+                        output_field=models.TextField()
+                    ))
+                    num_updated += len(new_url_paths)
+
+                self.last_path = batch[-1][1]
+                if self.pk:
+                    self.save(update_fields=['last_path'])
+
+            if progress_callback:
+                progress_callback(self, num_updated)
+
+            if len(batch) < batch_size:
+                break
+
+        if self.pk:
+            self.delete()
+            PageUrlPathRewrite.invalidate_pending()
+
+        return num_updated
+
+
+def apply_url_path_rewrites(rewrites, path, url_path):
+    """
+    Apply each of the given PageUrlPathRewrites to the url_path of the page at
+    the given tree path
+    """
+    for rewrite in rewrites:
+        url_path = rewrite.rewrite_url_path(path, url_path)
+
+    return url_path
+
+
 class Orderable(models.Model):
     sort_order = models.IntegerField(null=True, blank=True, editable=False)
     sort_order_field = 'sort_order'
@@ -0,0 +1,152 @@
+"""
+An opt-in cache of rendered page responses, used by wagtail.core.views.serve.
+
+Responses are cached per site, path (including the query string) and any
+request headers listed in WAGTAIL_PAGE_CACHE_VARY. All cache keys include
+a generation token, which is replaced whenever a page is published,
+unpublished, moved or deleted, or its privacy settings are changed; this
+invalidates every cached response at once, since a change to one page can
+affect the rendering of many others (menus, listings and so on).
+"""
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+GENERATION_CACHE_KEY = 'wagtail_page_cache_generation'
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def is_enabled():
+    return getattr(settings, 'WAGTAIL_PAGE_CACHE_ENABLED', False)
+
+
+def get_cache():
+    return caches[getattr(settings, 'WAGTAIL_PAGE_CACHE_BACKEND', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'WAGTAIL_PAGE_CACHE_TIMEOUT', 300)
+
+
+def get_vary_headers():
+    return getattr(settings, 'WAGTAIL_PAGE_CACHE_VARY', [])
+
+
+def get_generation():
+    return get_cache().get_or_set(GENERATION_CACHE_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def invalidate():
+    """
+    Invalidate every cached page response
+    """
+    get_cache().delete(GENERATION_CACHE_KEY)
+
+
+def get_stats():
+    """
+    Return the number of cache hits and misses recorded by this process
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats['hits'] = 0
+        _stats['misses'] = 0
+
+
+def _record(stat):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def request_is_cacheable(request):
+    """
+    Only anonymous GET and HEAD requests are served from the cache. Logged-in
+    users (including editors) always receive a freshly rendered page.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return False
+
+    if request.site is None:
+        return False
+
+    user = getattr(request, 'user', None)
+    return user is None or not user.is_authenticated
+
+
+def response_is_cacheable(request, page, response):
+    if response.status_code != 200 or response.streaming:
+        return False
+
+    # Responses that set cookies (such as a CSRF token for a form page)
+    # are specific to the user that requested them
+    if response.cookies or request.META.get('CSRF_COOKIE_USED'):
+        return False
+
+    session = getattr(request, 'session', None)
+    if session is not None and session.modified:
+        return False
+
+    cache_control = response.get('Cache-Control', '').lower()
+    if any(directive in cache_control for directive in ('private', 'no-cache', 'no-store')):
+        return False
+
+    # Never cache private pages, even once the user has passed the restriction
+    if page.get_view_restrictions().exists():
+        return False
+
+    return True
+
+
+def get_cache_key(request):
+    key_parts = [
+        str(request.site.id),
+        request.scheme,
+        request.get_full_path(),
+    ]
+    key_parts.extend(request.META.get(header, '') for header in get_vary_headers())
+
+    key_hash = hashlib.md5('\n'.join(key_parts).encode('utf-8')).hexdigest()
+    return 'wagtail_page_cache.%s.%s' % (get_generation(), key_hash)
+
+
+def get_cached_response(request):
+    """
+    Return the cached response for this request, or None if there isn't one
+    (or the request should not be served from the cache)
+    """
+    if not is_enabled() or not request_is_cacheable(request):
+        return None
+
+    response = get_cache().get(get_cache_key(request))
+
+    _record('hits' if response is not None else 'misses')
+    return response
+
+
+def cache_response(request, page, response):
+    """
+    Store the response to this request in the page cache, once it has been
+    rendered, if both the request and response are cacheable
+    """
+    if not is_enabled() or not request_is_cacheable(request):
+        return
+
+    cache_key = get_cache_key(request)
+
+    def store(response):
+        if response_is_cacheable(request, page, response):
+            get_cache().set(cache_key, response, get_timeout())
+
+    if hasattr(response, 'render') and callable(response.render):
+        response.add_post_render_callback(store)
+    else:
+        store(response)
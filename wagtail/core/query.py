@@ -1,15 +1,21 @@
+import itertools
 import posixpath
 from collections import defaultdict
 
 from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
 from django.db.models import CharField, Q
+from django.db.models.base import DEFERRED
 from django.db.models.functions import Length, Substr
-from django.db.models.query import BaseIterable
+from django.db.models.query import BaseIterable, ModelIterable
 from treebeard.mp_tree import MP_NodeQuerySet
 
+from wagtail.core.url_routing import get_page_urls
 from wagtail.search.queryset import SearchableQuerySetMixin
 
+# The number of pages that PageQuerySet.specific() converts to their specific types at once
+SPECIFIC_CHUNK_SIZE = 1000
+
 
 class TreeQuerySet(MP_NodeQuerySet):
     """
@@ -127,6 +133,8 @@ class TreeQuerySet(MP_NodeQuerySet):
 
 
 class PageQuerySet(SearchableQuerySetMixin, TreeQuerySet):
+    _specific_deferred_fields = ()
+
     def live_q(self):
         return Q(live=True)
 
@@ -336,15 +344,37 @@ class PageQuerySet(SearchableQuerySetMixin, TreeQuerySet):
         for page in self.live():
             page.unpublish()
 
-    def specific(self):
+    def specific(self, defer=None):
         """
         This efficiently gets all the specific pages for the queryset, using
         the minimum number of queries.
+
+        ``defer`` may be given as a list of field names which should not be
+        loaded on the specific page models (such as large body fields); these
+        will be fetched from the database if they are accessed later on.
         """
         clone = self._clone()
         clone._iterable_class = SpecificIterable
+        if defer is not None:
+            clone._specific_deferred_fields = tuple(defer)
         return clone
 
+    def _clone(self, *args, **kwargs):
+        clone = super()._clone(*args, **kwargs)
+        clone._specific_deferred_fields = self._specific_deferred_fields
+        return clone
+
+    def get_urls(self, request=None, current_site=None):
+        """
+        Return a dict mapping the IDs of the pages in this queryset to their URLs,
+        as returned by ``Page.get_url``. The site root paths are only looked up
+        once for the whole queryset.
+        """
+        return {
+            page.pk: url
+            for page, url in get_page_urls(self, request=request, current_site=current_site)
+        }
+
     def in_site(self, site):
         """
         This filters the QuerySet to only contain pages within the specified site.
@@ -352,36 +382,135 @@ class PageQuerySet(SearchableQuerySetMixin, TreeQuerySet):
         return self.descendant_of(site.root_page, inclusive=True)
 
 
-def specific_iterator(qs):
+def _chunks(iterable, chunk_size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _get_specific_pages(model, pages, deferred_fields=()):
     """
-    This efficiently iterates all the specific pages in a queryset, using
-    the minimum number of queries.
+    Convert a list of pages (all instances of the same base model) into
+    instances of ``model``, a subclass of that base model. Only the fields
+    that are specific to ``model`` are loaded from the database; everything
+    else is copied over from the pages that have already been fetched.
 
-    This should be called from ``PageQuerySet.specific``
+    Returns a dict mapping the page IDs to the specific page instances.
     """
-    pks_and_types = qs.values_list('pk', 'content_type')
-    pks_by_type = defaultdict(list)
-    for pk, content_type in pks_and_types:
-        pks_by_type[content_type].append(pk)
+    base_model = type(pages[0])
+    db = pages[0]._state.db
+    base_fields = set(base_model._meta.concrete_fields)
+    specific_fields = [
+        field for field in model._meta.concrete_fields
+        if field not in base_fields and not (
+            field.name in deferred_fields or field.attname in deferred_fields
+        )
+    ]
+    specific_attnames = [field.attname for field in specific_fields]
+
+    # As no fields from the base model are selected, this doesn't join back
+    # to the base model's table
+    specific_values = {
+        row[0]: dict(zip(specific_attnames, row[1:]))
+        for row in model._base_manager.using(db).filter(
+            pk__in=[page.pk for page in pages]
+        ).values_list('pk', *specific_attnames)
+    }
+
+    specific_pages = {}
+    for page in pages:
+        values = specific_values.get(page.pk)
+        if values is None:
+            # The specific model's row is missing, so the best we can do is
+            # return the page unchanged
+            specific_pages[page.pk] = page
+            continue
+
+        # Fields which were deferred on the original page (or are listed in
+        # deferred_fields) are left deferred on the specific page
+        field_values = [
+            values[field.attname] if field.attname in values
+            else page.__dict__.get(field.attname, DEFERRED)
+            for field in model._meta.concrete_fields
+        ]
+        specific_page = model.from_db(db, [
+            field.attname for field, value in zip(model._meta.concrete_fields, field_values)
+            if value is not DEFERRED
+        ], field_values)
+
+        # Copy over any related objects that were loaded with select_related
+        if hasattr(page._state, 'fields_cache'):
+            specific_page._state.fields_cache.update(page._state.fields_cache)
 
-    # Content types are cached by ID, so this will not run any queries.
-    content_types = {pk: ContentType.objects.get_for_id(pk)
-                     for _, pk in pks_and_types}
+        specific_pages[page.pk] = specific_page
 
-    # Get the specific instances of all pages, one model class at a time.
-    pages_by_type = {}
-    for content_type, pks in pks_by_type.items():
-        # look up model class for this content type, falling back on the original
-        # model (i.e. Page) if the more specific one is missing
-        model = content_types[content_type].model_class() or qs.model
-        pages = model.objects.filter(pk__in=pks)
-        pages_by_type[content_type] = {page.pk: page for page in pages}
+    return specific_pages
 
-    # Yield all of the pages, in the order they occurred in the original query.
-    for pk, content_type in pks_and_types:
-        yield pages_by_type[content_type][pk]
+
+def specific_iterator(qs, chunked_fetch=False, chunk_size=SPECIFIC_CHUNK_SIZE):
+    """
+    This efficiently iterates all the specific pages in a queryset, using
+    the minimum number of queries.
+
+    The pages are fetched from the queryset as normal, then converted to their
+    specific types in chunks of ``chunk_size``, running one query per page type
+    in each chunk to fetch just the fields belonging to that type. If
+    ``chunked_fetch`` is set, the original queryset is also read in chunks
+    (through ``QuerySet.iterator``), so that memory use stays bounded.
+
+    This should be called from ``PageQuerySet.specific``
+    """
+    base_qs = qs._clone()
+    base_qs._iterable_class = ModelIterable
+    # Related objects are prefetched on the specific pages instead
+    base_qs._prefetch_related_lookups = ()
+
+    annotation_names = list(qs.query.annotation_select)
+
+    for pages in _chunks(base_qs.iterator() if chunked_fetch else base_qs, chunk_size):
+        pages_by_type = defaultdict(list)
+        for page in pages:
+            pages_by_type[page.content_type_id].append(page)
+
+        # Get the specific instances of all pages, one model class at a time.
+        specific_pages = {}
+        for content_type_id, pages_of_type in pages_by_type.items():
+            # Content types are cached by ID, so this will not run any queries.
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+
+            if model is None or model is qs.model:
+                # Either the pages are already the most specific type, or we can't
+                # locate a model class for this content type; either way, the best
+                # we can do is return the pages unchanged
+                specific_pages.update((page.pk, page) for page in pages_of_type)
+            elif issubclass(model, qs.model):
+                specific_pages.update(_get_specific_pages(
+                    model, pages_of_type, qs._specific_deferred_fields))
+            else:
+                specific_pages.update(
+                    (page.pk, page)
+                    for page in model.objects.filter(pk__in=[page.pk for page in pages_of_type])
+                )
+
+        # Yield all of the pages, in the order they occurred in the original query.
+        for page in pages:
+            specific_page = specific_pages[page.pk]
+            for name in annotation_names:
+                setattr(specific_page, name, getattr(page, name))
+            yield specific_page
 
 
 class SpecificIterable(BaseIterable):
     def __iter__(self):
-        return specific_iterator(self.queryset)
+        # chunked_fetch is set by QuerySet.iterator(), and chunk_size too on Django 2.0+.
+        # chunk_size always has a value (Django's default of 100), so it's only used
+        # if iterator() was called; otherwise the pages are fetched in larger chunks
+        chunked_fetch = getattr(self, 'chunked_fetch', False)
+        return specific_iterator(
+            self.queryset,
+            chunked_fetch=chunked_fetch,
+            chunk_size=getattr(self, 'chunk_size', SPECIFIC_CHUNK_SIZE) if chunked_fetch else SPECIFIC_CHUNK_SIZE,
+        )
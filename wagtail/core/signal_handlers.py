@@ -1,20 +1,33 @@
 import logging
 
 from django.core.cache import cache
+from django.db import transaction
 from django.db.models.signals import post_delete, post_save, pre_delete
 
-from wagtail.core.models import Page, Site
+from wagtail.core import page_cache
+from wagtail.core.models import Page, PageViewRestriction, Site
+from wagtail.core.signals import page_published, page_unpublished
+from wagtail.core.sites import invalidate_site_routing_table
 
 logger = logging.getLogger('wagtail.core')
 
 
-# Clear the wagtail_site_root_paths from the cache whenever Site records are updated.
-def post_save_site_signal_handler(instance, update_fields=None, **kwargs):
+def clear_site_caches():
     cache.delete('wagtail_site_root_paths')
 
+    # Invalidate the site routing table now, and again once the transaction is
+    # committed, in case another process rebuilt it before the change was visible
+    invalidate_site_routing_table()
+    transaction.on_commit(invalidate_site_routing_table)
+
+
+# Clear the wagtail_site_root_paths and site routing table whenever Site records are updated.
+def post_save_site_signal_handler(instance, update_fields=None, **kwargs):
+    clear_site_caches()
+
 
 def post_delete_site_signal_handler(instance, **kwargs):
-    cache.delete('wagtail_site_root_paths')
+    clear_site_caches()
 
 
 def pre_delete_page_unpublish(sender, instance, **kwargs):
@@ -28,9 +41,23 @@ def post_delete_page_log_deletion(sender, instance, **kwargs):
     logger.info("Page deleted: \"%s\" id=%d", instance.title, instance.id)
 
 
+def clear_page_cache(**kwargs):
+    # Invalidate the page cache now, and again once the transaction is committed,
+    # in case another request cached the old version before the change was visible
+    page_cache.invalidate()
+    transaction.on_commit(page_cache.invalidate)
+
+
 def register_signal_handlers():
     post_save.connect(post_save_site_signal_handler, sender=Site)
     post_delete.connect(post_delete_site_signal_handler, sender=Site)
 
     pre_delete.connect(pre_delete_page_unpublish, sender=Page)
     post_delete.connect(post_delete_page_log_deletion, sender=Page)
+
+    # Clear the page cache whenever the published site changes
+    page_published.connect(clear_page_cache)
+    page_unpublished.connect(clear_page_cache)
+    post_delete.connect(clear_page_cache, sender=Page)
+    post_save.connect(clear_page_cache, sender=PageViewRestriction)
+    post_delete.connect(clear_page_cache, sender=PageViewRestriction)
@@ -1,49 +1,145 @@
+import uuid
+from collections import defaultdict
+
 from django.apps import apps
-from django.db.models import Case, IntegerField, Q, When
+from django.core.cache import cache
+from django.db import router
 
 MATCH_HOSTNAME_PORT = 0
 MATCH_HOSTNAME_DEFAULT = 1
 MATCH_DEFAULT = 2
 MATCH_HOSTNAME = 3
 
+SITE_ROUTING_VERSION_CACHE_KEY = 'wagtail_site_routing_version'
 
-def get_site_for_hostname(hostname, port):
-    """Return the wagtailcore.Site object for the given hostname and port."""
-    Site = apps.get_model('wagtailcore.Site')
 
-    sites = list(Site.objects.annotate(match=Case(
-        # annotate the results by best choice descending
+class SiteRoutingTable:
+    """
+    An in-memory index of all wagtailcore.Site records, used to route a
+    hostname / port pair to a Site without querying the database.
+
+    Only the field values of each site and its root page are kept, and
+    get_site returns new Site and root Page instances every time: model
+    instances (and the root page's cached `specific` object) must not be
+    shared between requests. The table is rebuilt whenever a site or the
+    root page of a site is saved.
+
+    Routing follows the same precedence as the original database query:
+    an exact hostname + port match first, then the default site if it
+    has a matching hostname, then a unique hostname match, then the
+    default site.
+    """
+    def __init__(self, sites):
+        self.sites_by_hostname = defaultdict(list)
+        self.default_site = None
+
+        # Field values of the root page of each site, by ID
+        self.root_pages = {}
+
+        for site in sites:
+            site_data = self.get_field_values(site)
+            self.sites_by_hostname[site.hostname].append(site_data)
+            self.root_pages[site.root_page_id] = self.get_field_values(site.root_page)
+
+            if site.is_default_site:
+                self.default_site = site_data
+
+    @staticmethod
+    def get_field_values(obj):
+        return {
+            field.attname: getattr(obj, field.attname)
+            for field in obj._meta.concrete_fields
+        }
+
+    @staticmethod
+    def make_instance(model, field_values):
+        return model.from_db(router.db_for_read(model), list(field_values.keys()), list(field_values.values()))
+
+    def make_site(self, site_data):
+        Site = apps.get_model('wagtailcore.Site')
+        Page = apps.get_model('wagtailcore.Page')
+
+        site = self.make_instance(Site, site_data)
+        site.root_page = self.make_instance(Page, self.root_pages[site.root_page_id])
+        return site
+
+    def get_site(self, hostname, port):
+        site_data = self.find_site_data(hostname, port)
+        return self.make_site(site_data)
+
+    def find_site_data(self, hostname, port):
+        Site = apps.get_model('wagtailcore.Site')
+
+        hostname_sites = self.sites_by_hostname.get(hostname, [])
 
-        # put exact hostname+port match first
-        When(hostname=hostname, port=port, then=MATCH_HOSTNAME_PORT),
+        # MATCH_HOSTNAME_PORT
+        for site in hostname_sites:
+            if site['port'] == port:
+                return site
 
-        # then put hostname+default (better than just hostname or just default)
-        When(hostname=hostname, is_default_site=True, then=MATCH_HOSTNAME_DEFAULT),
+        default_site = self.default_site
 
-        # then match default with different hostname. there is only ever
-        # one default, so order it above (possibly multiple) hostname
-        # matches so we can use sites[0] below to access it
-        When(is_default_site=True, then=MATCH_DEFAULT),
+        # MATCH_HOSTNAME_DEFAULT
+        if default_site is not None and default_site['hostname'] == hostname:
+            return default_site
 
-        # because of the filter below, if it's not default then its a hostname match
-        default=MATCH_HOSTNAME,
+        # MATCH_HOSTNAME - only used if there's no ambiguity about which
+        # of the sites with this hostname to use
+        if len(hostname_sites) == 1:
+            return hostname_sites[0]
 
-        output_field=IntegerField(),
-    )).filter(Q(hostname=hostname) | Q(is_default_site=True)).order_by(
-        'match'
-    ).select_related(
-        'root_page'
-    ))
+        # MATCH_DEFAULT
+        if default_site is not None:
+            return default_site
 
-    if sites:
-        # if theres a unique match or hostname (with port or default) match
-        if len(sites) == 1 or sites[0].match in (MATCH_HOSTNAME_PORT, MATCH_HOSTNAME_DEFAULT):
-            return sites[0]
+        raise Site.DoesNotExist()
 
-        # if there is a default match with a different hostname, see if
-        # there are many hostname matches. if only 1 then use that instead
-        # otherwise we use the default
-        if sites[0].match == MATCH_DEFAULT:
-            return sites[len(sites) == 2]
 
-    raise Site.DoesNotExist()
+# (version, SiteRoutingTable) for the current process
+_routing_table = (None, None)
+
+
+def get_site_routing_table_version():
+    """
+    Return the version token for the current set of Site records. This is
+    shared between processes through the cache and changed whenever a Site
+    is saved or deleted (see invalidate_site_routing_table).
+    """
+    return cache.get_or_set(SITE_ROUTING_VERSION_CACHE_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_site_routing_table():
+    """
+    Force every process to rebuild its site routing table on next use.
+    """
+    cache.delete(SITE_ROUTING_VERSION_CACHE_KEY)
+
+
+def get_site_routing_table():
+    """
+    Return this process's SiteRoutingTable, rebuilding it from the database
+    if the Site records have changed since it was built.
+    """
+    global _routing_table
+
+    # Read the version before querying the sites, so that a change made
+    # while the table is being built will invalidate it on the next call
+    version = get_site_routing_table_version()
+    table_version, table = _routing_table
+
+    if table is None or table_version != version:
+        Site = apps.get_model('wagtailcore.Site')
+        table = SiteRoutingTable(Site.objects.select_related('root_page'))
+        _routing_table = (version, table)
+
+    return table
+
+
+def get_site_for_hostname(hostname, port):
+    """Return the wagtailcore.Site object for the given hostname and port."""
+    try:
+        port = int(port)
+    except (TypeError, ValueError):
+        port = None
+
+    return get_site_routing_table().get_site(hostname, port)
@@ -6,6 +6,7 @@ from django.utils.safestring import mark_safe
 from wagtail import __version__
 from wagtail.core.models import Page
 from wagtail.core.rich_text import RichText, expand_db_html
+from wagtail.core.url_routing import get_page_urls
 
 register = template.Library()
 
@@ -29,6 +30,23 @@ def pageurl(context, page):
     return page.relative_url(current_site, request=context.get('request'))
 
 
+@register.simple_tag(takes_context=True)
+def pageurls(context, pages):
+    """
+    Returns a list of (page, url) pairs for the given pages, where each URL is
+    the same as would be output by ``pageurl``. This is quicker than calling
+    ``pageurl`` on each page when there are many pages (such as in a menu).
+    """
+    request = context.get('request')
+    current_site = getattr(request, 'site', None)
+
+    if current_site is None:
+        # request.site not available in the current context; fall back on page.url
+        return get_page_urls(pages)
+
+    return get_page_urls(pages, request=request, current_site=current_site)
+
+
 @register.simple_tag(takes_context=True)
 def slugurl(context, slug):
     """Returns the URL for the page that has the given slug."""
@@ -39,6 +39,12 @@ class TestCoreGlobalsAndFilters(TestCase):
             self.render('{{ pageurl(page) }}', {'page': page}),
             page.url)
 
+    def test_pageurls(self):
+        page = Page.objects.get(pk=2)
+        self.assertEqual(
+            self.render('{% for page, url in pageurls(pages) %}{{ url }}{% endfor %}', {'pages': [page]}),
+            page.url)
+
     def test_slugurl(self):
         page = Page.objects.get(pk=2)
         self.assertEqual(
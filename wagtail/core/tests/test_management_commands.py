@@ -3,11 +3,13 @@ from io import StringIO
 
 from django.core import management
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat
 from django.test import TestCase
 from django.utils import timezone
 
 from wagtail.tests.testapp.models import EventPage, SimplePage
-from wagtail.core.models import Page, PageRevision
+from wagtail.core.models import Page, PageRevision, PageUrlPathRewrite
 from wagtail.core.signals import page_published, page_unpublished
 
 
@@ -134,12 +136,44 @@ class TestSetUrlPathsCommand(TestCase):
 
     fixtures = ['test.json']
 
-    def run_command(self):
-        management.call_command('set_url_paths', stdout=StringIO())
+    def run_command(self, **options):
+        output = StringIO()
+        management.call_command('set_url_paths', stdout=output, **options)
+        output.seek(0)
+
+        return output
 
     def test_set_url_paths(self):
         self.run_command()
 
+    def test_fixes_url_paths(self):
+        # Break the url_paths of the events section
+        Page.objects.filter(url_path__startswith='/home/events/').update(
+            url_path=Concat(Value('/broken'), 'url_path'))
+
+        output = self.run_command(batch_size=2)
+
+        christmas_page = EventPage.objects.get(slug='christmas')
+        self.assertEqual(christmas_page.url_path, '/home/events/christmas/')
+        self.assertEqual(Page.objects.filter(url_path__startswith='/broken').count(), 0)
+        self.assertIn("Processed %d of %d pages" % (Page.objects.count(), Page.objects.count()), output.read())
+
+    def test_pending_only(self):
+        events_index = Page.objects.get(url_path='/home/events/')
+        with self.settings(WAGTAIL_DEFER_URL_PATH_UPDATES=True):
+            events_index.slug = 'whats-on'
+            events_index.save()
+
+        self.assertTrue(PageUrlPathRewrite.objects.exists())
+        self.assertTrue(Page.objects.filter(url_path='/home/events/christmas/').exists())
+
+        output = self.run_command(pending_only=True).read()
+
+        self.assertFalse(PageUrlPathRewrite.objects.exists())
+        self.assertTrue(Page.objects.filter(url_path='/home/whats-on/christmas/').exists())
+        self.assertIn("Updated", output)
+        self.assertNotIn("Processed", output)
+
 
 class TestReplaceTextCommand(TestCase):
     fixtures = ['test.json']
@@ -0,0 +1,149 @@
+import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from wagtail.core import page_cache
+from wagtail.core.models import Page, PageViewRestriction
+from wagtail.tests.testapp.models import EventPage, SimplePage
+from wagtail.tests.utils import WagtailTestUtils
+
+
+@override_settings(WAGTAIL_PAGE_CACHE_ENABLED=True)
+class TestPageCache(TestCase, WagtailTestUtils):
+    fixtures = ['test.json']
+
+    def setUp(self):
+        page_cache.reset_stats()
+
+    def test_cache_hit(self):
+        response = self.client.get('/events/christmas/')
+        self.assertContains(response, '<h1>Christmas</h1>')
+        self.assertEqual(page_cache.get_stats(), {'hits': 0, 'misses': 1})
+
+        response = self.client.get('/events/christmas/')
+        self.assertContains(response, '<h1>Christmas</h1>')
+        self.assertEqual(page_cache.get_stats(), {'hits': 1, 'misses': 1})
+
+    @override_settings(WAGTAIL_PAGE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self.client.get('/events/christmas/')
+        self.client.get('/events/christmas/')
+
+        self.assertEqual(page_cache.get_stats(), {'hits': 0, 'misses': 0})
+
+    def test_cache_is_keyed_on_query_string(self):
+        self.client.get('/events/christmas/')
+        self.client.get('/events/christmas/?foo=bar')
+
+        self.assertEqual(page_cache.get_stats(), {'hits': 0, 'misses': 2})
+
+    @override_settings(WAGTAIL_PAGE_CACHE_VARY=['HTTP_ACCEPT_LANGUAGE'])
+    def test_vary_headers(self):
+        self.client.get('/events/christmas/', HTTP_ACCEPT_LANGUAGE='en')
+        self.client.get('/events/christmas/', HTTP_ACCEPT_LANGUAGE='fr')
+        self.client.get('/events/christmas/', HTTP_ACCEPT_LANGUAGE='en')
+
+        self.assertEqual(page_cache.get_stats(), {'hits': 1, 'misses': 2})
+
+    def test_publish_invalidates_cache(self):
+        self.client.get('/events/christmas/')
+
+        christmas_page = EventPage.objects.get(url_path='/home/events/christmas/')
+        christmas_page.title = "Christmas Day"
+        christmas_page.save_revision().publish()
+
+        response = self.client.get('/events/christmas/')
+        self.assertContains(response, '<h1>Christmas Day</h1>')
+        self.assertEqual(page_cache.get_stats(), {'hits': 0, 'misses': 2})
+
+    def test_unpublish_invalidates_cache(self):
+        self.client.get('/events/christmas/')
+
+        EventPage.objects.get(url_path='/home/events/christmas/').unpublish()
+
+        response = self.client.get('/events/christmas/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_move_invalidates_cache(self):
+        self.client.get('/events/christmas/')
+
+        christmas_page = Page.objects.get(url_path='/home/events/christmas/')
+        christmas_page.move(Page.objects.get(url_path='/home/'), pos='last-child')
+
+        response = self.client.get('/events/christmas/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_publish_invalidates_cache_on_commit(self):
+        christmas_page = EventPage.objects.get(url_path='/home/events/christmas/')
+
+        with mock.patch('wagtail.core.signal_handlers.transaction.on_commit') as on_commit:
+            christmas_page.save_revision().publish()
+
+        on_commit.assert_any_call(page_cache.invalidate)
+
+    def test_move_invalidates_cache_on_commit(self):
+        christmas_page = Page.objects.get(url_path='/home/events/christmas/')
+
+        with mock.patch('wagtail.core.models.transaction.on_commit') as on_commit:
+            christmas_page.move(Page.objects.get(url_path='/home/'), pos='last-child')
+
+        on_commit.assert_any_call(page_cache.invalidate)
+
+    def test_logged_in_user_bypasses_cache(self):
+        self.login()
+
+        self.client.get('/events/christmas/')
+        self.client.get('/events/christmas/')
+
+        self.assertEqual(page_cache.get_stats(), {'hits': 0, 'misses': 0})
+
+    def test_private_page_is_not_cached(self):
+        secret_plans_page = SimplePage.objects.get(url_path='/home/secret-plans/')
+        restriction = PageViewRestriction.objects.create(
+            page=secret_plans_page,
+            restriction_type=PageViewRestriction.PASSWORD,
+            password='swordfish',
+        )
+
+        self.client.post(
+            reverse('wagtailcore_authenticate_with_password', args=[restriction.id, secret_plans_page.id]),
+            {'password': 'swordfish', 'return_url': '/secret-plans/'}
+        )
+
+        # The page is visible to this user, but must not be cached for others
+        response = self.client.get('/secret-plans/')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/secret-plans/')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(page_cache.get_stats(), {'hits': 0, 'misses': 2})
+
+    def test_restriction_invalidates_cache(self):
+        self.client.get('/secret-plans/')
+
+        PageViewRestriction.objects.create(
+            page=SimplePage.objects.get(url_path='/home/secret-plans/'),
+            restriction_type=PageViewRestriction.PASSWORD,
+            password='swordfish',
+        )
+
+        response = self.client.get('/secret-plans/')
+        self.assertContains(response, "You need a password to access this page.")
+
+    def test_form_page_is_not_cached(self):
+        self.client.get('/contact-us/')
+        self.client.get('/contact-us/')
+
+        self.assertEqual(page_cache.get_stats(), {'hits': 0, 'misses': 2})
+
+    def test_post_bypasses_cache(self):
+        self.client.get('/events/christmas/')
+        self.client.post('/events/christmas/')
+
+        self.assertEqual(page_cache.get_stats(), {'hits': 0, 'misses': 1})
+
+    def test_not_found_is_not_cached(self):
+        self.client.get('/events/quinquagesima/')
+        self.client.get('/events/quinquagesima/')
+
+        self.assertEqual(page_cache.get_stats(), {'hits': 0, 'misses': 2})
@@ -1,15 +1,17 @@
 import datetime
 import json
 
+import mock
 import pytz
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.http import Http404, HttpRequest
 from django.test import Client, TestCase
 from django.test.client import RequestFactory
-from django.test.utils import override_settings
+from django.test.utils import CaptureQueriesContext, override_settings
 from freezegun import freeze_time
 
 from wagtail.tests.testapp.models import (
@@ -20,7 +22,9 @@ from wagtail.tests.testapp.models import (
     PageWithExcludedCopyField, SimplePage, SingleEventPage, SingletonPage,
     StandardIndex, TaggedPage)
 from wagtail.tests.utils import WagtailTestUtils
-from wagtail.core.models import Page, PageManager, Site, get_page_models
+from wagtail.core.models import Page, PageManager, PageUrlPathRewrite, Site, get_page_models
+from wagtail.core.sites import get_site_routing_table
+from wagtail.core.url_routing import RouteResult
 
 
 def get_ct(model):
@@ -131,6 +135,10 @@ class TestSiteRouting(TestCase):
         self.unrecognised_port = '8000'
         self.unrecognised_hostname = 'unknown.site.com'
 
+        # Build the site routing table up front, so that the only query made by
+        # find_for_request is the version lookup from the (database) cache
+        get_site_routing_table()
+
     def test_no_host_header_routes_to_default_site(self):
         # requests without a Host: header should be directed to the default site
         request = HttpRequest()
@@ -355,6 +363,74 @@ class TestRouting(TestCase):
         with self.assertRaises(Http404):
             homepage.route(request, ['events', 'tentative-unpublished-event'])
 
+    def test_route_by_url_path(self):
+        homepage = Page.objects.get(url_path='/home/')
+        event_page = EventPage.objects.get(url_path='/home/secret-plans/steal-underpants/')
+
+        request = HttpRequest()
+        request.path = '/secret-plans/steal-underpants/'
+
+        # One query to find the pages along the path, one to fetch the specific page
+        with self.assertNumQueries(2):
+            (found_page, args, kwargs) = homepage.route_by_url_path(request, ['secret-plans', 'steal-underpants'])
+        self.assertEqual(found_page, event_page)
+        self.assertIsInstance(found_page, EventPage)
+
+    def test_route_by_url_path_to_site_root(self):
+        homepage = Page.objects.get(url_path='/home/')
+
+        request = HttpRequest()
+        request.path = '/'
+        (found_page, args, kwargs) = homepage.route_by_url_path(request, [])
+        self.assertEqual(found_page, homepage)
+
+    def test_route_by_url_path_to_unknown_page_returns_404(self):
+        homepage = Page.objects.get(url_path='/home/')
+
+        request = HttpRequest()
+        request.path = '/events/quinquagesima/'
+        with self.assertRaises(Http404):
+            homepage.route_by_url_path(request, ['events', 'quinquagesima'])
+
+        # a missing page part way along the path should also return a 404
+        request.path = '/quinquagesima/christmas/'
+        with self.assertRaises(Http404):
+            homepage.route_by_url_path(request, ['quinquagesima', 'christmas'])
+
+    def test_route_by_url_path_to_unpublished_page_returns_404(self):
+        homepage = Page.objects.get(url_path='/home/')
+
+        request = HttpRequest()
+        request.path = '/events/tentative-unpublished-event/'
+        with self.assertRaises(Http404):
+            homepage.route_by_url_path(request, ['events', 'tentative-unpublished-event'])
+
+    def test_route_by_url_path_does_not_leave_subtree(self):
+        events_page = Page.objects.get(url_path='/home/events/')
+
+        # /home/events/about-us/ doesn't exist, even though /home/about-us/ does
+        request = HttpRequest()
+        request.path = '/about-us/'
+        with self.assertRaises(Http404):
+            events_page.route_by_url_path(request, ['about-us'])
+
+    def test_route_by_url_path_defers_to_overridden_route(self):
+        homepage = Page.objects.get(url_path='/home/')
+        events_page = Page.objects.get(url_path='/home/events/')
+        christmas_page = EventPage.objects.get(url_path='/home/events/christmas/')
+
+        def route(page, request, path_components):
+            return RouteResult(christmas_page, args=path_components)
+
+        request = HttpRequest()
+        request.path = '/events/some/custom/path/'
+        with mock.patch.object(EventIndex, 'route', route):
+            (found_page, args, kwargs) = homepage.route_by_url_path(request, ['events', 'some', 'custom', 'path'])
+
+        self.assertEqual(found_page, christmas_page)
+        self.assertEqual(args, ['some', 'custom', 'path'])
+        self.assertEqual(events_page.specific_class, EventIndex)
+
     # Override CACHES so we don't generate any cache-related SQL queries (tests use DatabaseCache
     # otherwise) and so cache.get will always return None.
     @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
@@ -548,6 +624,149 @@ class TestMovePage(TestCase):
         self.assertEqual(christmas.url_path, '/home/about-us/events/christmas/')
 
 
+class TestUrlPathRewrite(TestCase):
+    fixtures = ['test.json']
+
+    def setUp(self):
+        self.events_index = EventIndex.objects.get(url_path='/home/events/')
+        self.event_ids = list(self.events_index.get_descendants().values_list('id', flat=True))
+
+    def change_events_slug(self):
+        self.events_index.slug = 'whats-on'
+        self.events_index.save()
+
+    def assertEventUrlPaths(self, prefix):
+        for url_path in Page.objects.filter(id__in=self.event_ids).values_list('url_path', flat=True):
+            self.assertTrue(url_path.startswith(prefix), url_path)
+
+    def test_rewrite_immediately(self):
+        self.change_events_slug()
+
+        self.assertEventUrlPaths('/home/whats-on/')
+        self.assertFalse(PageUrlPathRewrite.objects.exists())
+
+    def test_progress_callback(self):
+        progress = []
+        rewrite = PageUrlPathRewrite(
+            page=self.events_index, old_url_path='/home/events/', new_url_path='/home/whats-on/')
+        num_updated = rewrite.run(
+            batch_size=2, progress_callback=lambda rewrite, num_updated: progress.append(num_updated))
+
+        self.assertEqual(num_updated, len(self.event_ids))
+        self.assertEqual(progress[-1], len(self.event_ids))
+        self.assertEqual(len(progress), len(self.event_ids) // 2 + 1)
+
+    def test_resume_rewrite(self):
+        rewrite = PageUrlPathRewrite.objects.create(
+            page=self.events_index, old_url_path='/home/events/', new_url_path='/home/whats-on/')
+        christmas_page = EventPage.objects.get(url_path='/home/events/christmas/')
+
+        # Pretend that the rewrite was interrupted after updating the christmas page
+        Page.objects.filter(id=christmas_page.id).update(url_path='/home/whats-on/christmas/')
+        rewrite.last_path = christmas_page.path
+        rewrite.save()
+
+        num_updated = PageUrlPathRewrite.objects.get().run()
+
+        self.assertEventUrlPaths('/home/whats-on/')
+        self.assertEqual(
+            num_updated,
+            Page.objects.filter(id__in=self.event_ids, path__gt=christmas_page.path).count()
+        )
+        self.assertFalse(PageUrlPathRewrite.objects.exists())
+
+    @override_settings(WAGTAIL_DEFER_URL_PATH_UPDATES=True)
+    def test_deferred_rewrite(self):
+        self.change_events_slug()
+
+        # Descendants keep their old url_path until the rewrite is run
+        self.assertEventUrlPaths('/home/events/')
+        self.assertEqual(PageUrlPathRewrite.objects.count(), 1)
+
+        # but their URLs are already correct
+        christmas_page = EventPage.objects.get(id__in=self.event_ids, slug='christmas')
+        self.assertEqual(christmas_page.url, '/whats-on/christmas/')
+        self.assertEqual(
+            Page.objects.filter(id=christmas_page.id).get_urls(),
+            {christmas_page.id: '/whats-on/christmas/'}
+        )
+
+        # and they are served at their new URL
+        response = self.client.get('/whats-on/christmas/')
+        self.assertContains(response, '<h1>Christmas</h1>')
+        response = self.client.get('/events/christmas/')
+        self.assertEqual(response.status_code, 404)
+
+        # New children of a page with a pending rewrite get the new url_path
+        christmas_page.add_child(instance=SimplePage(title="Mince pies", slug='mince-pies', content="hello"))
+        self.assertEqual(
+            Page.objects.get(slug='mince-pies').url_path,
+            '/home/whats-on/christmas/mince-pies/'
+        )
+
+        PageUrlPathRewrite.run_pending()
+
+        self.assertEventUrlPaths('/home/whats-on/')
+        self.assertFalse(PageUrlPathRewrite.objects.exists())
+
+    @override_settings(WAGTAIL_DEFER_URL_PATH_UPDATES=True)
+    def test_deferred_rewrites_of_ancestor_and_descendant(self):
+        christmas_page = EventPage.objects.get(url_path='/home/events/christmas/')
+        christmas_page.add_child(instance=SimplePage(title="Mince pies", slug='mince-pies', content="hello"))
+
+        self.change_events_slug()
+
+        # The christmas page's url_path in the database is out of date when its slug is changed
+        christmas_page = EventPage.objects.get(id=christmas_page.id)
+        christmas_page.slug = 'xmas'
+        christmas_page.save()
+        self.assertEqual(christmas_page.url_path, '/home/whats-on/xmas/')
+
+        mince_pies_page = Page.objects.get(slug='mince-pies')
+        self.assertEqual(mince_pies_page.url, '/whats-on/xmas/mince-pies/')
+
+        PageUrlPathRewrite.run_pending(batch_size=2)
+
+        self.assertEqual(Page.objects.get(slug='mince-pies').url_path, '/home/whats-on/xmas/mince-pies/')
+        self.assertEventUrlPaths('/home/whats-on/')
+
+    @override_settings(WAGTAIL_DEFER_URL_PATH_UPDATES=True)
+    def test_pending_rewrites_are_cached(self):
+        def count_rewrite_queries():
+            with CaptureQueriesContext(connection) as queries:
+                pending = PageUrlPathRewrite.get_pending()
+
+            return pending, len([query for query in queries if 'wagtailcore_pageurlpathrewrite' in query['sql']])
+
+        count_rewrite_queries()
+        self.assertEqual(count_rewrite_queries(), ([], 0))
+
+        # Creating a rewrite reloads the list
+        self.change_events_slug()
+        pending, num_queries = count_rewrite_queries()
+        self.assertEqual([rewrite.page_id for rewrite in pending], [self.events_index.id])
+        self.assertEqual(num_queries, 1)
+        self.assertEqual(count_rewrite_queries()[1], 0)
+
+        # and so does completing it
+        PageUrlPathRewrite.run_pending()
+        self.assertEqual(count_rewrite_queries(), ([], 1))
+
+    @override_settings(WAGTAIL_DEFER_URL_PATH_UPDATES=True)
+    def test_deferred_rewrites_of_descendant_and_ancestor(self):
+        christmas_page = EventPage.objects.get(url_path='/home/events/christmas/')
+        christmas_page.add_child(instance=SimplePage(title="Mince pies", slug='mince-pies', content="hello"))
+        christmas_page.slug = 'xmas'
+        christmas_page.save()
+
+        self.change_events_slug()
+
+        PageUrlPathRewrite.run_pending(batch_size=2)
+
+        self.assertEqual(Page.objects.get(id=christmas_page.id).url_path, '/home/whats-on/xmas/')
+        self.assertEqual(Page.objects.get(slug='mince-pies').url_path, '/home/whats-on/xmas/mince-pies/')
+
+
 class TestPrevNextSiblings(TestCase):
     fixtures = ['test.json']
 
@@ -1,8 +1,11 @@
+import mock
 from django.contrib.contenttypes.models import ContentType
+from django.db.models import F
 from django.test import TestCase
 
 from wagtail.tests.testapp.models import EventPage, SimplePage, SingleEventPage
 from wagtail.core.models import Page, PageViewRestriction, Site
+from wagtail.core.query import SPECIFIC_CHUNK_SIZE, SpecificIterable, specific_iterator
 from wagtail.core.signals import page_unpublished
 from wagtail.search.query import MATCH_ALL
 
@@ -619,6 +622,103 @@ class TestSpecificQuery(TestCase):
             Page.objects.get(url_path='/home/other/').specific,
         ])
 
+    def test_specific_does_not_refetch_base_fields(self):
+        pages = list(Page.objects.filter(url_path='/home/events/christmas/').specific())
+
+        # The page's title came from the first query; the second only fetches
+        # fields which are specific to EventPage
+        with self.assertNumQueries(0):
+            self.assertEqual(pages[0].title, "Christmas")
+            self.assertEqual(pages[0].location, "The North Pole")
+
+    def test_specific_with_defer(self):
+        with self.assertNumQueries(2):
+            pages = list(Page.objects.type(EventPage).specific(defer=['body']))
+
+        self.assertEqual(len(pages), 4)
+
+        for page in pages:
+            self.assertIsInstance(page, EventPage)
+            self.assertEqual(page.get_deferred_fields(), {'body'})
+
+        # Deferred fields are fetched when accessed
+        christmas_page = next(page for page in pages if page.url_path == '/home/events/christmas/')
+        body = EventPage.objects.get(id=christmas_page.id).body
+        with self.assertNumQueries(1):
+            self.assertEqual(christmas_page.body, body)
+
+    def test_specific_with_defer_after_filtering(self):
+        pages = list(Page.objects.specific(defer=['body']).type(EventPage).live())
+
+        for page in pages:
+            self.assertEqual(page.get_deferred_fields(), {'body'})
+
+    def test_specific_keeps_annotations(self):
+        pages = list(Page.objects.type(EventPage).annotate(title_copy=F('title')).specific())
+
+        for page in pages:
+            self.assertIsInstance(page, EventPage)
+            self.assertEqual(page.title_copy, page.title)
+
+    def test_specific_keeps_select_related(self):
+        pages = list(Page.objects.type(EventPage).select_related('content_type').specific())
+
+        with self.assertNumQueries(0):
+            for page in pages:
+                self.assertEqual(page.content_type.model, 'eventpage')
+
+    def test_specific_from_subclass_queryset(self):
+        with self.assertNumQueries(1):
+            pages = list(EventPage.objects.all().specific())
+
+        self.assertEqual(len(pages), 4)
+        for page in pages:
+            self.assertIs(type(page), EventPage)
+
+    def test_specific_iterator(self):
+        root = Page.objects.get(url_path='/home/')
+        expected_pages = [page.specific for page in root.get_descendants()]
+
+        # Pages are converted to their specific types a chunk at a time
+        with self.assertNumQueries(6):
+            # One query for the pages, plus one per page type in each chunk:
+            # [EventIndex, EventPage], [EventPage], [SimplePage], [EventPage]
+            pages = list(specific_iterator(root.get_descendants(), chunk_size=2))
+
+        self.assertEqual(pages, expected_pages)
+        self.assertEqual([type(page) for page in pages], [type(page) for page in expected_pages])
+
+    def test_specific_queryset_iterator(self):
+        root = Page.objects.get(url_path='/home/')
+        expected_pages = [page.specific for page in root.get_descendants()]
+
+        pages = list(root.get_descendants().specific().iterator())
+
+        self.assertEqual(pages, expected_pages)
+        self.assertEqual([type(page) for page in pages], [type(page) for page in expected_pages])
+
+    def test_specific_chunk_size(self):
+        root = Page.objects.get(url_path='/home/')
+
+        with mock.patch('wagtail.core.query.specific_iterator', wraps=specific_iterator) as iterator:
+            list(root.get_descendants().specific())
+            list(root.get_descendants().specific().iterator(chunk_size=2))
+
+        # Django's default iterator() chunk size is only used if iterator() was called
+        self.assertEqual(iterator.call_args_list[0][1], {'chunked_fetch': False, 'chunk_size': SPECIFIC_CHUNK_SIZE})
+        self.assertEqual(iterator.call_args_list[1][1], {'chunked_fetch': True, 'chunk_size': 2})
+
+    def test_specific_iterator_without_chunk_size(self):
+        # Django 1.11's iterables don't have a chunk_size
+        root = Page.objects.get(url_path='/home/')
+        expected_pages = [page.specific for page in root.get_descendants()]
+
+        iterable = SpecificIterable(root.get_descendants(), chunked_fetch=True)
+        if hasattr(iterable, 'chunk_size'):
+            del iterable.chunk_size
+
+        self.assertEqual(list(iterable), expected_pages)
+
 
 class TestFirstCommonAncestor(TestCase):
     """
@@ -1,8 +1,12 @@
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.http.request import HttpRequest
 from django.test import TestCase, override_settings
 
 from wagtail.core.models import Page, Site
+from wagtail.core.sites import (
+    SITE_ROUTING_VERSION_CACHE_KEY, SiteRoutingTable, get_site_for_hostname,
+    get_site_routing_table)
 
 
 class TestSiteNaturalKey(TestCase):
@@ -91,6 +95,98 @@ class TestFindSiteForRequest(TestCase):
             self.assertEqual(Site.find_for_request(request), self.site)
 
 
+class TestSiteRoutingTable(TestCase):
+    def setUp(self):
+        self.default_site = Site.objects.get()
+        self.site = Site.objects.create(hostname='example.com', port=80, root_page=Page.objects.get(pk=2))
+
+    def test_table_is_reused(self):
+        table = get_site_routing_table()
+        self.assertIs(get_site_routing_table(), table)
+
+    def test_lookup_does_not_query_sites(self):
+        get_site_routing_table()
+        cache.delete('wagtail_site_root_paths')
+
+        # Only the routing table version should be looked up from the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(get_site_for_hostname('example.com', 80), self.site)
+
+    def test_root_page_is_loaded(self):
+        site = get_site_for_hostname('example.com', 80)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(site.root_page.id, 2)
+
+    def test_sites_arent_shared(self):
+        site = get_site_for_hostname('example.com', 80)
+
+        other_site = get_site_for_hostname('example.com', 80)
+        self.assertIsNot(other_site, site)
+        self.assertIsNot(other_site.root_page, site.root_page)
+
+    def test_root_page_changes_are_seen(self):
+        get_site_for_hostname('example.com', 80).root_page.specific
+
+        root_page = Page.objects.get(pk=2).specific
+        root_page.title = "New title"
+        root_page.save_revision().publish()
+
+        site = get_site_for_hostname('example.com', 80)
+        self.assertEqual(site.root_page.title, "New title")
+        self.assertEqual(site.root_page.specific.title, "New title")
+
+    def test_saving_site_invalidates_table(self):
+        table = get_site_routing_table()
+        self.site.hostname = 'other.example.com'
+        self.site.save()
+
+        self.assertIsNot(get_site_routing_table(), table)
+        self.assertEqual(get_site_for_hostname('other.example.com', 80), self.site)
+        self.assertEqual(get_site_for_hostname('example.com', 80), self.default_site)
+
+    def test_deleting_site_invalidates_table(self):
+        get_site_routing_table()
+        self.site.delete()
+
+        self.assertEqual(get_site_for_hostname('example.com', 80), self.default_site)
+
+    def test_version_change_invalidates_table(self):
+        table = get_site_routing_table()
+        cache.set(SITE_ROUTING_VERSION_CACHE_KEY, 'changed-elsewhere')
+
+        self.assertIsNot(get_site_routing_table(), table)
+
+    def test_string_port(self):
+        self.assertEqual(get_site_for_hostname('example.com', '80'), self.site)
+
+    def test_invalid_port(self):
+        self.assertEqual(get_site_for_hostname('example.com', None), self.site)
+        self.assertEqual(get_site_for_hostname('example.com', 'abc'), self.site)
+
+    def test_ambiguous_hostname_without_default_site(self):
+        root_page = Page.objects.get(pk=2)
+        sites = [
+            Site(hostname='example.com', port=8000, root_page=root_page),
+            Site(hostname='example.com', port=8001, root_page=root_page),
+        ]
+        table = SiteRoutingTable(sites)
+
+        self.assertEqual(table.get_site('example.com', 8001).port, 8001)
+
+        with self.assertRaises(Site.DoesNotExist):
+            table.get_site('example.com', 8002)
+
+        with self.assertRaises(Site.DoesNotExist):
+            table.get_site('unknown.com', 80)
+
+    def test_unique_hostname_without_default_site(self):
+        site = Site(hostname='example.com', port=8000, root_page=Page.objects.get(pk=2))
+        table = SiteRoutingTable([site])
+
+        self.assertEqual(table.get_site('example.com', 80).port, 8000)
+
+
 class TestDefaultSite(TestCase):
     def test_create_default_site(self):
         Site.objects.all().delete()
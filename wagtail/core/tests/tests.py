@@ -1,12 +1,14 @@
 from django import template
 from django.core.cache import cache
 from django.http import HttpRequest
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.urls import clear_url_caches, reverse
 from django.utils.safestring import SafeText
 
 from wagtail.tests.testapp.models import SimplePage
 from wagtail.core.models import Page, Site
 from wagtail.core.templatetags.wagtailcore_tags import richtext
+from wagtail.core.url_routing import PageUrlResolver
 from wagtail.core.utils import resolve_model_string
 
 
@@ -48,6 +50,88 @@ class TestPageUrlTags(TestCase):
         result = tpl.render(template.Context({'request': HttpRequest()}))
         self.assertIn('<a href="/events/">Events</a>', result)
 
+    def test_pageurls_tag(self):
+        events_page = Page.objects.get(url_path='/home/events/')
+        pages = events_page.get_children().live()
+        tpl = template.Template(
+            '''{% load wagtailcore_tags %}{% pageurls pages as page_urls %}'''
+            '''{% for page, url in page_urls %}<a href="{{ url }}">{{ page.title }}</a>{% endfor %}'''
+        )
+
+        request = HttpRequest()
+        request.site = Site.objects.get(is_default_site=True)
+        result = tpl.render(template.Context({'pages': pages, 'request': request}))
+
+        self.assertIn('<a href="/events/christmas/">Christmas</a>', result)
+        self.assertIn('<a href="/events/saint-patrick/">Saint Patrick</a>', result)
+
+        # no 'request' object in context
+        result = tpl.render(template.Context({'pages': pages}))
+        self.assertIn('<a href="/events/christmas/">Christmas</a>', result)
+
+
+class TestPageUrlResolver(TestCase):
+    fixtures = ['test.json']
+
+    def setUp(self):
+        self.events_page = Page.objects.get(url_path='/home/events/')
+        self.events_site = Site.objects.create(hostname='events.example.com', root_page=self.events_page)
+        self.resolver = PageUrlResolver(Site.get_site_root_paths())
+
+    def test_resolver_matches_get_url_parts(self):
+        for page in Page.objects.all():
+            url_parts = page.get_url_parts()
+            self.assertEqual(self.resolver.get_url_parts(page.url_path), url_parts)
+
+    def test_most_specific_site_wins(self):
+        self.assertEqual(
+            self.resolver.get_url_parts('/home/events/christmas/'),
+            (self.events_site.id, 'http://events.example.com', '/christmas/')
+        )
+        self.assertEqual(
+            self.resolver.get_url_parts('/home/about-us/'),
+            (1, 'http://localhost', '/about-us/')
+        )
+
+    def test_page_outside_sites(self):
+        self.assertIsNone(self.resolver.get_url_parts('/'))
+        self.assertIsNone(self.resolver.get_url_parts('/other-root/about-us/'))
+
+    def test_path_is_quoted_like_reverse(self):
+        url_path = '/home/\u00e9v\u00e9nements/'
+        self.assertEqual(
+            self.resolver.get_url_parts(url_path)[2],
+            reverse('wagtail_serve', args=(url_path[len('/home/'):],))
+        )
+
+    @override_settings(ROOT_URLCONF='wagtail.tests.non_root_urls')
+    def test_non_root_urlconf(self):
+        clear_url_caches()
+        try:
+            resolver = PageUrlResolver(Site.get_site_root_paths())
+            self.assertEqual(resolver.get_url_parts('/home/about-us/'), (1, 'http://localhost', '/site/about-us/'))
+        finally:
+            clear_url_caches()
+
+    def test_queryset_get_urls(self):
+        pages = Page.objects.filter(depth__gt=1)
+
+        # One query for the pages, and one to fetch the site root paths from the cache
+        with self.assertNumQueries(2):
+            urls = pages.get_urls()
+
+        for page in pages:
+            self.assertEqual(urls[page.pk], page.url)
+
+    def test_queryset_get_urls_with_request(self):
+        request = HttpRequest()
+        request.site = self.events_site
+
+        urls = Page.objects.filter(depth__gt=1).get_urls(request=request)
+
+        self.assertEqual(urls[Page.objects.get(url_path='/home/events/christmas/').pk], '/christmas/')
+        self.assertEqual(urls[Page.objects.get(url_path='/home/about-us/').pk], 'http://localhost/about-us/')
+
 
 class TestSiteRootPathsCache(TestCase):
     fixtures = ['test.json']
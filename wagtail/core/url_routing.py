@@ -1,3 +1,11 @@
+from urllib.parse import quote
+
+from django.apps import apps
+from django.urls import reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+from wagtail.core.utils import WAGTAIL_APPEND_SLASH
+
 
 class RouteResult:
     """
@@ -14,3 +22,86 @@ class RouteResult:
 
     def __getitem__(self, index):
         return (self.page, self.args, self.kwargs)[index]
+
+
+class PageUrlResolver:
+    """
+    Translates page url_paths into ``(site_id, root_url, page_path)`` tuples,
+    as returned by ``Page.get_url_parts``, for a given list of site root paths
+    (see ``Site.get_site_root_paths``).
+
+    The site for a page is found by looking up each of the page's ancestor paths
+    (longest first) in a dict of site root paths, and the URL of the
+    ``wagtail_serve`` view is only reversed once, so this is much quicker than
+    calling ``get_url_parts`` on a large number of pages.
+    """
+    def __init__(self, site_root_paths, url_path_rewrites=()):
+        self.site_root_paths = site_root_paths
+
+        # Deferred url_path updates (see PageUrlPathRewrite) that haven't been
+        # applied to the database yet
+        self.url_path_rewrites = url_path_rewrites
+
+        # site_root_paths is ordered with the most specific path first, so
+        # if several sites share a root page, the first one wins
+        self.sites_by_root_path = {}
+        for site_id, root_path, root_url in site_root_paths:
+            self.sites_by_root_path.setdefault(root_path, (site_id, root_url))
+
+        self.serve_url_prefix = reverse('wagtail_serve', args=('',))
+
+    def get_page_url_parts(self, page):
+        url_path = page.url_path
+        for rewrite in self.url_path_rewrites:
+            url_path = rewrite.rewrite_url_path(page.path, url_path)
+
+        return self.get_url_parts(url_path)
+
+    def get_url_parts(self, url_path):
+        root_path = url_path
+        while root_path not in self.sites_by_root_path:
+            if not root_path or root_path == '/':
+                # page is not routable
+                return
+
+            # move on to the parent path
+            root_path = root_path[:root_path.rstrip('/').rfind('/') + 1]
+
+        site_id, root_url = self.sites_by_root_path[root_path]
+
+        # Quote the path in the same way as reverse() would
+        page_path = self.serve_url_prefix + quote(url_path[len(root_path):], safe=RFC3986_SUBDELIMS + '/~:@')
+
+        # Remove the trailing slash from the URL reverse generates if
+        # WAGTAIL_APPEND_SLASH is False and we're not trying to serve
+        # the root path
+        if not WAGTAIL_APPEND_SLASH and page_path != '/':
+            page_path = page_path.rstrip('/')
+
+        return (site_id, root_url, page_path)
+
+
+def get_page_urls(pages, request=None, current_site=None):
+    """
+    Return a list of ``(page, url)`` pairs for the given pages, where ``url``
+    is the result of ``page.get_url(request=request, current_site=current_site)``.
+
+    The site root paths and URL resolver are only looked up once and shared
+    between all of the pages.
+    """
+    pages = list(pages)
+
+    if request is None:
+        Site = apps.get_model('wagtailcore.Site')
+        PageUrlPathRewrite = apps.get_model('wagtailcore.PageUrlPathRewrite')
+        site_root_paths = Site.get_site_root_paths()
+        resolver = PageUrlResolver(site_root_paths, url_path_rewrites=PageUrlPathRewrite.get_pending())
+
+        for page in pages:
+            page._wagtail_cached_site_root_paths = site_root_paths
+            page._wagtail_cached_url_resolver = resolver
+
+    return [
+        (page, page.get_url(request=request, current_site=current_site))
+        for page in pages
+    ]
@@ -2,7 +2,7 @@ from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
 
-from wagtail.core import hooks
+from wagtail.core import hooks, page_cache
 from wagtail.core.forms import PasswordViewRestrictionForm
 from wagtail.core.models import Page, PageViewRestriction
 
@@ -13,15 +13,21 @@ def serve(request, path):
     if not request.site:
         raise Http404
 
+    response = page_cache.get_cached_response(request)
+    if response is not None:
+        return response
+
     path_components = [component for component in path.split('/') if component]
-    page, args, kwargs = request.site.root_page.specific.route(request, path_components)
+    page, args, kwargs = request.site.root_page.route_by_url_path(request, path_components)
 
     for fn in hooks.get_hooks('before_serve_page'):
         result = fn(page, request, args, kwargs)
         if isinstance(result, HttpResponse):
             return result
 
-    return page.serve(request, *args, **kwargs)
+    response = page.serve(request, *args, **kwargs)
+    page_cache.cache_response(request, page, response)
+    return response
 
 
 def authenticate_with_password(request, page_view_restriction_id, page_id):
@@ -16,6 +16,17 @@ class ImageChooserBlock(ChooserBlock):
         from wagtail.images.widgets import AdminImageChooser
         return AdminImageChooser
 
+    def bulk_to_python(self, values):
+        """
+        Return the images for the given list of primary keys. The first time one of them
+        is rendered, the renditions of all of them are fetched in a single query
+        """
+        from wagtail.images.models import LazyRenditionPrefetch
+
+        objects = self.target_model.objects.in_bulk(values)
+        LazyRenditionPrefetch(objects.values())
+        return [objects.get(id) for id in values]  # Keeps the ordering the same as in values.
+
     def render_basic(self, value, context=None):
         if value:
             return get_rendition_or_not_found(value, 'original').img_tag()
@@ -0,0 +1,225 @@
+import logging
+import multiprocessing
+import os
+import re
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.template import engines
+
+from wagtail.images import get_image_model
+from wagtail.images.exceptions import InvalidFilterSpecError
+from wagtail.images.models import Filter, SourceImageIOError
+from wagtail.images.rendition_workers import generate_renditions_now
+
+logger = logging.getLogger('wagtail.images')
+
+# {% image page.photo fill-100x100 class="thumbnail" %}
+DJANGO_IMAGE_TAG_RE = re.compile(r'{%\s*image\s+\S+\s+(.*?)\s*%}')
+
+# {{ image(page.photo, "fill-100x100") }}
+JINJA2_IMAGE_FUNCTION_RE = re.compile(r'\bimage\([^,()]+,\s*["\']([^"\']+)["\']')
+
+
+def find_template_filter_specs():
+    """
+    Return the filter specs used by image tags in all of the project's templates
+    """
+    filter_specs = set()
+
+    for engine in engines.all():
+        for template_dir in engine.template_dirs:
+            for dirpath, dirnames, filenames in os.walk(template_dir):
+                for filename in filenames:
+                    try:
+                        with open(os.path.join(dirpath, filename), encoding='utf-8') as f:
+                            source = f.read()
+                    except (OSError, UnicodeDecodeError):
+                        continue
+
+                    for tag_args in DJANGO_IMAGE_TAG_RE.findall(source):
+                        specs = []
+                        for bit in tag_args.split():
+                            if bit == 'as':
+                                break
+                            if '=' not in bit:
+                                specs.append(bit)
+
+                        if specs:
+                            filter_specs.add('|'.join(specs))
+
+                    filter_specs.update(JINJA2_IMAGE_FUNCTION_RE.findall(source))
+
+    # Skip any specs that are built from template variables or are otherwise invalid
+    valid_filter_specs = set()
+    for filter_spec in filter_specs:
+        try:
+            Filter(spec=filter_spec).operations
+        except InvalidFilterSpecError:
+            continue
+
+        valid_filter_specs.add(filter_spec)
+
+    return valid_filter_specs
+
+
+def generate_renditions(image_id, filter_specs):
+    """
+    Generate the given renditions of an image, returning the number of
+    renditions generated and a list of errors
+    """
+    image = get_image_model().objects.get(id=image_id)
+
+    try:
+        # Generates all of the renditions from a single decode of the original image
+        image.get_renditions(*filter_specs)
+    except SourceImageIOError as e:
+        return 0, ["Image %d: source image file not found (%s)" % (image_id, e)]
+    except Exception:  # noqa
+        logger.exception("Image %d: failed to generate renditions together, generating them separately", image_id)
+    else:
+        return len(filter_specs), []
+
+    # One of the filters failed, so generate the renditions separately to find
+    # out which, without losing the others
+    num_generated = 0
+    errors = []
+    for filter_spec in filter_specs:
+        try:
+            # Don't hand the rendition to a rendition worker and count the placeholder
+            with generate_renditions_now():
+                image.get_rendition(filter_spec)
+        except Exception as e:  # noqa
+            errors.append("Image %d: failed to generate rendition '%s' (%s)" % (image_id, filter_spec, e))
+        else:
+            num_generated += 1
+
+    return num_generated, errors
+
+
+def _generate_renditions(args):
+    return generate_renditions(*args)
+
+
+class Command(BaseCommand):
+
+    help = "Generates renditions of every image for the given filter specs, skipping any that already exist"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'filter_specs', nargs='*',
+            help="The filter specs to generate renditions for. Defaults to WAGTAILIMAGES_PREGENERATE_FILTER_SPECS")
+        parser.add_argument(
+            '--scan-templates', action='store_true', dest='scan_templates', default=False,
+            help="Also generate renditions for the filter specs used by image tags in templates")
+        parser.add_argument(
+            '--processes', type=int, dest='processes', default=1,
+            help="The number of processes to generate renditions in")
+        parser.add_argument(
+            '--chunk-size', type=int, dest='chunk_size', default=100,
+            help="The number of images to fetch from the database at a time")
+        parser.add_argument(
+            '--start-after', type=int, dest='start_after', default=0,
+            help="Only process images with an ID greater than this, to resume an interrupted run")
+
+    def get_filters(self, options):
+        filter_specs = set(options['filter_specs'] or getattr(settings, 'WAGTAILIMAGES_PREGENERATE_FILTER_SPECS', []))
+
+        if options['scan_templates']:
+            filter_specs |= find_template_filter_specs()
+
+        filters = []
+        for filter_spec in sorted(filter_specs):
+            filter = Filter(spec=filter_spec)
+            try:
+                filter.operations
+            except InvalidFilterSpecError as e:
+                raise CommandError("Invalid filter spec '%s': %s" % (filter_spec, e))
+
+            filters.append(filter)
+
+        return filters
+
+    def get_missing_renditions(self, images, filters):
+        """
+        Return a list of (image ID, filter specs) tuples for the renditions of the
+        given images that don't exist yet
+        """
+        Rendition = get_image_model().get_rendition_model()
+
+        existing_renditions = set(
+            Rendition.objects.filter(
+                image_id__in=[image.id for image in images],
+                filter_spec__in=[filter.spec for filter in filters],
+            ).values_list('image_id', 'filter_spec', 'focal_point_key')
+        )
+
+        missing_renditions = []
+        for image in images:
+            filter_specs = [
+                filter.spec for filter in filters
+                if (image.id, filter.spec, filter.get_cache_key(image)) not in existing_renditions
+            ]
+
+            if filter_specs:
+                missing_renditions.append((image.id, filter_specs))
+
+        return missing_renditions
+
+    def handle(self, *args, **options):
+        filters = self.get_filters(options)
+        if not filters:
+            raise CommandError("No filter specs given")
+
+        self.stdout.write("Generating renditions for: %s" % ", ".join(filter.spec for filter in filters))
+
+        images = get_image_model().objects.order_by('id')
+        total = images.filter(id__gt=options['start_after']).count()
+
+        pool = None
+        if options['processes'] > 1:
+            # Child processes must open their own database connections
+            connections.close_all()
+            pool = multiprocessing.Pool(options['processes'])
+
+        start_time = time.time()
+        last_id = options['start_after']
+        num_images = 0
+        num_generated = 0
+        num_errors = 0
+
+        try:
+            while True:
+                chunk = list(images.filter(id__gt=last_id)[:options['chunk_size']])
+                if not chunk:
+                    break
+
+                missing_renditions = self.get_missing_renditions(chunk, filters)
+
+                if pool is not None:
+                    results = pool.imap_unordered(_generate_renditions, missing_renditions)
+                else:
+                    results = (generate_renditions(*args) for args in missing_renditions)
+
+                for chunk_generated, errors in results:
+                    num_generated += chunk_generated
+                    num_errors += len(errors)
+                    for error in errors:
+                        self.stderr.write(error)
+
+                num_images += len(chunk)
+                last_id = chunk[-1].id
+
+                elapsed = time.time() - start_time
+                self.stdout.write(
+                    "Processed %d of %d images, generated %d renditions (%.1f renditions/s). "
+                    "Last image ID: %d" % (num_images, total, num_generated, num_generated / max(elapsed, 0.001), last_id)
+                )
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        self.stdout.write("Done: generated %d renditions, %d errors" % (num_generated, num_errors))
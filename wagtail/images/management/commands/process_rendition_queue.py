@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from wagtail.images.models import RenditionGenerationTask
+from wagtail.images.rendition_workers import generate_rendition
+
+
+class Command(BaseCommand):
+
+    help = "Generates the renditions queued by the DatabaseQueueWorker rendition worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, dest='limit', default=None,
+            help="The maximum number of renditions to generate")
+
+    def handle(self, *args, **options):
+        limit = options['limit']
+        num_generated = 0
+        num_failed = 0
+
+        while limit is None or num_generated + num_failed < limit:
+            task = RenditionGenerationTask.objects.order_by('id').first()
+            if task is None:
+                break
+
+            # Claim the task by deleting it, so that any other processes draining
+            # the queue at the same time will skip it
+            num_deleted, _ = RenditionGenerationTask.objects.filter(id=task.id).delete()
+            if not num_deleted:
+                continue
+
+            try:
+                generate_rendition(task.image_id, task.filter_spec)
+            except Exception as e:
+                self.stderr.write("Failed to generate rendition '%s' of image %d: %s" % (task.filter_spec, task.image_id, e))
+                num_failed += 1
+            else:
+                num_generated += 1
+
+        self.stdout.write("Generated %d renditions (%d failed)" % (num_generated, num_failed))
@@ -0,0 +1,26 @@
+# Generated by Django 2.0.13 on 2026-10-17 07:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailimages', '0019_delete_filter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenditionGenerationTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_id', models.PositiveIntegerField()),
+                ('filter_spec', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='renditiongenerationtask',
+            unique_together={('image_id', 'filter_spec')},
+        ),
+    ]
@@ -21,6 +21,7 @@ from willow.image import Image as WillowImage
 from wagtail.admin.utils import get_object_usage
 from wagtail.core import hooks
 from wagtail.core.models import CollectionMember
+from wagtail.images import rendition_cache, rendition_workers
 from wagtail.images.exceptions import InvalidFilterSpecError
 from wagtail.images.rect import Rect
 from wagtail.search import index
@@ -35,7 +36,58 @@ class SourceImageIOError(IOError):
 
 
 class ImageQuerySet(SearchableQuerySetMixin, models.QuerySet):
-    pass
+    def prefetch_renditions(self, *filters):
+        """
+        Fetch the renditions of every image in this queryset in a single query, so that
+        ``get_rendition`` can return them without querying the database for each one.
+        Filters (or filter specs) can be passed to only fetch those renditions.
+        """
+        Rendition = self.model.get_rendition_model()
+        renditions = Rendition.objects.all()
+
+        if filters:
+            filter_specs = [filter.spec if isinstance(filter, Filter) else filter for filter in filters]
+            renditions = renditions.filter(filter_spec__in=filter_specs)
+
+        return self.prefetch_related(
+            models.Prefetch('renditions', queryset=renditions, to_attr='prefetched_renditions')
+        )
+
+
+class LazyRenditionPrefetch:
+    """
+    Like ImageQuerySet.prefetch_renditions, but for a list of images that have already
+    been fetched, and the renditions aren't fetched until the first time that one of
+    the images needs a rendition.
+    """
+    def __init__(self, images):
+        self.images = [image for image in images if image is not None]
+        self.renditions = None
+
+        for image in self.images:
+            image.prefetched_renditions = _LazyPrefetchedRenditions(self, image)
+
+    def get_renditions(self, image):
+        if self.renditions is None:
+            images_by_id = {image.pk: image for image in self.images}
+            self.renditions = {}
+
+            if images_by_id:
+                Rendition = self.images[0].get_rendition_model()
+                for rendition in Rendition.objects.filter(image_id__in=images_by_id):
+                    rendition.image = images_by_id[rendition.image_id]
+                    self.renditions.setdefault(rendition.image_id, []).append(rendition)
+
+        return self.renditions.get(image.pk, [])
+
+
+class _LazyPrefetchedRenditions:
+    def __init__(self, prefetch, image):
+        self.prefetch = prefetch
+        self.image = image
+
+    def __iter__(self):
+        return iter(self.prefetch.get_renditions(self.image))
 
 
 def get_upload_to(instance, filename):
@@ -249,46 +301,98 @@ class AbstractImage(CollectionMember, index.Indexed, models.Model):
         return cls.renditions.rel.related_model
 
     def get_rendition(self, filter):
+        """
+        Return the rendition of this image for the given filter, generating it if
+        it doesn't exist yet. If a rendition worker is configured, missing renditions
+        are generated in the background instead (unless this is called within
+        rendition_workers.generate_renditions_now()), and a placeholder rendition
+        that links to the image serve view is returned.
+        """
         if isinstance(filter, str):
             filter = Filter(spec=filter)
 
         cache_key = filter.get_cache_key(self)
         Rendition = self.get_rendition_model()
 
+        # Use the renditions fetched by ImageQuerySet.prefetch_renditions, if there are any
+        for rendition in getattr(self, 'prefetched_renditions', []):
+            if rendition.filter_spec == filter.spec and rendition.focal_point_key == cache_key:
+                return rendition
+
+        rendition = rendition_cache.get_rendition(self, filter.spec, cache_key)
+        if rendition is not None:
+            return rendition
+
         try:
             rendition = self.renditions.get(
                 filter_spec=filter.spec,
                 focal_point_key=cache_key,
             )
         except Rendition.DoesNotExist:
+            placeholder = rendition_workers.generate_in_background(self, filter, cache_key)
+            if placeholder is not None:
+                return placeholder
+
             # Generate the rendition image
             generated_image = filter.run(self, BytesIO())
+            rendition = self._create_rendition(filter, cache_key, generated_image)
 
-            # Generate filename
-            input_filename = os.path.basename(self.file.name)
-            input_filename_without_extension, input_extension = os.path.splitext(input_filename)
-
-            # A mapping of image formats to extensions
-            FORMAT_EXTENSIONS = {
-                'jpeg': '.jpg',
-                'png': '.png',
-                'gif': '.gif',
-            }
-
-            output_extension = filter.spec.replace('|', '.') + FORMAT_EXTENSIONS[generated_image.format_name]
-            if cache_key:
-                output_extension = cache_key + '.' + output_extension
-
-            # Truncate filename to prevent it going over 60 chars
-            output_filename_without_extension = input_filename_without_extension[:(59 - len(output_extension))]
-            output_filename = output_filename_without_extension + '.' + output_extension
-
-            rendition, created = self.renditions.get_or_create(
-                filter_spec=filter.spec,
-                focal_point_key=cache_key,
-                defaults={'file': File(generated_image.f, name=output_filename)}
-            )
+        rendition_cache.set_rendition(self, rendition)
+        return rendition
 
+    def get_renditions(self, *filters):
+        """
+        Return a dict of the renditions of this image for the given filters (or filter
+        specs), keyed by filter spec. Any renditions that don't exist yet are generated
+        together, only decoding the original image once (see Filter.run_multiple).
+        """
+        filters = OrderedDict(
+            (filter, Filter(spec=filter)) if isinstance(filter, str) else (filter.spec, filter)
+            for filter in filters
+        )
+        cache_keys = {spec: filter.get_cache_key(self) for spec, filter in filters.items()}
+
+        renditions = {}
+        for rendition in self.renditions.filter(filter_spec__in=filters.keys()):
+            if rendition.focal_point_key == cache_keys[rendition.filter_spec]:
+                renditions[rendition.filter_spec] = rendition
+
+        missing_filters = [filter for spec, filter in filters.items() if spec not in renditions]
+        if missing_filters:
+            generated_images = Filter.run_multiple(missing_filters, self)
+
+            for filter, generated_image in zip(missing_filters, generated_images):
+                rendition = self._create_rendition(filter, cache_keys[filter.spec], generated_image)
+                rendition_cache.set_rendition(self, rendition)
+                renditions[filter.spec] = rendition
+
+        return renditions
+
+    def _create_rendition(self, filter, cache_key, generated_image):
+        # Generate filename
+        input_filename = os.path.basename(self.file.name)
+        input_filename_without_extension, input_extension = os.path.splitext(input_filename)
+
+        # A mapping of image formats to extensions
+        FORMAT_EXTENSIONS = {
+            'jpeg': '.jpg',
+            'png': '.png',
+            'gif': '.gif',
+        }
+
+        output_extension = filter.spec.replace('|', '.') + FORMAT_EXTENSIONS[generated_image.format_name]
+        if cache_key:
+            output_extension = cache_key + '.' + output_extension
+
+        # Truncate filename to prevent it going over 60 chars
+        output_filename_without_extension = input_filename_without_extension[:(59 - len(output_extension))]
+        output_filename = output_filename_without_extension + '.' + output_extension
+
+        rendition, created = self.renditions.get_or_create(
+            filter_spec=filter.spec,
+            focal_point_key=cache_key,
+            defaults={'file': File(generated_image.f, name=output_filename)}
+        )
         return rendition
 
     def is_portrait(self):
@@ -364,46 +468,141 @@ class Filter:
             # Fix orientation of image
             willow = willow.auto_orient()
 
-            env = {
-                'original-format': original_format,
-            }
-            for operation in self.operations:
+            return self._run(willow, image, output, original_format)
+
+    @staticmethod
+    def run_multiple(filters, image, outputs=None):
+        """
+        Apply several filters to an image, only opening and decoding the original
+        image once. Returns the result of ``run`` for each filter, in the same order.
+
+        Filters that only resize the image are applied largest first, each to the
+        smallest already-resized image that is big enough, rather than to the
+        original. If they all produce images that are much smaller than a JPEG
+        original, it is decoded at a reduced size as well.
+        """
+        if outputs is None:
+            outputs = [BytesIO() for filter in filters]
+
+        results = [None] * len(filters)
+
+        with image.get_willow_image() as willow:
+            original_format = willow.format_name
+
+            # Fix orientation of image
+            willow = willow.auto_orient()
+            width, height = willow.get_size()
+
+            resize_targets = {}
+            for position, filter in enumerate(filters):
+                resize_target = filter._get_resize_target(image, width, height, original_format)
+                if resize_target is not None:
+                    resize_targets[position] = resize_target
+                else:
+                    results[position] = filter._run(willow, image, outputs[position], original_format)
+
+            if resize_targets and len(resize_targets) == len(filters) and original_format == 'jpeg':
+                max_width = max(size[0] for size, resized, env in resize_targets.values())
+                max_height = max(size[1] for size, resized, env in resize_targets.values())
+
+                # Let the JPEG decoder downscale the image by a power of two (which is
+                # much quicker than decoding it at full size), if it's big enough
+                pil_image = getattr(willow, 'image', None)
+                if 0 < max_width * 2 <= width and 0 < max_height * 2 <= height and hasattr(pil_image, 'draft'):
+                    pil_image.draft(pil_image.mode, (max_width, max_height))
+
+            resized_images = []
+
+            # Largest first, so that smaller sizes can be resized from larger ones
+            def get_area(position):
+                size = resize_targets[position][0]
+                return size[0] * size[1]
+
+            for position in sorted(resize_targets, key=get_area, reverse=True):
+                size, resized, env = resize_targets[position]
+
+                source = willow
+                for resized_image in resized_images:
+                    resized_width, resized_height = resized_image.get_size()
+                    if resized_width >= size[0] and resized_height >= size[1]:
+                        source = resized_image
+
+                if source.get_size() != size or (resized and source is willow):
+                    resized_image = source.resize(size)
+                    resized_images.append(resized_image)
+                else:
+                    resized_image = source
+
+                results[position] = filters[position]._save(resized_image, env, outputs[position])
+
+        return results
+
+    def _get_resize_target(self, image, width, height, original_format):
+        """
+        If this filter only resizes the image, return the size it would resize an
+        image of the given size to, whether it resizes it at all, and the environment
+        its operations set. Otherwise, return None.
+        """
+        env = {
+            'original-format': original_format,
+        }
+        willow = _SizeOnlyWillow((width, height))
+
+        for operation in self.operations:
+            try:
                 willow = operation.run(willow, image, env) or willow
+            except AttributeError:
+                # The operation does something other than resize the image
+                return None
 
-            # Find the output format to use
-            if 'output-format' in env:
-                # Developer specified an output format
-                output_format = env['output-format']
+        return willow.size, willow.resized, env
+
+    def _run(self, willow, image, output, original_format):
+        env = {
+            'original-format': original_format,
+        }
+        for operation in self.operations:
+            willow = operation.run(willow, image, env) or willow
+
+        return self._save(willow, env, output)
+
+    def _save(self, willow, env, output):
+        original_format = env['original-format']
+
+        # Find the output format to use
+        if 'output-format' in env:
+            # Developer specified an output format
+            output_format = env['output-format']
+        else:
+            # Default to outputting in original format
+            output_format = original_format
+
+            # Convert BMP files to PNG
+            if original_format == 'bmp':
+                output_format = 'png'
+
+            # Convert unanimated GIFs to PNG as well
+            if original_format == 'gif' and not willow.has_animation():
+                output_format = 'png'
+
+        if output_format == 'jpeg':
+            # Allow changing of JPEG compression quality
+            if 'jpeg-quality' in env:
+                quality = env['jpeg-quality']
+            elif hasattr(settings, 'WAGTAILIMAGES_JPEG_QUALITY'):
+                quality = settings.WAGTAILIMAGES_JPEG_QUALITY
             else:
-                # Default to outputting in original format
-                output_format = original_format
-
-                # Convert BMP files to PNG
-                if original_format == 'bmp':
-                    output_format = 'png'
-
-                # Convert unanimated GIFs to PNG as well
-                if original_format == 'gif' and not willow.has_animation():
-                    output_format = 'png'
-
-            if output_format == 'jpeg':
-                # Allow changing of JPEG compression quality
-                if 'jpeg-quality' in env:
-                    quality = env['jpeg-quality']
-                elif hasattr(settings, 'WAGTAILIMAGES_JPEG_QUALITY'):
-                    quality = settings.WAGTAILIMAGES_JPEG_QUALITY
-                else:
-                    quality = 85
+                quality = 85
 
-                # If the image has an alpha channel, give it a white background
-                if willow.has_alpha():
-                    willow = willow.set_background_color_rgb((255, 255, 255))
+            # If the image has an alpha channel, give it a white background
+            if willow.has_alpha():
+                willow = willow.set_background_color_rgb((255, 255, 255))
 
-                return willow.save_as_jpeg(output, quality=quality, progressive=True, optimize=True)
-            elif output_format == 'png':
-                return willow.save_as_png(output)
-            elif output_format == 'gif':
-                return willow.save_as_gif(output)
+            return willow.save_as_jpeg(output, quality=quality, progressive=True, optimize=True)
+        elif output_format == 'png':
+            return willow.save_as_png(output)
+        elif output_format == 'gif':
+            return willow.save_as_gif(output)
 
     def get_cache_key(self, image):
         vary_parts = []
@@ -435,6 +634,23 @@ class Filter:
         cls._registered_operations = dict(operations)
 
 
+class _SizeOnlyWillow:
+    """
+    Stands in for a Willow image in Filter._get_resize_target, to work out the
+    size of a rendition without decoding the original image. Only supports
+    resizing; any other operation raises AttributeError.
+    """
+    def __init__(self, size, resized=False):
+        self.size = size
+        self.resized = resized
+
+    def get_size(self):
+        return self.size
+
+    def resize(self, size):
+        return _SizeOnlyWillow(tuple(size), resized=True)
+
+
 class AbstractRendition(models.Model):
     filter_spec = models.CharField(max_length=255, db_index=True)
     file = models.ImageField(upload_to=get_rendition_upload_to, width_field='width', height_field='height')
@@ -442,8 +658,14 @@ class AbstractRendition(models.Model):
     height = models.IntegerField(editable=False)
     focal_point_key = models.CharField(max_length=16, blank=True, default='', editable=False)
 
+    # Set on placeholders for renditions that are being generated in the background
+    placeholder_url = None
+
     @property
     def url(self):
+        if self.placeholder_url is not None:
+            return self.placeholder_url
+
         return self.file.url
 
     @property
@@ -514,3 +736,18 @@ class Rendition(AbstractRendition):
         unique_together = (
             ('image', 'filter_spec', 'focal_point_key'),
         )
+
+
+class RenditionGenerationTask(models.Model):
+    """
+    A rendition waiting to be generated by the process_rendition_queue management command
+    (see wagtail.images.rendition_workers.DatabaseQueueWorker)
+    """
+    image_id = models.PositiveIntegerField()
+    filter_spec = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (
+            ('image_id', 'filter_spec'),
+        )
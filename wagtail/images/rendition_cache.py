@@ -0,0 +1,142 @@
+"""
+An opt-in cache of rendition lookups, used by AbstractImage.get_rendition to
+avoid a database query for every rendition of every image on a page.
+
+Renditions are cached in a process-local LRU (of WAGTAILIMAGES_RENDITION_CACHE_SIZE
+entries) backed by one of the Django caches. Entries are keyed on the image ID,
+filter spec and focal point key, and record the name of the original image file
+they were generated from; an entry for a different file (for example, after the
+image has been replaced in the admin) is treated as a miss.
+"""
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def is_enabled():
+    return getattr(settings, 'WAGTAILIMAGES_RENDITION_CACHE_ENABLED', False)
+
+
+def get_cache():
+    return caches[getattr(settings, 'WAGTAILIMAGES_RENDITION_CACHE_BACKEND', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'WAGTAILIMAGES_RENDITION_CACHE_TIMEOUT', 3600)
+
+
+def get_local_cache_size():
+    return getattr(settings, 'WAGTAILIMAGES_RENDITION_CACHE_SIZE', 1000)
+
+
+class LRUCache:
+    """
+    A thread-safe dict that discards its least recently used items once
+    it holds more than ``get_max_size()`` of them
+    """
+    def __init__(self, get_max_size):
+        self.get_max_size = get_max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                self.items.move_to_end(key)
+            except KeyError:
+                return None
+
+            return self.items[key]
+
+    def set(self, key, value):
+        max_size = self.get_max_size()
+
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+
+            while len(self.items) > max_size:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+_local_cache = LRUCache(get_local_cache_size)
+
+
+def clear_local_cache():
+    _local_cache.clear()
+
+
+def get_cache_key(image_id, filter_spec, focal_point_key):
+    return 'wagtail_rendition.%s.%s.%s' % (image_id, filter_spec, focal_point_key)
+
+
+def get_rendition(image, filter_spec, focal_point_key):
+    """
+    Return the cached rendition of the image, or None if there isn't one
+    """
+    if not is_enabled():
+        return None
+
+    cache_key = get_cache_key(image.pk, filter_spec, focal_point_key)
+
+    entry = _local_cache.get(cache_key)
+    if entry is None:
+        entry = get_cache().get(cache_key)
+        if entry is not None:
+            _local_cache.set(cache_key, entry)
+
+    if entry is None:
+        return None
+
+    image_file, field_names, values = entry
+    if image_file != image.file.name:
+        # The rendition was generated from a file that has since been replaced
+        return None
+
+    Rendition = image.get_rendition_model()
+    rendition = Rendition.from_db(None, field_names, values)
+    rendition.image = image
+    return rendition
+
+
+def set_rendition(image, rendition):
+    """
+    Add a rendition of the image to the cache
+    """
+    if not is_enabled():
+        return
+
+    # Cache the rendition's field values rather than the instance, so that the
+    # image (and anything else cached on the rendition) isn't stored with it
+    fields = rendition._meta.concrete_fields
+    entry = (
+        image.file.name,
+        [field.attname for field in fields],
+        [field.get_prep_value(field.value_from_object(rendition)) for field in fields],
+    )
+
+    cache_key = get_cache_key(image.pk, rendition.filter_spec, rendition.focal_point_key)
+    _local_cache.set(cache_key, entry)
+    get_cache().set(cache_key, entry, get_timeout())
+
+
+def delete_rendition(rendition):
+    """
+    Remove a rendition from the cache. This is called whenever a rendition is deleted.
+    """
+    if not is_enabled():
+        return
+
+    cache_key = get_cache_key(rendition.image_id, rendition.filter_spec, rendition.focal_point_key)
+    _local_cache.delete(cache_key)
+    get_cache().delete(cache_key)
@@ -0,0 +1,224 @@
+"""
+Background generation of image renditions.
+
+If WAGTAILIMAGES_RENDITION_WORKER is set, AbstractImage.get_rendition doesn't
+generate missing renditions itself. Instead, it hands them to a worker and
+returns a placeholder rendition whose URL points at the dynamic image serve
+view (which must be configured - see image_serve_view.rst). For example:
+
+    WAGTAILIMAGES_RENDITION_WORKER = {
+        'BACKEND': 'wagtail.images.rendition_workers.ThreadPoolWorker',
+        'MAX_WORKERS': 2,
+    }
+
+A lock in the default cache makes sure that each rendition is only queued
+once, however many requests ask for it while it's being generated.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.dispatch import receiver
+from django.urls import NoReverseMatch, reverse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('wagtail.images')
+
+LOCK_TIMEOUT = 300
+
+
+class InvalidRenditionWorkerError(ImproperlyConfigured):
+    pass
+
+
+class BaseRenditionWorker:
+    def __init__(self, params):
+        pass
+
+    def enqueue(self, image_id, filter_spec):
+        """
+        Arrange for generate_rendition to be called with the given image ID and filter spec
+        """
+        raise NotImplementedError
+
+
+class ThreadPoolWorker(BaseRenditionWorker):
+    """
+    Generates renditions in a pool of threads within the current process
+    """
+    def __init__(self, params):
+        super().__init__(params)
+        self.executor = ThreadPoolExecutor(max_workers=params.get('MAX_WORKERS', 2))
+
+    def enqueue(self, image_id, filter_spec):
+        # Wait until the image is visible to other database connections
+        transaction.on_commit(lambda: self.executor.submit(self.run, image_id, filter_spec))
+
+    def run(self, image_id, filter_spec):
+        try:
+            generate_rendition(image_id, filter_spec)
+        except Exception:
+            logger.exception("Failed to generate rendition '%s' of image %s", filter_spec, image_id)
+        finally:
+            # Each thread has its own database connection, which Django won't close for us
+            connection.close()
+
+
+class DatabaseQueueWorker(BaseRenditionWorker):
+    """
+    Adds renditions to a queue in the database, to be generated by the
+    process_rendition_queue management command
+    """
+    def enqueue(self, image_id, filter_spec):
+        from wagtail.images.models import RenditionGenerationTask
+
+        RenditionGenerationTask.objects.get_or_create(image_id=image_id, filter_spec=filter_spec)
+
+
+_worker = None
+
+
+@receiver(setting_changed)
+def reset_worker(setting, **kwargs):
+    global _worker
+
+    if setting == 'WAGTAILIMAGES_RENDITION_WORKER':
+        _worker = None
+
+
+def get_worker():
+    """
+    Return the configured rendition worker, or None if renditions should be
+    generated as they're requested
+    """
+    global _worker
+
+    worker_settings = getattr(settings, 'WAGTAILIMAGES_RENDITION_WORKER', None)
+    if worker_settings is None:
+        return None
+
+    if _worker is None:
+        params = worker_settings.copy()
+        backend = params.pop('BACKEND', 'wagtail.images.rendition_workers.ThreadPoolWorker')
+
+        try:
+            worker_cls = import_string(backend)
+        except ImportError as e:
+            raise InvalidRenditionWorkerError("Could not find rendition worker '%s': %s" % (backend, e))
+
+        _worker = worker_cls(params)
+
+    return _worker
+
+
+def get_lock_key(image_id, filter_spec):
+    return 'wagtail_rendition_queued.%s.%s' % (image_id, filter_spec)
+
+
+def get_generating_key(image_id, filter_spec):
+    return 'wagtail_rendition_generating.%s.%s' % (image_id, filter_spec)
+
+
+def is_generating(image_id, filter_spec):
+    return cache.get(get_generating_key(image_id, filter_spec)) is not None
+
+
+def get_placeholder_url(image, filter_spec):
+    from wagtail.images.views.serve import generate_signature
+
+    signature = generate_signature(image.id, filter_spec)
+    try:
+        url = reverse('wagtailimages_serve', args=(signature, image.id, filter_spec))
+    except NoReverseMatch:
+        return None
+
+    return url + image.filename
+
+
+_local = threading.local()
+
+
+@contextmanager
+def generate_renditions_now():
+    """
+    Within this context, AbstractImage.get_rendition generates missing renditions
+    itself in the current thread, even if a rendition worker is configured. Used
+    by the worker and the image serve view, which need the actual rendition.
+    """
+    previous = getattr(_local, 'generate_now', False)
+    _local.generate_now = True
+    try:
+        yield
+    finally:
+        _local.generate_now = previous
+
+
+def generate_in_background(image, filter, focal_point_key):
+    """
+    Queue the rendition to be generated by the rendition worker, and return a
+    placeholder rendition for it. Returns None if renditions aren't being
+    generated in the background.
+    """
+    if getattr(_local, 'generate_now', False):
+        return None
+
+    worker = get_worker()
+    if worker is None:
+        return None
+
+    placeholder_url = get_placeholder_url(image, filter.spec)
+    if placeholder_url is None:
+        return None
+
+    # Only queue the rendition if it isn't already queued or being generated
+    if cache.add(get_lock_key(image.id, filter.spec), True, LOCK_TIMEOUT):
+        worker.enqueue(image.id, filter.spec)
+
+    Rendition = image.get_rendition_model()
+    rendition = Rendition(image=image, filter_spec=filter.spec, focal_point_key=focal_point_key)
+    rendition.placeholder_url = placeholder_url
+    return rendition
+
+
+def generate_rendition(image_id, filter_spec):
+    """
+    Generate a rendition that has been queued by generate_in_background
+    """
+    from wagtail.images import get_image_model
+
+    Image = get_image_model()
+    generating_key = get_generating_key(image_id, filter_spec)
+    cache.set(generating_key, True, LOCK_TIMEOUT)
+
+    try:
+        image = Image.objects.get(id=image_id)
+    except Image.DoesNotExist:
+        # The image has been deleted since the rendition was queued
+        return None
+    else:
+        # If the rendition has been generated since it was queued (for example, by the
+        # serve view), this just fetches it
+        with generate_renditions_now():
+            return image.get_rendition(filter_spec)
+    finally:
+        cache.delete_many([generating_key, get_lock_key(image_id, filter_spec)])
+
+
+def wait_for_rendition(image_id, filter_spec, timeout=10):
+    """
+    If the rendition is being generated in the background, wait up to
+    ``timeout`` seconds for it to finish, so that it doesn't get generated twice
+    """
+    if get_worker() is None:
+        return
+
+    deadline = time.time() + timeout
+    while is_generating(image_id, filter_spec) and time.time() < deadline:
+        time.sleep(0.1)
@@ -2,7 +2,7 @@ from django.conf import settings
 from django.db import transaction
 from django.db.models.signals import post_delete, pre_save
 
-from wagtail.images import get_image_model
+from wagtail.images import get_image_model, rendition_cache
 
 
 def post_delete_file_cleanup(instance, **kwargs):
@@ -10,6 +10,10 @@ def post_delete_file_cleanup(instance, **kwargs):
     transaction.on_commit(lambda: instance.file.delete(False))
 
 
+def post_delete_rendition_cache_cleanup(instance, **kwargs):
+    rendition_cache.delete_rendition(instance)
+
+
 def pre_save_image_feature_detection(instance, **kwargs):
     if getattr(settings, 'WAGTAILIMAGES_FEATURE_DETECTION_ENABLED', False):
         # Make sure the image doesn't already have a focal point
@@ -25,3 +29,4 @@ def register_signal_handlers():
     pre_save.connect(pre_save_image_feature_detection, sender=Image)
     post_delete.connect(post_delete_file_cleanup, sender=Image)
     post_delete.connect(post_delete_file_cleanup, sender=Rendition)
+    post_delete.connect(post_delete_rendition_cache_cleanup, sender=Rendition)
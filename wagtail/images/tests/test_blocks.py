@@ -53,3 +53,20 @@ class TestImageChooserBlock(TestCase):
         expected_html = '<img alt="missing image" src="/media/not-found" width="0" height="0">'
 
         self.assertHTMLEqual(html, expected_html)
+
+    def test_bulk_to_python_prefetches_renditions(self):
+        self.image.get_rendition('original')
+
+        block = ImageChooserBlock()
+        with self.assertNumQueries(1):
+            images = block.bulk_to_python([self.image.id, None, self.bad_image.id])
+
+        self.assertEqual(images, [self.image, None, self.bad_image])
+
+        # The renditions of all of the images are fetched when the first one is rendered
+        with self.assertNumQueries(1):
+            block.render(images[0])
+
+        with self.assertNumQueries(0):
+            block.render(images[0])
+            self.assertEqual(list(images[2].prefetched_renditions), [])
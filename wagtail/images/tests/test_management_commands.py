@@ -0,0 +1,98 @@
+from io import StringIO
+
+import mock
+from django.core import management
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from wagtail.images.management.commands.generate_renditions import find_template_filter_specs
+from wagtail.images.models import Rendition
+
+from .utils import Image, get_test_image_file
+
+
+class TestGenerateRenditionsCommand(TestCase):
+    def setUp(self):
+        self.images = [
+            Image.objects.create(title="Test image %d" % i, file=get_test_image_file())
+            for i in range(3)
+        ]
+
+    def run_command(self, *args, **options):
+        output = StringIO()
+        management.call_command('generate_renditions', *args, stdout=output, stderr=StringIO(), **options)
+        output.seek(0)
+        return output.read()
+
+    def test_generate_renditions(self):
+        output = self.run_command('width-400', 'fill-100x100', chunk_size=2)
+
+        self.assertEqual(Rendition.objects.filter(filter_spec='width-400').count(), 3)
+        self.assertEqual(Rendition.objects.filter(filter_spec='fill-100x100').count(), 3)
+        self.assertIn("Processed 2 of 3 images", output)
+        self.assertIn("Done: generated 6 renditions, 0 errors", output)
+
+    def test_existing_renditions_are_skipped(self):
+        self.images[0].get_rendition('width-400')
+
+        output = self.run_command('width-400')
+
+        self.assertIn("Done: generated 2 renditions, 0 errors", output)
+        self.assertEqual(Rendition.objects.filter(filter_spec='width-400').count(), 3)
+
+    def test_failed_filter_doesnt_stop_others(self):
+        get_rendition = Image.get_rendition
+
+        def get_rendition_or_fail(image, filter_spec):
+            if filter_spec == 'fill-100x100':
+                raise ValueError("Failed")
+
+            return get_rendition(image, filter_spec)
+
+        with mock.patch.object(Image, 'get_renditions', side_effect=ValueError("Failed")):
+            with mock.patch.object(Image, 'get_rendition', autospec=True, side_effect=get_rendition_or_fail):
+                with self.assertLogs('wagtail.images', level='ERROR') as logs:
+                    output = self.run_command('width-400', 'fill-100x100')
+
+        self.assertIn("Done: generated 3 renditions, 3 errors", output)
+        self.assertEqual(Rendition.objects.filter(filter_spec='width-400').count(), 3)
+        self.assertEqual(len(logs.records), 3)
+
+    @override_settings(WAGTAILIMAGES_RENDITION_WORKER={
+        'BACKEND': 'wagtail.images.rendition_workers.DatabaseQueueWorker',
+    })
+    def test_failed_filter_with_rendition_worker(self):
+        with mock.patch.object(Image, 'get_renditions', side_effect=ValueError("Failed")):
+            with self.assertLogs('wagtail.images', level='ERROR'):
+                output = self.run_command('width-400')
+
+        # The renditions are generated rather than queued
+        self.assertIn("Done: generated 3 renditions, 0 errors", output)
+        self.assertEqual(Rendition.objects.filter(filter_spec='width-400').count(), 3)
+
+    def test_start_after(self):
+        output = self.run_command('width-400', start_after=self.images[0].id)
+
+        self.assertIn("Done: generated 2 renditions, 0 errors", output)
+        self.assertFalse(self.images[0].renditions.exists())
+
+    @override_settings(WAGTAILIMAGES_PREGENERATE_FILTER_SPECS=['height-66'])
+    def test_filter_specs_setting(self):
+        self.run_command()
+
+        self.assertEqual(Rendition.objects.filter(filter_spec='height-66').count(), 3)
+
+    def test_scan_templates(self):
+        self.assertIn('width-200', find_template_filter_specs())
+
+        self.run_command(scan_templates=True)
+
+        self.assertEqual(Rendition.objects.filter(filter_spec='width-200').count(), 3)
+
+    def test_invalid_filter_spec(self):
+        with self.assertRaises(CommandError):
+            self.run_command('width-abc')
+
+    def test_no_filter_specs(self):
+        with self.assertRaises(CommandError):
+            self.run_command()
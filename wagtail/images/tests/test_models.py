@@ -1,5 +1,7 @@
 import unittest
+from io import BytesIO
 
+import mock
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, Permission
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -12,10 +14,11 @@ from willow.image import Image as WillowImage
 from wagtail.tests.testapp.models import EventPage, EventPageCarouselItem
 from wagtail.tests.utils import WagtailTestUtils
 from wagtail.core.models import Collection, GroupCollectionPermission, Page
-from wagtail.images.models import Rendition, SourceImageIOError
+from wagtail.images import rendition_cache
+from wagtail.images.models import Filter, Rendition, SourceImageIOError
 from wagtail.images.rect import Rect
 
-from .utils import Image, get_test_image_file
+from .utils import Image, get_test_image_file, get_test_image_file_jpeg
 
 
 class TestImage(TestCase):
@@ -243,6 +246,169 @@ class TestRenditions(TestCase):
         self.assertEqual(rendition.alt, "Test image")
 
 
+class TestGetRenditions(TestCase):
+    def setUp(self):
+        self.image = Image.objects.create(
+            title="Test image",
+            file=get_test_image_file_jpeg(size=(1600, 1200)),
+        )
+
+    def test_get_renditions(self):
+        existing_rendition = self.image.get_rendition('width-400')
+
+        with mock.patch.object(Image, 'get_willow_image', wraps=self.image.get_willow_image) as get_willow_image:
+            renditions = self.image.get_renditions('width-400', 'width-800', 'max-100x100', 'fill-200x200', 'original')
+
+        # The original image is only opened once
+        self.assertEqual(get_willow_image.call_count, 1)
+
+        self.assertEqual(renditions['width-400'].id, existing_rendition.id)
+        self.assertEqual((renditions['width-800'].width, renditions['width-800'].height), (800, 600))
+        self.assertEqual((renditions['max-100x100'].width, renditions['max-100x100'].height), (100, 75))
+        self.assertEqual((renditions['fill-200x200'].width, renditions['fill-200x200'].height), (200, 200))
+        self.assertEqual((renditions['original'].width, renditions['original'].height), (1600, 1200))
+
+        for filter_spec, rendition in renditions.items():
+            self.assertEqual(rendition.filter_spec, filter_spec)
+            self.assertEqual(self.image.get_rendition(filter_spec).id, rendition.id)
+
+    def test_run_multiple_matches_run(self):
+        filter_specs = ['width-400', 'height-66', 'max-300x100|jpegquality-40', 'min-200x200', 'fill-80x60', 'original']
+        filters = [Filter(spec=filter_spec) for filter_spec in filter_specs]
+
+        results = Filter.run_multiple(filters, self.image)
+
+        for filter, result in zip(filters, results):
+            expected = filter.run(self.image, BytesIO())
+            self.assertEqual(result.format_name, expected.format_name)
+
+            result.f.seek(0)
+            expected.f.seek(0)
+            self.assertEqual(
+                WillowImage.open(result.f).get_size(),
+                WillowImage.open(expected.f).get_size(),
+                filter.spec
+            )
+
+    def test_jpeg_draft_mode(self):
+        with mock.patch('PIL.JpegImagePlugin.JpegImageFile.draft', autospec=True) as draft:
+            Filter.run_multiple([Filter(spec='width-400'), Filter(spec='width-200')], self.image)
+
+        self.assertEqual(draft.call_count, 1)
+        self.assertEqual(draft.call_args[0][2], (400, 300))
+
+        # The original must be decoded at full size if any filter needs it
+        with mock.patch('PIL.JpegImagePlugin.JpegImageFile.draft', autospec=True) as draft:
+            Filter.run_multiple([Filter(spec='width-400'), Filter(spec='fill-100x100')], self.image)
+
+        self.assertFalse(draft.called)
+
+
+class TestPrefetchRenditions(TestCase):
+    def setUp(self):
+        for i in range(3):
+            image = Image.objects.create(
+                title="Test image %d" % i,
+                file=get_test_image_file(),
+            )
+            image.get_rendition('width-400')
+            image.get_rendition('fill-100x100')
+
+    def test_prefetch_renditions(self):
+        with self.assertNumQueries(2):
+            images = list(Image.objects.prefetch_renditions())
+
+            for image in images:
+                self.assertEqual(image.get_rendition('width-400').width, 400)
+                self.assertEqual(image.get_rendition('fill-100x100').width, 100)
+                self.assertEqual(image.get_rendition('width-400').alt, image.title)
+
+    def test_prefetch_specific_renditions(self):
+        images = list(Image.objects.prefetch_renditions('width-400'))
+
+        with self.assertNumQueries(0):
+            for image in images:
+                image.get_rendition('width-400')
+
+        with self.assertNumQueries(3):
+            for image in images:
+                image.get_rendition('fill-100x100')
+
+    def test_missing_renditions_are_generated(self):
+        images = list(Image.objects.prefetch_renditions())
+
+        rendition = images[0].get_rendition('height-66')
+        self.assertEqual(rendition.height, 66)
+        self.assertTrue(Rendition.objects.filter(id=rendition.id).exists())
+
+
+@override_settings(WAGTAILIMAGES_RENDITION_CACHE_ENABLED=True)
+class TestRenditionCache(TestCase):
+    def setUp(self):
+        rendition_cache.clear_local_cache()
+
+        self.image = Image.objects.create(
+            title="Test image",
+            file=get_test_image_file(),
+        )
+        self.rendition = self.image.get_rendition('width-400')
+
+    def tearDown(self):
+        rendition_cache.clear_local_cache()
+
+    def test_cached_rendition(self):
+        image = Image.objects.get(id=self.image.id)
+
+        with self.assertNumQueries(0):
+            rendition = image.get_rendition('width-400')
+
+        self.assertEqual(rendition.id, self.rendition.id)
+        self.assertEqual(rendition.url, self.rendition.url)
+        self.assertEqual(rendition.width, 400)
+        self.assertEqual(rendition.alt, "Test image")
+
+    def test_shared_cache(self):
+        rendition_cache.clear_local_cache()
+        image = Image.objects.get(id=self.image.id)
+
+        rendition = image.get_rendition('width-400')
+        self.assertEqual(rendition.id, self.rendition.id)
+
+        # The rendition is now in the local cache as well
+        with self.assertNumQueries(0):
+            image.get_rendition('width-400')
+
+    def test_deleted_rendition_is_removed_from_cache(self):
+        self.rendition.delete()
+
+        rendition = self.image.get_rendition('width-400')
+        self.assertNotEqual(rendition.id, self.rendition.id)
+        self.assertTrue(Rendition.objects.filter(id=rendition.id).exists())
+
+    def test_replaced_image_file(self):
+        self.image.file = get_test_image_file(filename='replacement.png')
+        self.image.save()
+
+        self.assertIsNone(rendition_cache.get_rendition(self.image, 'width-400', ''))
+
+    def test_lru_cache(self):
+        cache = rendition_cache.LRUCache(lambda: 2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        # 'b' was the least recently used item
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    @override_settings(WAGTAILIMAGES_RENDITION_CACHE_ENABLED=False)
+    def test_disabled(self):
+        with self.assertNumQueries(1):
+            self.image.get_rendition('width-400')
+
+
 class TestUsageCount(TestCase):
     fixtures = ['test.json']
 
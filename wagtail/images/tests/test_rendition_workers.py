@@ -0,0 +1,172 @@
+from io import StringIO
+
+import mock
+from django.core import management
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+
+from wagtail.images import rendition_workers
+from wagtail.images.models import Rendition, RenditionGenerationTask
+from wagtail.images.views.serve import generate_signature
+
+from .utils import Image, get_test_image_file
+
+
+class SynchronousExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@override_settings(WAGTAILIMAGES_RENDITION_WORKER={
+    'BACKEND': 'wagtail.images.rendition_workers.DatabaseQueueWorker',
+})
+class TestDatabaseQueueWorker(TestCase):
+    def setUp(self):
+        self.image = Image.objects.create(
+            title="Test image",
+            file=get_test_image_file(),
+        )
+
+    def run_command(self, **options):
+        output = StringIO()
+        management.call_command('process_rendition_queue', stdout=output, **options)
+        output.seek(0)
+        return output.read()
+
+    def test_get_rendition_returns_placeholder(self):
+        rendition = self.image.get_rendition('width-400')
+
+        signature = generate_signature(self.image.id, 'width-400')
+        self.assertEqual(
+            rendition.url, '/images/%s/%d/width-400/%s' % (signature, self.image.id, self.image.filename)
+        )
+        self.assertIsNone(rendition.id)
+        self.assertEqual(rendition.alt, "Test image")
+        self.assertFalse(Rendition.objects.filter(image=self.image).exists())
+
+        html = Template('{% load wagtailimages_tags %}{% image image width-400 %}').render(
+            Context({'image': self.image})
+        )
+        self.assertHTMLEqual(html, '<img alt="Test image" src="%s">' % rendition.url)
+
+    def test_rendition_is_only_queued_once(self):
+        self.image.get_rendition('width-400')
+        self.image.get_rendition('width-400')
+        self.image.get_rendition('width-200')
+
+        self.assertEqual(
+            sorted(RenditionGenerationTask.objects.values_list('filter_spec', flat=True)),
+            ['width-200', 'width-400']
+        )
+
+    def test_existing_rendition_is_returned(self):
+        with rendition_workers.generate_renditions_now():
+            rendition = self.image.get_rendition('width-400')
+        self.assertIsNone(rendition.placeholder_url)
+
+        self.assertEqual(self.image.get_rendition('width-400').id, rendition.id)
+        self.assertFalse(RenditionGenerationTask.objects.exists())
+
+    def test_process_rendition_queue(self):
+        self.image.get_rendition('width-400')
+        self.image.get_rendition('width-200')
+
+        output = self.run_command()
+
+        self.assertIn("Generated 2 renditions (0 failed)", output)
+        self.assertFalse(RenditionGenerationTask.objects.exists())
+        self.assertEqual(self.image.get_rendition('width-400').width, 400)
+        self.assertEqual(Rendition.objects.filter(image=self.image).count(), 2)
+
+        # Once generated, the rendition can be queued again if it's deleted
+        Rendition.objects.filter(image=self.image, filter_spec='width-400').delete()
+        self.assertIsNotNone(self.image.get_rendition('width-400').placeholder_url)
+        self.assertTrue(RenditionGenerationTask.objects.exists())
+
+    def test_process_rendition_queue_with_limit(self):
+        self.image.get_rendition('width-400')
+        self.image.get_rendition('width-200')
+
+        output = self.run_command(limit=1)
+
+        self.assertIn("Generated 1 renditions (0 failed)", output)
+        self.assertEqual(RenditionGenerationTask.objects.count(), 1)
+
+    def test_process_rendition_queue_for_deleted_image(self):
+        self.image.get_rendition('width-400')
+        self.image.delete()
+
+        output = self.run_command()
+
+        self.assertIn("Generated 1 renditions (0 failed)", output)
+        self.assertFalse(RenditionGenerationTask.objects.exists())
+
+    def test_serve_view_generates_rendition(self):
+        rendition = self.image.get_rendition('width-400')
+
+        response = self.client.get(rendition.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(self.image.get_rendition('width-400').width, 400)
+
+        # The queued task just fetches the rendition that the view generated
+        self.run_command()
+        self.assertEqual(Rendition.objects.filter(image=self.image).count(), 1)
+
+    def test_serve_view_with_overridden_get_rendition(self):
+        rendition = self.image.get_rendition('width-400')
+        get_rendition = Image.get_rendition
+
+        # Image models may override get_rendition with its original signature
+        def overridden_get_rendition(self, filter):
+            return get_rendition(self, filter)
+
+        with mock.patch.object(Image, 'get_rendition', overridden_get_rendition):
+            response = self.client.get(rendition.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.image.get_rendition('width-400').width, 400)
+
+
+@override_settings(WAGTAILIMAGES_RENDITION_WORKER={
+    'BACKEND': 'wagtail.images.rendition_workers.ThreadPoolWorker',
+})
+class TestThreadPoolWorker(TestCase):
+    def setUp(self):
+        self.image = Image.objects.create(
+            title="Test image",
+            file=get_test_image_file(),
+        )
+
+    @mock.patch('wagtail.images.rendition_workers.connection')
+    @mock.patch('wagtail.images.rendition_workers.transaction.on_commit', lambda fn: fn())
+    def test_rendition_is_generated(self, connection):
+        worker = rendition_workers.get_worker()
+        self.assertIsInstance(worker, rendition_workers.ThreadPoolWorker)
+        worker.executor = SynchronousExecutor()
+
+        placeholder = self.image.get_rendition('width-400')
+        self.assertIsNotNone(placeholder.placeholder_url)
+
+        rendition = self.image.get_rendition('width-400')
+        self.assertIsNone(rendition.placeholder_url)
+        self.assertEqual(rendition.width, 400)
+        self.assertTrue(connection.close.called)
+
+    @mock.patch('wagtail.images.rendition_workers.connection')
+    def test_errors_are_logged(self, connection):
+        with mock.patch('wagtail.images.rendition_workers.generate_rendition', side_effect=IOError):
+            with self.assertLogs('wagtail.images', level='ERROR'):
+                rendition_workers.get_worker().run(self.image.id, 'width-400')
+
+    @override_settings(WAGTAILIMAGES_RENDITION_WORKER={'BACKEND': 'wagtail.images.rendition_workers.Nonexistent'})
+    def test_invalid_backend(self):
+        with self.assertRaises(rendition_workers.InvalidRenditionWorkerError):
+            self.image.get_rendition('width-400')
+
+    @override_settings(WAGTAILIMAGES_RENDITION_WORKER=None)
+    def test_disabled(self):
+        rendition = self.image.get_rendition('width-400')
+        self.assertIsNone(rendition.placeholder_url)
+        self.assertTrue(Rendition.objects.filter(id=rendition.id).exists())
@@ -13,7 +13,7 @@ from django.utils.encoding import force_text
 from django.views.generic import View
 
 from wagtail.utils.sendfile import sendfile
-from wagtail.images import get_image_model
+from wagtail.images import get_image_model, rendition_workers
 from wagtail.images.exceptions import InvalidFilterSpecError
 from wagtail.images.models import SourceImageIOError
 
@@ -55,9 +55,14 @@ class ServeView(View):
 
         image = get_object_or_404(self.model, id=image_id)
 
+        # If the rendition is being generated in the background, wait for that to finish
+        # rather than generating it again
+        rendition_workers.wait_for_rendition(image.id, filter_spec)
+
         # Get/generate the rendition
         try:
-            rendition = image.get_rendition(filter_spec)
+            with rendition_workers.generate_renditions_now():
+                rendition = image.get_rendition(filter_spec)
         except SourceImageIOError:
             return HttpResponse("Source image file not found", content_type='text/plain', status=410)
         except InvalidFilterSpecError:
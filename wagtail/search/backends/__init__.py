@@ -2,8 +2,11 @@
 # Based on the Django cache framework
 # https://github.com/django/django/blob/5d263dee304fdaf95e18d2f0619d6925984a7f02/django/core/cache/__init__.py
 
+import threading
 from importlib import import_module
 
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.utils.module_loading import import_string
 from django.core.exceptions import ImproperlyConfigured
 from django.conf import settings
@@ -47,8 +50,23 @@ def import_backend(dotted_path):
             raise ImportError from e
 
 
+# Backends that have been created from WAGTAILSEARCH_BACKENDS, so that each one
+# (along with its connection pool) is shared by the whole process.
+# {name: (backend class, backend)}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+@receiver(setting_changed)
+def reset_search_backends(setting, **kwargs):
+    if setting == 'WAGTAILSEARCH_BACKENDS':
+        with _backends_lock:
+            _backends.clear()
+
+
 def get_search_backend(backend='default', **kwargs):
     search_backends = get_search_backend_config()
+    backend_name = backend
 
     # Try to find the backend
     try:
@@ -75,8 +93,19 @@ def get_search_backend(backend='default', **kwargs):
         raise InvalidSearchBackendError("Could not find backend '%s': %s" % (
             backend, e))
 
-    # Create backend
-    return backend_cls(params)
+    # Backends created with extra arguments, or from a dotted path, aren't shared
+    if kwargs or backend_name not in search_backends:
+        return backend_cls(params)
+
+    with _backends_lock:
+        # Check the class as well as the name, in case the backend's module has been replaced (eg, by mock.patch)
+        if backend_name in _backends and _backends[backend_name][0] is backend_cls:
+            return _backends[backend_name][1]
+
+        # Create backend
+        backend = backend_cls(params)
+        _backends[backend_name] = (backend_cls, backend)
+        return backend
 
 
 def _backend_requires_auto_update(backend_name, params):
@@ -1,8 +1,10 @@
 
+from collections import OrderedDict
 from warnings import warn
 
 import warnings
 
+from django.db.models import prefetch_related_objects
 from django.db.models.lookups import Lookup
 from django.db.models.query import QuerySet
 from django.db.models.sql.where import SubqueryConstraint, WhereNode
@@ -164,7 +166,43 @@ class BaseSearchQueryCompiler:
         list(self._get_order_by())
 
 
+class LiteSearchResult:
+    """
+    A search result that has been built from the data stored in the search index,
+    without querying the database. The values of the model's search fields (as they
+    were when the object was indexed) are available as attributes.
+    """
+    def __init__(self, model, pk, fields):
+        self.__dict__.update(fields)
+        self.model = model
+        self.pk = pk
+
+    def get_object(self):
+        return self.model._default_manager.get(pk=self.pk)
+
+    def __eq__(self, other):
+        return isinstance(other, LiteSearchResult) and (self.model, self.pk) == (other.model, other.pk)
+
+    def __hash__(self):
+        return hash((self.model, self.pk))
+
+    def __repr__(self):
+        return '<LiteSearchResult: %s %s>' % (self.model._meta.label, self.pk)
+
+
+def _model_has_lookup(model, lookup):
+    """
+    Returns True if the first part of the given select_related/prefetch_related
+    lookup is an attribute of the model
+    """
+    lookup = getattr(lookup, 'prefetch_through', lookup)
+    return hasattr(model, lookup.split('__')[0])
+
+
 class BaseSearchResults:
+    supports_lite_results = False
+    supports_cursor = False
+
     def __init__(self, backend, query_compiler, prefetch_related=None):
         self.backend = backend
         self.query_compiler = query_compiler
@@ -174,6 +212,13 @@ class BaseSearchResults:
         self._results_cache = None
         self._count_cache = None
         self._score_field = None
+        self._specific = False
+        self._specific_select_related = []
+        self._specific_prefetch_related = []
+        self._lite = False
+        self._use_cursor = False
+        self._cursor = None
+        self._next_cursor = None
 
     def _set_limits(self, start=None, stop=None):
         if stop is not None:
@@ -195,17 +240,95 @@ class BaseSearchResults:
         new.start = self.start
         new.stop = self.stop
         new._score_field = self._score_field
+        new._specific = self._specific
+        new._specific_select_related = self._specific_select_related
+        new._specific_prefetch_related = self._specific_prefetch_related
+        new._lite = self._lite
+        new._use_cursor = self._use_cursor
+        new._cursor = self._cursor
         return new
 
     def _do_search(self):
         raise NotImplementedError
 
+    def _do_specific_search(self):
+        """
+        Returns the results as instances of their specific classes. Backends that can
+        tell the specific class of each result from the search index can override this
+        to avoid fetching the results from the database twice.
+        """
+        return self._make_specific(list(self._do_search()))
+
+    def _get_specific_queryset(self, model, pks):
+        """
+        Returns a queryset of the given model's objects with the given primary keys,
+        with any select_related/prefetch_related lookups that apply to the model
+        """
+        queryset = model._default_manager.filter(pk__in=pks)
+
+        select_related = [
+            lookup for lookup in self._specific_select_related if _model_has_lookup(model, lookup)
+        ]
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+
+        prefetch_related = [
+            lookup for lookup in self._specific_prefetch_related if _model_has_lookup(model, lookup)
+        ]
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+
+        return queryset
+
+    def _make_specific(self, results):
+        """
+        Replaces each result with an instance of its specific class (using one query
+        per class), keeping the order of the results
+        """
+        pks_by_class = OrderedDict()
+        already_specific = OrderedDict()
+        for obj in results:
+            specific_class = getattr(obj, 'specific_class', None) or type(obj)
+
+            if type(obj) is specific_class:
+                already_specific.setdefault(specific_class, []).append(obj)
+            else:
+                pks_by_class.setdefault(specific_class, []).append(obj.pk)
+
+        specific_objects = {}
+        for specific_class, pks in pks_by_class.items():
+            for obj in self._get_specific_queryset(specific_class, pks):
+                specific_objects[obj.pk] = obj
+
+        # Objects that are already specific just need the related objects fetching
+        for specific_class, objs in already_specific.items():
+            lookups = [
+                lookup for lookup in self._specific_select_related + self._specific_prefetch_related
+                if _model_has_lookup(specific_class, lookup)
+            ]
+            if lookups:
+                prefetch_related_objects(objs, *lookups)
+
+        specific_results = []
+        for obj in results:
+            specific_obj = specific_objects.get(obj.pk, obj)
+
+            if self._score_field and specific_obj is not obj:
+                setattr(specific_obj, self._score_field, getattr(obj, self._score_field, None))
+
+            specific_results.append(specific_obj)
+
+        return specific_results
+
     def _do_count(self):
         raise NotImplementedError
 
     def results(self):
         if self._results_cache is None:
-            self._results_cache = list(self._do_search())
+            if self._specific:
+                self._results_cache = list(self._do_specific_search())
+            else:
+                self._results_cache = list(self._do_search())
         return self._results_cache
 
     def count(self):
@@ -225,8 +348,9 @@ class BaseSearchResults:
             stop = int(key.stop) if key.stop else None
             new._set_limits(start, stop)
 
-            # Copy results cache
-            if self._results_cache is not None:
+            # Copy results cache (unless paginating with cursors, as the cursor
+            # depends on where the page ends)
+            if self._results_cache is not None and not self._use_cursor:
                 new._results_cache = self._results_cache[key]
 
             return new
@@ -255,8 +379,67 @@ class BaseSearchResults:
         clone._score_field = field_name
         return clone
 
+    def specific(self, select_related=None, prefetch_related=None):
+        """
+        Returns the results as instances of their most specific class (for example,
+        the page type of each page), fetched with one query for each class.
+
+        The ``select_related`` and ``prefetch_related`` lookups are applied to the
+        classes that have the relations they refer to.
+        """
+        clone = self._clone()
+        clone._specific = True
+        clone._specific_select_related = list(select_related or [])
+        clone._specific_prefetch_related = list(prefetch_related or [])
+        return clone
+
+    def lite(self):
+        """
+        Returns the results as LiteSearchResult objects, built from the data stored in
+        the search index without querying the database. Only supported by backends that
+        store the indexed data (such as Elasticsearch).
+        """
+        if not self.supports_lite_results:
+            raise NotImplementedError("This search backend doesn't support lite results")
+
+        clone = self._clone()
+        clone._lite = True
+        return clone
+
+    def after(self, cursor=None):
+        """
+        Returns the results that come after the given cursor, or from the first result
+        if the cursor is None. Slicing the returned results sets the page size, and
+        ``next_cursor`` gives the cursor for the following page.
+
+        Unlike slicing with an offset, fetching a page this way takes the same time
+        however deep it is. Only supported by some backends (such as Elasticsearch 5).
+        """
+        if not self.supports_cursor:
+            raise NotImplementedError("This search backend doesn't support cursors")
+
+        clone = self._clone()
+        clone._use_cursor = True
+        clone._cursor = cursor
+        return clone
+
+    @property
+    def next_cursor(self):
+        """
+        The cursor to pass to ``after()`` to get the page following these results, or
+        None if this is the last page. Only set on results returned by ``after()``.
+        """
+        if not self._use_cursor:
+            return None
+
+        self.results()
+        return self._next_cursor
+
 
 class EmptySearchResults(BaseSearchResults):
+    supports_lite_results = True
+    supports_cursor = True
+
     def __init__(self):
         return super().__init__(None, None)
 
@@ -302,6 +485,10 @@ class BaseSearchBackend:
     def delete(self, obj):
         raise NotImplementedError
 
+    def delete_bulk(self, model, obj_list):
+        for obj in obj_list:
+            self.delete(obj)
+
     def search(self, query, model_or_queryset, fields=None, filters=None,
                prefetch_related=None, operator=None, order_by_relevance=True):
         # Find model/queryset
@@ -123,5 +123,8 @@ class DatabaseSearchBackend(BaseSearchBackend):
     def delete(self, obj):
         pass  # Not needed
 
+    def delete_bulk(self, model, obj_list):
+        pass  # Not needed
+
 
 SearchBackend = DatabaseSearchBackend
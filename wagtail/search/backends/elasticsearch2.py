@@ -1,22 +1,31 @@
+import base64
 import copy
 import json
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from urllib.parse import urlparse
 import warnings
 
+from django.apps import apps
 from django.db import DEFAULT_DB_ALIAS, models
 from django.db.models.sql import Query
 from django.db.models.sql.constants import MULTI
 from django.utils.crypto import get_random_string
-from elasticsearch import Elasticsearch, NotFoundError
-from elasticsearch.helpers import bulk
+from elasticsearch import Elasticsearch, NotFoundError, TransportError
+from elasticsearch.helpers import BulkIndexError, expand_action, scan
 
 from wagtail.utils.deprecation import RemovedInWagtail22Warning
 from wagtail.utils.utils import deep_update
 from wagtail.search.backends.base import (
-    BaseSearchBackend, BaseSearchQueryCompiler, BaseSearchResults)
+    BaseSearchBackend, BaseSearchQueryCompiler, BaseSearchResults, LiteSearchResult)
 from wagtail.search.index import (
     FilterField, Indexed, RelatedFields, SearchField, class_is_indexed)
 from wagtail.search.query import MatchAll, Term, Prefix, Fuzzy, And, Or, Not, PlainText, Filter, Boost
+from wagtail.search.utils import pk_from_string
+
+logger = logging.getLogger('wagtail.search')
 
 
 def get_model_root(model):
@@ -595,6 +604,14 @@ class Elasticsearch2SearchQueryCompiler(BaseSearchQueryCompiler):
 
 class Elasticsearch2SearchResults(BaseSearchResults):
     fields_param_name = 'fields'
+    supports_lite_results = True
+
+    # search_after was added in Elasticsearch 5
+    supports_cursor = False
+
+    # Slices that end after this many results are fetched with the scroll API, as
+    # Elasticsearch refuses from/size requests past its index.max_result_window setting
+    max_result_window = 10000
 
     def _get_es_body(self, for_count=False):
         body = {
@@ -609,10 +626,69 @@ class Elasticsearch2SearchResults(BaseSearchResults):
 
         return body
 
+    def _get_source_param(self):
+        if self._lite:
+            return True
+        elif self._specific:
+            # The specific class of each result is the first of its content types
+            return ['content_type']
+        else:
+            return False
+
+    def _get_model_from_hit(self, hit):
+        return apps.get_model(hit['_source']['content_type'][0])
+
+    def _get_specific_objects_from_hits(self, hits):
+        """
+        Fetches the objects for a page of hits as instances of their specific classes,
+        using one query for each class
+        """
+        pks_by_model = OrderedDict()
+        for hit in hits:
+            pks_by_model.setdefault(self._get_model_from_hit(hit), []).append(hit['fields']['pk'][0])
+
+        queryset = self.query_compiler.queryset
+
+        for model, pks in pks_by_model.items():
+            specific_queryset = self._get_specific_queryset(model, pks)
+
+            if queryset.query.where:
+                # Make sure that the results are still in the queryset being searched, in
+                # case the index is out of date
+                specific_queryset = specific_queryset.filter(pk__in=queryset.filter(pk__in=pks).values('pk'))
+
+            yield from specific_queryset
+
+    def _get_lite_results_from_hits(self, hits):
+        """
+        Yields LiteSearchResult objects from a page of hits, using the documents' source
+        """
+        for hit in hits:
+            model = self._get_model_from_hit(hit)
+            mapping = self.backend.mapping_class(model)
+
+            fields = {}
+            for field in model.get_search_fields():
+                column_name = mapping.get_field_column_name(field)
+                if column_name in hit['_source']:
+                    name = field.get_attname(model) if isinstance(field, FilterField) else field.field_name
+                    fields.setdefault(name, hit['_source'][column_name])
+
+            result = LiteSearchResult(model, pk_from_string(model, hit['fields']['pk'][0]), fields)
+
+            if self._score_field:
+                setattr(result, self._score_field, hit['_score'])
+
+            yield result
+
     def _get_results_from_hits(self, hits):
         """
         Yields Django model instances from a page of hits returned by Elasticsearch
         """
+        if self._lite:
+            yield from self._get_lite_results_from_hits(hits)
+            return
+
         # Get pks from results
         pks = [hit['fields']['pk'][0] for hit in hits]
         scores = {str(hit['fields']['pk'][0]): hit['_score'] for hit in hits}
@@ -620,8 +696,13 @@ class Elasticsearch2SearchResults(BaseSearchResults):
         # Initialise results dictionary
         results = {str(pk): None for pk in pks}
 
+        if self._specific:
+            objects = self._get_specific_objects_from_hits(hits)
+        else:
+            objects = self.query_compiler.queryset.filter(pk__in=pks)
+
         # Find objects in database and add them to dict
-        for obj in self.query_compiler.queryset.filter(pk__in=pks):
+        for obj in objects:
             results[str(obj.pk)] = obj
 
             if self._score_field:
@@ -633,7 +714,49 @@ class Elasticsearch2SearchResults(BaseSearchResults):
             if result:
                 yield result
 
-    def _do_search(self):
+    def _get_search_params(self):
+        params = {
+            'index': self.backend.get_index_for_model(self.query_compiler.queryset.model).name,
+            'body': self._get_es_body(),
+            '_source': self._get_source_param(),
+            self.fields_param_name: 'pk',
+        }
+
+        if self._lite:
+            params['_source_exclude'] = '_partials'
+
+        return params
+
+    def _get_cursor_sort(self):
+        """
+        Returns the sort to use when paginating with cursors. This ends with the pk
+        so that results with the same sort values are always in the same order
+        """
+        sort = self.query_compiler.get_sort()
+
+        if sort is None:
+            sort = ['_score']
+
+        if 'pk' not in sort:
+            sort = sort + ['pk']
+
+        return sort
+
+    def _encode_cursor(self, hit):
+        return base64.urlsafe_b64encode(json.dumps(hit['sort']).encode()).decode()
+
+    def _decode_cursor(self, cursor):
+        try:
+            search_after = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        except (ValueError, TypeError, AttributeError):
+            search_after = None
+
+        if not isinstance(search_after, list):
+            raise ValueError("Invalid search cursor: %r" % cursor)
+
+        return search_after
+
+    def _do_scroll_search(self, params):
         PAGE_SIZE = 100
 
         if self.stop is not None:
@@ -641,74 +764,124 @@ class Elasticsearch2SearchResults(BaseSearchResults):
         else:
             limit = None
 
-        use_scroll = limit is None or limit > PAGE_SIZE
+        params.update({
+            'scroll': '2m',
+            'size': PAGE_SIZE,
+        })
 
-        params = {
-            'index': self.backend.get_index_for_model(self.query_compiler.queryset.model).name,
-            'body': self._get_es_body(),
-            '_source': False,
-            self.fields_param_name: 'pk',
-        }
+        # The scroll API doesn't support offset, manually skip the first results
+        skip = self.start
 
-        if use_scroll:
-            params.update({
-                'scroll': '2m',
-                'size': PAGE_SIZE,
-            })
+        # Send to Elasticsearch
+        page = self.backend.es.search(**params)
 
-            # The scroll API doesn't support offset, manually skip the first results
-            skip = self.start
+        while True:
+            hits = page['hits']['hits']
 
-            # Send to Elasticsearch
-            page = self.backend.es.search(**params)
+            if len(hits) == 0:
+                break
 
-            while True:
-                hits = page['hits']['hits']
+            # Get results
+            if skip < len(hits):
+                for result in self._get_results_from_hits(hits):
+                    if limit is not None and limit == 0:
+                        break
 
-                if len(hits) == 0:
+                    if skip == 0:
+                        yield result
+
+                        if limit is not None:
+                            limit -= 1
+                    else:
+                        skip -= 1
+
+                if limit is not None and limit == 0:
                     break
+            else:
+                # Skip whole page
+                skip -= len(hits)
 
-                # Get results
-                if skip < len(hits):
-                    for result in self._get_results_from_hits(hits):
-                        if limit is not None and limit == 0:
-                            break
+            # Fetch next page of results
+            if '_scroll_id' not in page:
+                break
 
-                        if skip == 0:
-                            yield result
+            page = self.backend.es.scroll(scroll_id=page['_scroll_id'], scroll='2m')
 
-                            if limit is not None:
-                                limit -= 1
-                        else:
-                            skip -= 1
+        # Clear the scroll
+        if '_scroll_id' in page:
+            self.backend.es.clear_scroll(scroll_id=page['_scroll_id'])
 
-                    if limit is not None and limit == 0:
-                        break
-                else:
-                    # Skip whole page
-                    skip -= len(hits)
+    def _do_cursor_search(self, params):
+        PAGE_SIZE = 100
 
-                # Fetch next page of results
-                if '_scroll_id' not in page:
-                    break
+        params['body']['sort'] = self._get_cursor_sort()
+        if self._cursor is not None:
+            params['body']['search_after'] = self._decode_cursor(self._cursor)
 
-                page = self.backend.es.scroll(scroll_id=page['_scroll_id'], scroll='2m')
+        # search_after can't be combined with an offset, so the results before the
+        # start of the slice are fetched and skipped. This is usually zero, as the
+        # cursor marks the start of the page
+        skip = self.start
+        self._next_cursor = None
 
-            # Clear the scroll
-            if '_scroll_id' in page:
-                self.backend.es.clear_scroll(scroll_id=page['_scroll_id'])
+        if self.stop is not None:
+            size = self.stop
         else:
-            params.update({
-                'from_': self.start,
-                'size': limit or PAGE_SIZE,
-            })
+            size = PAGE_SIZE
 
-            # Send to Elasticsearch
+        while True:
+            params['size'] = size
             hits = self.backend.es.search(**params)['hits']['hits']
 
-            # Get results
-            for result in self._get_results_from_hits(hits):
-                yield result
+            yield from self._get_results_from_hits(hits[skip:])
+            skip = max(skip - len(hits), 0)
+
+            if len(hits) < size or not hits:
+                # There are no more results
+                break
+
+            if self.stop is not None:
+                # The slice is complete. The next page starts after its last hit
+                self._next_cursor = self._encode_cursor(hits[-1])
+                break
+
+            # Iterating over all of the results, fetch the next page
+            params['body']['search_after'] = hits[-1]['sort']
+
+    def _do_search(self):
+        PAGE_SIZE = 100
+
+        params = self._get_search_params()
+
+        if self._use_cursor:
+            yield from self._do_cursor_search(params)
+            return
+
+        # Bounded slices are fetched with a single from/size request, unless they end
+        # past max_result_window (which Elasticsearch refuses to page through). The
+        # scroll API is only used for iterating over all of the results, as each
+        # scroll keeps a search context open on the cluster
+        if self.stop is None or self.stop > self.max_result_window:
+            yield from self._do_scroll_search(params)
+            return
+
+        limit = self.stop - self.start
+
+        params.update({
+            'from_': self.start,
+            'size': limit or PAGE_SIZE,
+        })
+
+        # Send to Elasticsearch
+        hits = self.backend.es.search(**params)['hits']['hits']
+
+        # Get results
+        for result in self._get_results_from_hits(hits):
+            yield result
+
+    def _do_specific_search(self):
+        # The specific classes are fetched from the hits' content types
+        return self._do_search()
 
     def _do_count(self):
         # Get count
@@ -797,6 +970,15 @@ class Elasticsearch2Index:
         if not class_is_indexed(model):
             return
 
+        self.add_prepared_items(model, self.prepare_items(model, items))
+
+    def prepare_items(self, model, items):
+        """
+        Returns the bulk actions to index the given items, which can be pickled
+        and passed to add_prepared_items (see the update_index command's --workers
+        option). The actions don't include the index name, so they can be prepared
+        by any index object of the backend.
+        """
         # Get mapping
         mapping = self.mapping_class(model)
         doc_type = mapping.get_document_type()
@@ -806,15 +988,21 @@ class Elasticsearch2Index:
         for item in items:
             # Create the action
             action = {
-                '_index': self.name,
                 '_type': doc_type,
                 '_id': mapping.get_document_id(item),
             }
             action.update(mapping.get_document(item))
             actions.append(action)
 
+        return actions
+
+    def add_prepared_items(self, model, prepared_items):
+        actions = [dict(action, _index=self.name) for action in prepared_items]
+
         # Run the actions
-        bulk(self.es, actions)
+        errors = self.backend.get_bulk_indexer().run(actions)
+        if errors:
+            raise BulkIndexError("%i document(s) failed to index." % len(errors), errors)
 
     def delete_item(self, item):
         # Make sure the object can be indexed
@@ -834,6 +1022,52 @@ class Elasticsearch2Index:
         except NotFoundError:
             pass  # Document doesn't exist, ignore this exception
 
+    def delete_items(self, model, items):
+        if not class_is_indexed(model):
+            return
+
+        # Get mapping
+        mapping = self.mapping_class(model)
+        doc_type = mapping.get_document_type()
+
+        # Create list of actions
+        actions = []
+        for item in items:
+            actions.append({
+                '_op_type': 'delete',
+                '_index': self.name,
+                '_type': doc_type,
+                '_id': mapping.get_document_id(item),
+            })
+
+        # Run the actions, ignoring any documents that don't exist
+        errors = self.backend.get_bulk_indexer().run(actions)
+        errors = [error for error in errors if error.get('delete', {}).get('status') != 404]
+        if errors:
+            raise Exception("Failed to delete %d documents: %r" % (len(errors), errors))
+
+    def get_item_pks(self, model):
+        """
+        Yields the primary keys (as strings) of the documents of the given model in the index
+        """
+        mapping = self.mapping_class(model)
+
+        hits = scan(
+            self.es, index=self.name, doc_type=mapping.get_document_type(),
+            query={'query': {'match_all': {}}}, _source=False
+        )
+        for hit in hits:
+            # Document IDs are "<toplevel content type>:<pk>"
+            yield hit['_id'].split(':', 1)[1]
+
+    def get_settings(self):
+        # The response is keyed by the name of the index (which differs from self.name if this is an alias)
+        response = self.es.indices.get_settings(index=self.name)
+        return list(response.values())[0]['settings']['index']
+
+    def put_settings(self, settings):
+        self.es.indices.put_settings(index=self.name, body={'index': settings})
+
     def refresh(self):
         self.es.indices.refresh(self.name)
 
@@ -845,6 +1079,130 @@ class Elasticsearch2Index:
         self.put()
 
 
+class ElasticsearchBulkIndexer:
+    """
+    Sends actions to Elasticsearch's bulk API, in chunks that are limited by both the
+    number of actions and their size in bytes. Actions that Elasticsearch rejects
+    because it is overloaded are retried with an exponential backoff, and chunks can
+    be sent from several threads at once.
+    """
+    # Statuses of the actions (or whole requests) that Elasticsearch rejected because
+    # its queues were full (es_rejected_execution_exception)
+    retry_statuses = {429}
+
+    def __init__(self, es, chunk_size=500, max_chunk_bytes=10 * 1024 * 1024, thread_count=1,
+                 max_retries=3, initial_backoff=2, max_backoff=60):
+        self.es = es
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.thread_count = thread_count
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+    def chunk_actions(self, actions):
+        """
+        Serialises the actions and splits them into chunks. Each action is yielded as
+        the list of lines that it adds to the request body
+        """
+        serializer = self.es.transport.serializer
+        chunk = []
+        chunk_bytes = 0
+
+        for action in actions:
+            action_line, data = expand_action(action)
+            lines = [serializer.dumps(action_line)]
+            if data is not None:
+                lines.append(serializer.dumps(data))
+
+            # Each line is followed by a newline
+            action_bytes = sum(len(line.encode('utf-8')) + 1 for line in lines)
+
+            if chunk and (len(chunk) >= self.chunk_size or chunk_bytes + action_bytes > self.max_chunk_bytes):
+                yield chunk
+                chunk = []
+                chunk_bytes = 0
+
+            chunk.append(lines)
+            chunk_bytes += action_bytes
+
+        if chunk:
+            yield chunk
+
+    def sleep(self, attempt):
+        time.sleep(min(self.initial_backoff * 2 ** (attempt - 1), self.max_backoff))
+
+    def send_chunk(self, chunk):
+        """
+        Sends a chunk of actions, retrying any that are rejected. Returns the errors of
+        the actions that failed
+        """
+        errors = []
+        attempt = 0
+
+        while chunk:
+            if attempt:
+                self.sleep(attempt)
+
+            body = '\n'.join(line for lines in chunk for line in lines) + '\n'
+
+            try:
+                response = self.es.bulk(body)
+            except TransportError as e:
+                if e.status_code in self.retry_statuses and attempt < self.max_retries:
+                    attempt += 1
+                    continue
+
+                raise
+
+            rejected = []
+            for lines, item in zip(chunk, response['items']):
+                op_type, info = list(item.items())[0]
+                status = info.get('status', 500)
+
+                if 200 <= status < 300:
+                    continue
+
+                if status in self.retry_statuses and attempt < self.max_retries:
+                    rejected.append(lines)
+                else:
+                    errors.append({op_type: info})
+
+            if rejected:
+                logger.warning("Elasticsearch rejected %d bulk actions, retrying", len(rejected))
+
+            chunk = rejected
+            attempt += 1
+
+        return errors
+
+    def run(self, actions):
+        """
+        Sends the actions to Elasticsearch. Returns the errors of the actions that failed
+        """
+        chunks = self.chunk_actions(actions)
+
+        if self.thread_count <= 1:
+            return [error for chunk in chunks for error in self.send_chunk(chunk)]
+
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.thread_count) as executor:
+            # Don't serialise too far ahead of the requests
+            pending = set()
+            for chunk in chunks:
+                pending.add(executor.submit(self.send_chunk, chunk))
+
+                if len(pending) >= self.thread_count * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        errors.extend(future.result())
+
+            for future in pending:
+                errors.extend(future.result())
+
+        return errors
+
+
 class ElasticsearchIndexRebuilder:
     def __init__(self, index):
         self.index = index
@@ -863,6 +1221,14 @@ class ElasticsearchIndexRebuilder:
 
 
 class ElasticsearchAtomicIndexRebuilder(ElasticsearchIndexRebuilder):
+    # The new index isn't searched until the rebuild has finished, so it doesn't need
+    # refreshing or replicating while it is being built. finish() restores the
+    # settings the index was created with
+    rebuild_index_settings = {
+        'refresh_interval': '-1',
+        'number_of_replicas': 0,
+    }
+
     def __init__(self, index):
         self.alias = index
         self.index = index.backend.index_class(
@@ -885,9 +1251,17 @@ class ElasticsearchAtomicIndexRebuilder(ElasticsearchIndexRebuilder):
         # Create the new index
         self.index.put()
 
+        index_settings = self.index.get_settings()
+        self.original_index_settings = {
+            name: index_settings.get(name, '1s' if name == 'refresh_interval' else None)
+            for name in self.rebuild_index_settings
+        }
+        self.index.put_settings(self.rebuild_index_settings)
+
         return self.index
 
     def finish(self):
+        self.index.put_settings(self.original_index_settings)
         self.index.refresh()
 
         if self.alias.is_alias():
@@ -926,6 +1300,7 @@ class Elasticsearch2SearchBackend(BaseSearchBackend):
     mapping_class = Elasticsearch2Mapping
     basic_rebuilder_class = ElasticsearchIndexRebuilder
     atomic_rebuilder_class = ElasticsearchAtomicIndexRebuilder
+    bulk_indexer_class = ElasticsearchBulkIndexer
 
     settings = {
         'settings': {
@@ -979,6 +1354,11 @@ class Elasticsearch2SearchBackend(BaseSearchBackend):
         self.index_name = params.pop('INDEX', 'wagtail')
         self.timeout = params.pop('TIMEOUT', 10)
 
+        self.bulk_chunk_size = params.pop('BULK_CHUNK_SIZE', 500)
+        self.bulk_max_chunk_bytes = params.pop('BULK_MAX_CHUNK_BYTES', 10 * 1024 * 1024)
+        self.bulk_thread_count = params.pop('BULK_THREAD_COUNT', 1)
+        self.bulk_max_retries = params.pop('BULK_MAX_RETRIES', 3)
+
         if params.pop('ATOMIC_REBUILD', False):
             self.rebuilder_class = self.atomic_rebuilder_class
         else:
@@ -1035,6 +1415,15 @@ class Elasticsearch2SearchBackend(BaseSearchBackend):
     def get_rebuilder(self):
         return self.rebuilder_class(self.get_index())
 
+    def get_bulk_indexer(self):
+        return self.bulk_indexer_class(
+            self.es,
+            chunk_size=self.bulk_chunk_size,
+            max_chunk_bytes=self.bulk_max_chunk_bytes,
+            thread_count=self.bulk_thread_count,
+            max_retries=self.bulk_max_retries,
+        )
+
     def reset_index(self):
         # Use the rebuilder to reset the index
         self.get_rebuilder().reset_index()
@@ -1084,5 +1473,8 @@ class Elasticsearch2SearchBackend(BaseSearchBackend):
 
         self.get_index_for_model(type(obj)).delete_item(obj)
 
+    def delete_bulk(self, model, obj_list):
+        self.get_index_for_model(model).delete_items(model, obj_list)
+
 
 SearchBackend = Elasticsearch2SearchBackend
@@ -91,6 +91,7 @@ class Elasticsearch5SearchQueryCompiler(Elasticsearch2SearchQueryCompiler):
 
 class Elasticsearch5SearchResults(Elasticsearch2SearchResults):
     fields_param_name = 'stored_fields'
+    supports_cursor = True
 
 
 class Elasticsearch5SearchBackend(Elasticsearch2SearchBackend):
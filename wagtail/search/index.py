@@ -7,6 +7,7 @@ from django.db import models
 from django.db.models.fields import FieldDoesNotExist
 from django.db.models.fields.related import ForeignObjectRel, OneToOneRel, RelatedField
 
+from wagtail.search import index_queue
 from wagtail.search.backends import get_search_backends_with_name
 
 logger = logging.getLogger('wagtail.search.index')
@@ -76,6 +77,21 @@ class Indexed:
 
         return queryset
 
+    @classmethod
+    def get_indexed_objects_changed_since(cls, since):
+        """
+        Returns the indexed objects where any of the search_timestamp_fields are at or
+        after the given time, or None if the model doesn't have any timestamp fields
+        """
+        if not cls.search_timestamp_fields:
+            return None
+
+        changed = models.Q()
+        for field_name in cls.search_timestamp_fields:
+            changed |= models.Q(**{field_name + '__gte': since})
+
+        return cls.get_indexed_objects().filter(changed)
+
     def get_indexed_instance(self):
         """
         If the indexed model uses multi table inheritance, override this method
@@ -113,6 +129,10 @@ class Indexed:
 
     search_fields = []
 
+    # DateTimeFields that are updated whenever the object is changed, for the
+    # update_index --incremental command
+    search_timestamp_fields = []
+
 
 def get_indexed_models():
     return [
@@ -138,6 +158,14 @@ def get_indexed_instance(instance, check_exists=True):
 
 
 def insert_or_update_object(instance):
+    if index_queue.is_enabled():
+        # Whether the object is in its class's indexed objects is checked when
+        # the queue is flushed
+        indexed_instance = get_indexed_instance(instance, check_exists=False)
+        if indexed_instance:
+            index_queue.add(indexed_instance)
+        return
+
     indexed_instance = get_indexed_instance(instance)
 
     if indexed_instance:
@@ -152,6 +180,10 @@ def insert_or_update_object(instance):
 def remove_object(instance):
     indexed_instance = get_indexed_instance(instance, check_exists=False)
 
+    if indexed_instance and index_queue.is_enabled():
+        index_queue.add(indexed_instance)
+        return
+
     if indexed_instance:
         for backend_name, backend in get_search_backends_with_name(with_auto_update=True):
             try:
@@ -250,25 +282,46 @@ class RelatedFields:
         It decides which method to call based on the number of related objects:
          - single (eg ForeignKey, OneToOne), it runs select_related
          - multiple (eg ManyToMany, reverse ForeignKey) it runs prefetch_related
+
+        Nested RelatedFields are fetched in the same way, through the lookups of
+        the relations they are nested in.
         """
+        return self._select_on_queryset(queryset, queryset.model, '', True)
+
+    def _select_on_queryset(self, queryset, model, prefix, can_select_related):
         try:
-            field = self.get_field(queryset.model)
+            field = self.get_field(model)
         except FieldDoesNotExist:
             return queryset
 
         if isinstance(field, RelatedField):
             if field.many_to_one or field.one_to_one:
-                queryset = queryset.select_related(self.field_name)
+                multiple = False
             elif field.one_to_many or field.many_to_many:
-                queryset = queryset.prefetch_related(self.field_name)
+                multiple = True
+            else:
+                return queryset
 
         elif isinstance(field, ForeignObjectRel):
-            # Reverse relation
-            if isinstance(field, OneToOneRel):
-                # select_related for reverse OneToOneField
-                queryset = queryset.select_related(self.field_name)
-            else:
-                # prefetch_related for anything else (reverse ForeignKey/ManyToManyField)
-                queryset = queryset.prefetch_related(self.field_name)
+            # Reverse relation. Only reverse OneToOneFields have a single object
+            multiple = not isinstance(field, OneToOneRel)
+
+        else:
+            return queryset
+
+        lookup = prefix + self.field_name
+
+        # select_related can only follow a chain of single objects
+        can_select_related = can_select_related and not multiple
+        if can_select_related:
+            queryset = queryset.select_related(lookup)
+        else:
+            queryset = queryset.prefetch_related(lookup)
+
+        for sub_field in self.fields:
+            if isinstance(sub_field, RelatedFields):
+                queryset = sub_field._select_on_queryset(
+                    queryset, field.related_model, lookup + '__', can_select_related
+                )
 
         return queryset
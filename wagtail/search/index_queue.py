@@ -0,0 +1,162 @@
+"""
+A queue of search index updates, used by insert_or_update_object and
+remove_object when WAGTAILSEARCH_QUEUE_INDEX_UPDATES is set.
+
+Rather than updating the search backends straight away, the objects that have
+been saved or deleted in the current transaction are collected, with each
+object only recorded once. When the transaction is committed, they are
+re-fetched from the database in chunks and sent to the backends with
+add_bulk; any that no longer exist (or are no longer in their model's indexed
+objects) are removed with delete_bulk. Nothing is sent if the transaction is
+rolled back.
+
+With WAGTAILSEARCH_BACKGROUND_INDEX_UPDATES, the updates are sent from a
+background thread so that they don't hold up the request that made them.
+"""
+import copy
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from wagtail.search.backends import get_search_backends_with_name
+
+logger = logging.getLogger('wagtail.search.index')
+
+
+def is_enabled():
+    return getattr(settings, 'WAGTAILSEARCH_QUEUE_INDEX_UPDATES', False)
+
+
+def get_batch_size():
+    return getattr(settings, 'WAGTAILSEARCH_INDEX_UPDATE_BATCH_SIZE', 1000)
+
+
+def updates_run_in_background():
+    return getattr(settings, 'WAGTAILSEARCH_BACKGROUND_INDEX_UPDATES', False)
+
+
+class IndexUpdateBatch:
+    """
+    The objects to update in the search index once a transaction is committed
+    """
+    def __init__(self, using):
+        self.using = using
+        self.committed = False
+
+        # {(model, pk): instance}
+        self.objects = OrderedDict()
+
+    def add(self, instance):
+        # Copy the instance, so that we still have its primary key once it has
+        # been deleted
+        self.objects[(type(instance), instance.pk)] = copy.copy(instance)
+
+    def commit(self):
+        self.committed = True
+
+        if updates_run_in_background():
+            _get_executor().submit(self.run_in_background)
+        else:
+            self.run()
+
+    def run_in_background(self):
+        try:
+            self.run()
+        except Exception:
+            logger.exception("Exception raised while updating the search index")
+        finally:
+            # Each thread has its own database connection, which Django won't close for us
+            connections[self.using].close()
+
+    def run(self):
+        batch_size = get_batch_size()
+        objects_by_model = OrderedDict()
+        for (model, pk), instance in self.objects.items():
+            objects_by_model.setdefault(model, []).append(instance)
+
+        backends = list(get_search_backends_with_name(with_auto_update=True))
+
+        for model, instances in objects_by_model.items():
+            for i in range(0, len(instances), batch_size):
+                chunk = instances[i:i + batch_size]
+
+                indexed_objects = list(
+                    model.get_indexed_objects().using(self.using).filter(pk__in=[instance.pk for instance in chunk])
+                )
+                indexed_pks = {obj.pk for obj in indexed_objects}
+                removed_objects = [instance for instance in chunk if instance.pk not in indexed_pks]
+
+                for backend_name, backend in backends:
+                    if indexed_objects:
+                        try:
+                            backend.add_bulk(model, indexed_objects)
+                        except Exception:
+                            # Catch and log all errors
+                            logger.exception(
+                                "Exception raised while adding %d %s objects into the '%s' search backend",
+                                len(indexed_objects), model.__name__, backend_name)
+
+                    if removed_objects:
+                        try:
+                            backend.delete_bulk(model, removed_objects)
+                        except Exception:
+                            # Catch and log all errors
+                            logger.exception(
+                                "Exception raised while deleting %d %s objects from the '%s' search backend",
+                                len(removed_objects), model.__name__, backend_name)
+
+
+_local = threading.local()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            # A single thread, so that updates are applied in the order they were committed
+            _executor = ThreadPoolExecutor(max_workers=1)
+
+        return _executor
+
+
+def _get_pending_batch(using):
+    batches = getattr(_local, 'batches', None)
+    if batches is None:
+        batches = _local.batches = {}
+
+    batch = batches.get(using)
+    if batch is None or batch.committed:
+        return None
+
+    # If the transaction (or the savepoint the batch was created in) was rolled
+    # back, Django will have discarded the batch's on_commit callback
+    if not any(func == batch.commit for sids, func in connections[using].run_on_commit):
+        return None
+
+    return batch
+
+
+def add(instance):
+    """
+    Queue an update to the search index entry of the given object, which should be
+    the object's indexed instance (see Indexed.get_indexed_instance)
+    """
+    using = instance._state.db or DEFAULT_DB_ALIAS
+    batch = _get_pending_batch(using)
+
+    if batch is None:
+        batch = IndexUpdateBatch(using)
+        batch.add(instance)
+        _local.batches[using] = batch
+
+        # If there's no transaction, this runs the batch straight away
+        transaction.on_commit(batch.commit, using=using)
+    else:
+        batch.add(instance)
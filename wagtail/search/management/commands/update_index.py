@@ -1,11 +1,20 @@
 import collections
+import json
+import multiprocessing
+import os
+import time
+from datetime import timedelta
 
+from django.apps import apps
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
 
 from wagtail.search.backends import get_search_backend
 from wagtail.search.index import get_indexed_models
+from wagtail.search.models import IndexWatermark
+from wagtail.search.utils import pk_from_string
 
 
 def group_models_by_index(backend, models):
@@ -49,8 +58,90 @@ def group_models_by_index(backend, models):
     ])
 
 
+def prepare_chunk(backend_name, model_label, first_pk, last_pk):
+    """
+    Return the documents for the indexed objects of the given model with primary
+    keys from first_pk to last_pk, prepared by the backend's index for the model
+    (see prepare_items), along with the number of objects. Runs in the worker
+    processes when --workers is used.
+    """
+    model = apps.get_model(model_label)
+    index = get_search_backend(backend_name).get_index_for_model(model)
+    objects = list(model.get_indexed_objects().filter(pk__gte=first_pk, pk__lte=last_pk).order_by('pk'))
+    return index.prepare_items(model, objects), len(objects)
+
+
+class Checkpoint:
+    """
+    Records how far update_index has got through each model in a JSON file, so
+    that an interrupted rebuild can be resumed
+    """
+    def __init__(self, path):
+        self.path = path
+
+        if os.path.exists(path):
+            with open(path) as f:
+                self.data = json.load(f)
+        else:
+            self.data = {}
+
+    def get_index_state(self, backend_name, index_name):
+        """
+        Returns the progress for the given index, or None if it hasn't been started
+        """
+        return self.data.get(backend_name, {}).get(index_name)
+
+    def start_index(self, backend_name, index_name):
+        self.data.setdefault(backend_name, {})[index_name] = {'done': [], 'last_pk': {}}
+        self.save()
+
+    def set_last_pk(self, backend_name, index_name, model, pk):
+        self.data[backend_name][index_name]['last_pk'][model._meta.label] = str(pk)
+        self.save()
+
+    def finish_model(self, backend_name, index_name, model):
+        state = self.data[backend_name][index_name]
+        state['last_pk'].pop(model._meta.label, None)
+        state['done'].append(model._meta.label)
+        self.save()
+
+    def finish_index(self, backend_name, index_name):
+        self.data[backend_name].pop(index_name)
+        if not self.data[backend_name]:
+            self.data.pop(backend_name)
+
+        if self.data:
+            self.save()
+        elif os.path.exists(self.path):
+            os.remove(self.path)
+
+    def save(self):
+        # Write to a temporary file first, so that the checkpoint can't be left half written
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.data, f)
+
+        os.replace(temp_path, self.path)
+
+
+def get_watermark_margin():
+    """
+    Returns how far before the start of a run the watermark is recorded. Objects
+    whose timestamps are set shortly before they are committed (such as pages
+    being published while the command starts) are then picked up by the next
+    incremental update
+    """
+    return timedelta(seconds=getattr(settings, 'WAGTAILSEARCH_INCREMENTAL_UPDATE_MARGIN', 60))
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '%d:%02d:%02d' % (hours, minutes, seconds)
+
+
 class Command(BaseCommand):
-    def update_backend(self, backend_name, schema_only=False):
+    def update_backend(self, backend_name, schema_only=False, incremental=False, delete_stale=False):
         self.stdout.write("Updating backend: " + backend_name)
 
         backend = get_search_backend(backend_name)
@@ -59,16 +150,46 @@ class Command(BaseCommand):
             self.stdout.write("Backend '%s' doesn't require rebuilding" % backend_name)
             return
 
+        # Anything changed while the command is running will be picked up by the next incremental update
+        watermark = timezone.now() - get_watermark_margin()
+
+        if incremental:
+            since = IndexWatermark.get(backend_name)
+            if since is not None:
+                self.update_backend_incrementally(backend_name, backend, since, delete_stale=delete_stale)
+                IndexWatermark.set(backend_name, watermark)
+                return
+
+            self.stdout.write("Backend '%s' hasn't been fully indexed yet, rebuilding" % backend_name)
+
+        if self.checkpoint is not None and backend.rebuilder_class is getattr(backend, 'atomic_rebuilder_class', None):
+            # Atomic rebuilds write to a new index (or a transaction) that would be lost if the command was interrupted
+            raise CommandError("Backend '%s': --checkpoint can't be used with ATOMIC_REBUILD" % backend_name)
+
         models_grouped_by_index = group_models_by_index(backend, get_indexed_models()).items()
         if not models_grouped_by_index:
             self.stdout.write(backend_name + ": No indices to rebuild")
 
         for index, models in models_grouped_by_index:
-            self.stdout.write(backend_name + ": Rebuilding index %s" % index.name)
-
-            # Start rebuild
+            index_name = index.name
             rebuilder = backend.rebuilder_class(index)
-            index = rebuilder.start()
+
+            state = None
+            if self.checkpoint is not None:
+                state = self.checkpoint.get_index_state(backend_name, index_name)
+
+            if state is not None:
+                # Add the remaining objects to the existing index, rather than resetting it
+                self.stdout.write(backend_name + ": Resuming rebuild of index %s" % index_name)
+            else:
+                self.stdout.write(backend_name + ": Rebuilding index %s" % index_name)
+
+                # Start rebuild
+                index = rebuilder.start()
+
+                if self.checkpoint is not None:
+                    self.checkpoint.start_index(backend_name, index_name)
+                    state = self.checkpoint.get_index_state(backend_name, index_name)
 
             # Add models
             for model in models:
@@ -78,21 +199,141 @@ class Command(BaseCommand):
             object_count = 0
             if not schema_only:
                 for model in models:
-                    self.stdout.write('{}: {}.{} '.format(backend_name, model._meta.app_label, model.__name__).ljust(35), ending='')
+                    if state is not None and model._meta.label in state['done']:
+                        continue
+
+                    start_after = None
+                    if state is not None and model._meta.label in state['last_pk']:
+                        start_after = pk_from_string(model, state['last_pk'][model._meta.label])
 
-                    # Add items (1000 at a time)
-                    for chunk in self.print_iter_progress(self.queryset_chunks(model.get_indexed_objects().order_by('pk'))):
-                        index.add_items(model, chunk)
-                        object_count += len(chunk)
+                    object_count += self.index_model(backend_name, index_name, index, model, start_after=start_after)
 
-                    self.print_newline()
+                    if self.checkpoint is not None:
+                        self.checkpoint.finish_model(backend_name, index_name, model)
 
             # Finish rebuild
             rebuilder.finish()
 
+            if self.checkpoint is not None:
+                self.checkpoint.finish_index(backend_name, index_name)
+
             self.stdout.write(backend_name + ": indexed %d objects" % object_count)
             self.print_newline()
 
+        if not schema_only:
+            IndexWatermark.set(backend_name, watermark)
+
+    def update_backend_incrementally(self, backend_name, backend, since, delete_stale=False):
+        """
+        Update the objects that have changed since the given time, and if
+        ``delete_stale`` is set, delete any that no longer exist, without
+        rebuilding the indexes
+        """
+        for index, models in group_models_by_index(backend, get_indexed_models()).items():
+            self.stdout.write(backend_name + ": Updating index %s with changes since %s" % (index.name, since))
+
+            object_count = 0
+            deleted_count = 0
+            for model in models:
+                index.add_model(model)
+
+                queryset = model.get_indexed_objects_changed_since(since)
+                if queryset is None:
+                    self.stdout.write("{}: {}.{} has no search_timestamp_fields, skipping".format(
+                        backend_name, model._meta.app_label, model.__name__
+                    ))
+                else:
+                    object_count += self.index_model(backend_name, index.name, index, model, queryset=queryset)
+
+                if delete_stale:
+                    # This reads the primary keys of every object in the index and the database
+                    deleted_count += self.delete_stale_items(index, model)
+
+            index.refresh()
+
+            self.stdout.write(backend_name + ": indexed %d objects, deleted %d objects" % (object_count, deleted_count))
+            self.print_newline()
+
+    def delete_stale_items(self, index, model):
+        """
+        Delete the objects of the given model that are in the index, but not in the
+        model's indexed objects. Returns the number of objects deleted.
+        """
+        if not hasattr(index, 'get_item_pks'):
+            return 0
+
+        existing_pks = {str(pk) for pk in model.get_indexed_objects().values_list('pk', flat=True).iterator()}
+        stale_pks = [pk for pk in index.get_item_pks(model) if str(pk) not in existing_pks]
+
+        for i in range(0, len(stale_pks), self.chunk_size):
+            index.delete_items(model, [
+                model(pk=pk_from_string(model, pk)) for pk in stale_pks[i:i + self.chunk_size]
+            ])
+
+        return len(stale_pks)
+
+    def index_model(self, backend_name, index_name, index, model, start_after=None, queryset=None):
+        """
+        Add the indexed objects of the given model (or the given queryset of them) to
+        the index, starting after the given primary key. Returns the number of
+        objects added.
+        """
+        # The worker processes fetch all of the indexed objects in each chunk's primary key
+        # range, and prepare their documents. This is only possible if the index can add
+        # documents that have been prepared elsewhere
+        use_pool = self.pool is not None and queryset is None and hasattr(index, 'prepare_items')
+
+        if queryset is None:
+            queryset = model.get_indexed_objects()
+
+        if start_after is not None:
+            queryset = queryset.filter(pk__gt=start_after)
+
+        model_name = '{}.{}'.format(model._meta.app_label, model.__name__)
+        total = queryset.count()
+        start_time = time.time()
+        object_count = 0
+
+        if use_pool:
+            chunks = self.prepare_chunks_in_pool(backend_name, model, queryset)
+        else:
+            chunks = (
+                (chunk, len(chunk), chunk[-1].pk)
+                for chunk in self.queryset_chunks(queryset, chunk_size=self.chunk_size)
+            )
+
+        for chunk, chunk_count, last_pk in chunks:
+            if not chunk_count:
+                # The objects were deleted after the chunk's primary keys were fetched
+                pass
+            elif use_pool:
+                index.add_prepared_items(model, chunk)
+            else:
+                index.add_items(model, chunk)
+
+            object_count += chunk_count
+
+            if self.checkpoint is not None:
+                self.checkpoint.set_last_pk(backend_name, index_name, model, last_pk)
+
+            self.print_progress(backend_name, model_name, object_count, total, time.time() - start_time)
+
+        if not object_count:
+            self.print_progress(backend_name, model_name, 0, 0, 0)
+
+        return object_count
+
+    def print_progress(self, backend_name, model_name, count, total, elapsed):
+        rate = count / elapsed if elapsed else 0
+        if rate and count < total:
+            eta = format_duration((total - count) / rate)
+        else:
+            eta = format_duration(0)
+
+        self.stdout.write("{}: {} {}/{} objects ({:.1f} objects/s, ETA {})".format(
+            backend_name, model_name, count, total, rate, eta
+        ))
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--backend', action='store', dest='backend_name', default=None,
@@ -100,6 +341,22 @@ class Command(BaseCommand):
         parser.add_argument(
             '--schema-only', action='store_true', dest='schema_only', default=False,
             help="Prevents loading any data into the index")
+        parser.add_argument(
+            '--chunk-size', type=int, dest='chunk_size', default=1000,
+            help="The number of objects to fetch from the database and add to the index at a time")
+        parser.add_argument(
+            '--workers', type=int, dest='workers', default=1,
+            help="The number of processes to fetch objects from the database and prepare their documents in")
+        parser.add_argument(
+            '--checkpoint', action='store', dest='checkpoint', default=None,
+            help="A file to record progress in. If the command is interrupted, running it again "
+                 "with the same file resumes the rebuild where it stopped")
+        parser.add_argument(
+            '--incremental', action='store_true', dest='incremental', default=False,
+            help="Only update the objects that have changed since the last successful run")
+        parser.add_argument(
+            '--delete-stale', action='store_true', dest='delete_stale', default=False,
+            help="With --incremental, also delete objects that no longer exist from the index")
 
     def handle(self, **options):
         # Get list of backends to index
@@ -113,49 +370,95 @@ class Command(BaseCommand):
             # index the 'default' backend only
             backend_names = ['default']
 
-        # Update backends
-        for backend_name in backend_names:
-            self.update_backend(backend_name, schema_only=options.get('schema_only', False))
+        self.chunk_size = options.get('chunk_size', 1000)
+        self.workers = options.get('workers', 1)
+        self.checkpoint = Checkpoint(options['checkpoint']) if options.get('checkpoint') else None
+
+        incremental = options.get('incremental', False)
+        if incremental and (self.checkpoint is not None or options.get('schema_only')):
+            raise CommandError("--incremental can't be used with --checkpoint or --schema-only")
+
+        delete_stale = options.get('delete_stale', False)
+        if delete_stale and not incremental:
+            raise CommandError("--delete-stale can only be used with --incremental")
+
+        self.pool = None
+        if self.workers > 1:
+            # Child processes must open their own database connections. The pool is started
+            # before any indexes are rebuilt, as rebuilding may keep a transaction open
+            connections.close_all()
+            self.pool = multiprocessing.Pool(self.workers)
+
+        try:
+            # Update backends
+            for backend_name in backend_names:
+                self.update_backend(
+                    backend_name, schema_only=options.get('schema_only', False), incremental=incremental,
+                    delete_stale=delete_stale
+                )
+        finally:
+            if self.pool is not None:
+                self.pool.close()
+                self.pool.join()
 
     def print_newline(self):
         self.stdout.write('')
 
-    def print_iter_progress(self, iterable):
+    def pk_ranges(self, qs, chunk_size=1000):
+        """
+        Yield the first and last primary keys of each chunk of at most ``chunk_size``
+        objects in the queryset, using keyset pagination so that only the primary
+        key index has to be read
         """
-        Print a progress meter while iterating over an iterable. Use it as part
-        of a ``for`` loop::
+        pks = qs.order_by('pk').values_list('pk', flat=True)
+        last_pk = None
+
+        while True:
+            chunk_pks = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+            chunk_pks = list(chunk_pks[:chunk_size])
+            if not chunk_pks:
+                break
 
-            for item in self.print_iter_progress(big_long_list):
-                self.do_expensive_computation(item)
+            yield chunk_pks[0], chunk_pks[-1]
+            last_pk = chunk_pks[-1]
 
-        A ``.`` character is printed for every value in the iterable,
-        a space every 10 items, and a new line every 50 items.
+    def prepare_chunks_in_pool(self, backend_name, model, qs):
+        """
+        Yield (prepared documents, number of objects, last primary key) for each chunk
+        of the queryset in order, as they are prepared by the worker processes
         """
-        for i, value in enumerate(iterable, start=1):
-            yield value
-            self.stdout.write('.', ending='')
-            if i % 40 == 0:
-                self.print_newline()
-                self.stdout.write(' ' * 35, ending='')
+        # Only queue a few chunks for each worker, so that prepared documents don't pile up in memory
+        max_pending = self.workers * 2
+        pending = collections.deque()
+
+        for first_pk, last_pk in self.pk_ranges(qs, chunk_size=self.chunk_size):
+            result = self.pool.apply_async(prepare_chunk, (backend_name, model._meta.label, first_pk, last_pk))
+            pending.append((result, last_pk))
 
-            elif i % 10 == 0:
-                self.stdout.write(' ', ending='')
+            if len(pending) >= max_pending:
+                result, last_pk = pending.popleft()
+                yield result.get() + (last_pk, )
 
-            self.stdout.flush()
+        while pending:
+            result, last_pk = pending.popleft()
+            yield result.get() + (last_pk, )
 
-    # Atomic so the count of models doesnt change as it is iterated
-    @transaction.atomic
     def queryset_chunks(self, qs, chunk_size=1000):
         """
         Yield a queryset in chunks of at most ``chunk_size``. The chunk yielded
-        will be a list, not a queryset. Iterating over the chunks is done in a
-        transaction so that the order and count of items in the queryset
-        remains stable.
+        will be a list, not a queryset. Chunks are fetched in primary key order
+        by filtering on the last primary key of the previous chunk, so that
+        fetching each chunk is equally fast however far through the queryset it
+        is.
         """
-        i = 0
+        qs = qs.order_by('pk')
+        last_pk = None
+
         while True:
-            items = list(qs[i * chunk_size:][:chunk_size])
+            chunk_qs = qs if last_pk is None else qs.filter(pk__gt=last_pk)
+            items = list(chunk_qs[:chunk_size])
             if not items:
                 break
+
             yield items
-            i += 1
+            last_pk = items[-1].pk
@@ -0,0 +1,21 @@
+# Generated by Django 2.0.13 on 2026-10-17 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailsearch', '0003_remove_editors_pick'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexWatermark',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('backend_name', models.CharField(max_length=255, unique=True)),
+                ('indexed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.0.13 on 2026-10-17 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wagtailsearch', '0004_indexwatermark'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='querydailyhits',
+            index=models.Index(fields=['date', 'query', 'hits'], name='wagtailsear_date_21cfaa_idx'),
+        ),
+    ]
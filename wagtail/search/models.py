@@ -1,10 +1,11 @@
 import datetime
 
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
+from wagtail.search import query_hits
 from wagtail.search.utils import MAX_QUERY_STRING_LENGTH, normalise_query_string
 
 
@@ -20,9 +21,11 @@ class Query(models.Model):
     def add_hit(self, date=None):
         if date is None:
             date = timezone.now().date()
-        daily_hits, created = QueryDailyHits.objects.get_or_create(query=self, date=date)
-        daily_hits.hits = models.F('hits') + 1
-        daily_hits.save()
+
+        if query_hits.is_enabled():
+            query_hits.add(self.pk, date)
+        else:
+            QueryDailyHits.add_hits(self.pk, date, 1)
 
     def __str__(self):
         return self.query_string
@@ -47,9 +50,13 @@ class Query(models.Model):
 
     @classmethod
     def get_most_popular(cls, date_since=None):
-        # TODO: Implement date_since
-        return (cls.objects.filter(daily_hits__isnull=False)
-                .annotate(_hits=models.Sum('daily_hits__hits'))
+        if date_since is None:
+            queries = cls.objects.filter(daily_hits__isnull=False)
+        else:
+            # Filtering before annotating restricts the sum to the same rows
+            queries = cls.objects.filter(daily_hits__date__gte=date_since)
+
+        return (queries.annotate(_hits=models.Sum('daily_hits__hits'))
                 .distinct().order_by('-_hits'))
 
 
@@ -58,6 +65,23 @@ class QueryDailyHits(models.Model):
     date = models.DateField()
     hits = models.IntegerField(default=0)
 
+    @classmethod
+    def add_hits(cls, query_id, date, count):
+        """
+        Adds to the hits of a query on the given date, with a single UPDATE unless
+        it is the query's first hit of the day
+        """
+        hits = models.F('hits') + count
+        if cls.objects.filter(query_id=query_id, date=date).update(hits=hits):
+            return
+
+        try:
+            with transaction.atomic():
+                cls.objects.create(query_id=query_id, date=date, hits=count)
+        except IntegrityError:
+            # Another process recorded the first hit at the same time
+            cls.objects.filter(query_id=query_id, date=date).update(hits=hits)
+
     @classmethod
     def garbage_collect(cls, days=None):
         """
@@ -72,4 +96,27 @@ class QueryDailyHits(models.Model):
         unique_together = (
             ('query', 'date'),
         )
+        indexes = [
+            # For get_most_popular(date_since) and garbage_collect()
+            models.Index(fields=['date', 'query', 'hits']),
+        ]
         verbose_name = _('Query Daily Hits')
+
+
+class IndexWatermark(models.Model):
+    """
+    Records when the last successful run of update_index for a search backend
+    started, so that update_index --incremental only has to update the objects
+    that have changed since
+    """
+    backend_name = models.CharField(max_length=255, unique=True)
+    indexed_at = models.DateTimeField()
+
+    @classmethod
+    def get(cls, backend_name):
+        watermark = cls.objects.filter(backend_name=backend_name).first()
+        return watermark.indexed_at if watermark else None
+
+    @classmethod
+    def set(cls, backend_name, indexed_at):
+        cls.objects.update_or_create(backend_name=backend_name, defaults={'indexed_at': indexed_at})
@@ -0,0 +1,84 @@
+"""
+A buffer of query hits, used by Query.add_hit when WAGTAILSEARCH_BUFFER_QUERY_HITS
+is set.
+
+Rather than updating the QueryDailyHits row of a query for every search, which
+makes searches for popular terms wait on each other's row locks, hits are counted
+in memory. The counts are written with one update (or insert) per query and day
+once WAGTAILSEARCH_QUERY_HITS_FLUSH_SIZE hits have been recorded, or when a hit is
+recorded WAGTAILSEARCH_QUERY_HITS_FLUSH_INTERVAL seconds after the last flush.
+Each process has its own buffer, and hits that haven't been written yet are lost
+when the process exits.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+logger = logging.getLogger('wagtail.search')
+
+
+def is_enabled():
+    return getattr(settings, 'WAGTAILSEARCH_BUFFER_QUERY_HITS', False)
+
+
+def get_flush_size():
+    return getattr(settings, 'WAGTAILSEARCH_QUERY_HITS_FLUSH_SIZE', 100)
+
+
+def get_flush_interval():
+    return getattr(settings, 'WAGTAILSEARCH_QUERY_HITS_FLUSH_INTERVAL', 60)
+
+
+class QueryHitBuffer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+
+        # {(query_id, date): hits}
+        self.hits = Counter()
+        self.count = 0
+
+    def add(self, query_id, date):
+        with self.lock:
+            self.hits[(query_id, date)] += 1
+            self.count += 1
+
+            flush = (
+                self.count >= get_flush_size() or
+                time.monotonic() - self.last_flush >= get_flush_interval()
+            )
+
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered hits to the database
+        """
+        from wagtail.search.models import QueryDailyHits
+
+        with self.lock:
+            hits = self.hits
+            self.hits = Counter()
+            self.count = 0
+            self.last_flush = time.monotonic()
+
+        for (query_id, date), count in hits.items():
+            try:
+                QueryDailyHits.add_hits(query_id, date, count)
+            except Exception:  # noqa
+                logger.exception("Exception raised while recording %d hits for query %d", count, query_id)
+
+
+hit_buffer = QueryHitBuffer()
+
+
+def add(query_id, date):
+    hit_buffer.add(query_id, date)
+
+
+def flush():
+    hit_buffer.flush()
@@ -1,13 +1,14 @@
 from django.db.models.signals import post_delete, post_save
 
-from wagtail.search import index
+from wagtail.search import index, index_queue
 
 
 def post_save_signal_handler(instance, update_fields=None, **kwargs):
-    if update_fields is not None:
+    if update_fields is not None and not index_queue.is_enabled():
         # fetch a fresh copy of instance from the database to ensure
         # that we're not indexing any of the unsaved data contained in
-        # the fields that were not passed in update_fields
+        # the fields that were not passed in update_fields. (Queued updates
+        # are always fetched from the database)
         instance = type(instance).objects.get(pk=instance.pk)
 
     index.insert_or_update_object(instance)
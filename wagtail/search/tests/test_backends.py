@@ -9,7 +9,9 @@ from django.core import management
 from django.test import TestCase
 from django.test.utils import override_settings
 
+from wagtail.core.models import Page
 from wagtail.tests.search import models
+from wagtail.tests.testapp.models import SimplePage
 from wagtail.tests.utils import WagtailTestUtils
 from wagtail.search.backends import (
     InvalidSearchBackendError, get_search_backend, get_search_backends)
@@ -401,6 +403,20 @@ class BackendTests(WagtailTestUtils):
             results_across_pages.add(results[i:i + 1][0])
         self.assertSetEqual(results_across_pages, same_rank_objects)
 
+    def test_specific(self):
+        root_page = Page.objects.get(id=2)
+        page = root_page.add_child(instance=SimplePage(title="Specific test", slug="specific-test", content="hello"))
+
+        index = self.backend.get_index_for_model(SimplePage)
+        if index:
+            index.add_item(page)
+            index.refresh()
+
+        results = self.backend.search("Specific", Page.objects.filter(id=page.id)).specific()
+
+        self.assertEqual(list(results), [page])
+        self.assertIsInstance(results[0], SimplePage)
+
     def test_delete(self):
         foundation = models.Novel.objects.filter(title="Foundation").first()
 
@@ -741,3 +757,21 @@ class TestBackendLoader(TestCase):
         backends = list(get_search_backends())
 
         self.assertEqual(len(backends), 1)
+
+    def test_backend_is_reused(self):
+        backend = get_search_backend(backend='default')
+
+        self.assertIs(get_search_backend(backend='default'), backend)
+        self.assertIs(list(get_search_backends())[0], backend)
+
+    def test_backend_with_arguments_is_not_reused(self):
+        backend = get_search_backend(backend='default')
+
+        self.assertIsNot(get_search_backend(backend='default', AUTO_UPDATE=False), backend)
+        self.assertIsNot(get_search_backend(backend='wagtail.search.backends.db'), backend)
+
+    def test_backend_is_recreated_when_settings_change(self):
+        backend = get_search_backend(backend='default')
+
+        with self.settings(WAGTAILSEARCH_BACKENDS={'default': {'BACKEND': 'wagtail.search.backends.db'}}):
+            self.assertIsNot(get_search_backend(backend='default'), backend)
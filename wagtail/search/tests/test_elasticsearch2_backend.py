@@ -5,11 +5,13 @@ import json
 import mock
 from django.db.models import Q
 from django.test import TestCase
+from elasticsearch import TransportError
+from elasticsearch.helpers import BulkIndexError
 from elasticsearch.serializer import JSONSerializer
 
 from wagtail.tests.search import models
 from wagtail.search.backends.elasticsearch2 import (
-    Elasticsearch2SearchBackend, get_model_root)
+    Elasticsearch2SearchBackend, ElasticsearchAtomicIndexRebuilder, ElasticsearchBulkIndexer, get_model_root)
 from wagtail.search.query import MATCH_ALL
 
 from .elasticsearch_common_tests import ElasticsearchCommonSearchBackendTests
@@ -492,6 +494,140 @@ class TestElasticsearch2SearchResults(TestCase):
         self.assertEqual(results[1], models.Book.objects.get(id=2))
         self.assertEqual(results[2], models.Book.objects.get(id=1))
 
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_large_slice_doesnt_scroll(self, search):
+        search.return_value = self.construct_search_response([])
+        results = self.get_results()[100:300]
+
+        list(results)  # Performs search
+
+        search.assert_called_once_with(
+            from_=100,
+            body={'query': 'QUERY'},
+            _source=False,
+            fields='pk',
+            index='wagtail__searchtests_book',
+            size=200
+        )
+
+    @mock.patch('elasticsearch.Elasticsearch.scroll')
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_slice_past_max_result_window_scrolls(self, search, scroll):
+        search.return_value = self.construct_search_response([])
+        results = self.get_results()[9990:10010]
+
+        list(results)  # Performs search
+
+        search.assert_called_once_with(
+            body={'query': 'QUERY'},
+            _source=False,
+            fields='pk',
+            index='wagtail__searchtests_book',
+            scroll='2m',
+            size=100
+        )
+
+    def test_cursor_not_supported(self):
+        # search_after requires Elasticsearch 5
+        with self.assertRaises(NotImplementedError):
+            self.get_results().after()
+
+
+class TestElasticsearch2SearchResultsHydration(TestCase):
+    fixtures = ['search']
+
+    def get_results(self, queryset=None):
+        backend = Elasticsearch2SearchBackend({})
+        query_compiler = mock.MagicMock()
+        query_compiler.queryset = queryset if queryset is not None else models.Book.objects.all()
+        query_compiler.get_query.return_value = 'QUERY'
+        query_compiler.get_sort.return_value = None
+        return backend.results_class(backend, query_compiler)
+
+    def construct_search_response(self, results):
+        # results is a list of (pk, content types, source) tuples
+        return {
+            'hits': {
+                'hits': [
+                    {
+                        '_id': 'searchtests_book:' + str(pk),
+                        '_index': 'wagtail',
+                        '_score': 1,
+                        '_type': 'searchtests_book',
+                        '_source': dict(source, content_type=content_types),
+                        'fields': {
+                            'pk': [str(pk)],
+                        }
+                    }
+                    for pk, content_types, source in results
+                ],
+                'max_score': 1,
+                'total': len(results)
+            },
+        }
+
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_specific(self, search):
+        book = models.Book.objects.create(title="Test", publication_date=datetime.date(2017, 10, 18), number_of_pages=100)
+        search.return_value = self.construct_search_response([
+            (1, ['searchtests.Novel', 'searchtests.Book'], {}),
+            (book.id, ['searchtests.Book'], {}),
+            (11, ['searchtests.ProgrammingGuide', 'searchtests.Book'], {}),
+            (2, ['searchtests.Novel', 'searchtests.Book'], {}),
+        ])
+
+        results = self.get_results()[:10].specific(prefetch_related=['characters'])
+
+        # One query for each class, plus one for the novels' characters
+        with self.assertNumQueries(4):
+            results = list(results)
+
+        self.assertEqual(
+            [(type(result), result.id) for result in results],
+            [(models.Novel, 1), (models.Book, book.id), (models.ProgrammingGuide, 11), (models.Novel, 2)]
+        )
+        self.assertEqual(search.call_args[1]['_source'], ['content_type'])
+
+        with self.assertNumQueries(0):
+            self.assertTrue(results[0].characters.all())
+
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_specific_checks_queryset(self, search):
+        search.return_value = self.construct_search_response([
+            (1, ['searchtests.Novel', 'searchtests.Book'], {}),
+            (2, ['searchtests.Novel', 'searchtests.Book'], {}),
+        ])
+
+        results = self.get_results(models.Book.objects.exclude(id=2))[:10].specific()
+
+        self.assertEqual([result.id for result in results], [1])
+
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_lite(self, search):
+        search.return_value = self.construct_search_response([
+            (1, ['searchtests.Novel', 'searchtests.Book'], {
+                'title': "The Fellowship of the Ring",
+                'title_filter': "The Fellowship of the Ring",
+                'number_of_pages_filter': 423,
+                'searchtests_novel__setting': "Middle Earth",
+            }),
+        ])
+
+        with self.assertNumQueries(0):
+            results = list(self.get_results()[:10].lite().annotate_score('_score'))
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].model, models.Novel)
+        self.assertEqual(results[0].pk, 1)
+        self.assertEqual(results[0].title, "The Fellowship of the Ring")
+        self.assertEqual(results[0].number_of_pages, 423)
+        self.assertEqual(results[0].setting, "Middle Earth")
+        self.assertEqual(results[0]._score, 1)
+        self.assertEqual(results[0].get_object(), models.Novel.objects.get(id=1))
+
+        self.assertEqual(search.call_args[1]['_source'], True)
+        self.assertEqual(search.call_args[1]['_source_exclude'], '_partials')
+
 
 class TestElasticsearch2Mapping(TestCase):
     fixtures = ['search']
@@ -782,3 +918,161 @@ class TestGetModelRoot(TestCase):
         from wagtail.tests.testapp.models import MTIChildPage
 
         self.assertEqual(get_model_root(MTIChildPage), Page)
+
+
+def bulk_response(*statuses):
+    return {
+        'errors': any(status >= 300 for status in statuses),
+        'items': [
+            {'index': {'status': status}} if status < 300 else {'index': {'status': status, 'error': 'Error'}}
+            for status in statuses
+        ]
+    }
+
+
+@mock.patch.object(ElasticsearchBulkIndexer, 'sleep')
+@mock.patch('elasticsearch.Elasticsearch.bulk')
+class TestElasticsearchBulkIndexer(TestCase):
+    def get_bulk_indexer(self, **kwargs):
+        return ElasticsearchBulkIndexer(Elasticsearch2SearchBackend({}).es, **kwargs)
+
+    def get_actions(self, count, title='Hello'):
+        return [{'_index': 'wagtail', '_type': 'book', '_id': i, 'title': title} for i in range(count)]
+
+    def test_chunk_size(self, bulk, sleep):
+        bulk.side_effect = [bulk_response(*[201] * 2), bulk_response(*[201] * 2), bulk_response(201)]
+
+        errors = self.get_bulk_indexer(chunk_size=2).run(self.get_actions(5))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(bulk.call_count, 3)
+
+        # Each action is an action line followed by a document line
+        self.assertEqual(len(bulk.call_args_list[0][0][0].splitlines()), 4)
+        self.assertEqual(len(bulk.call_args_list[2][0][0].splitlines()), 2)
+
+    def test_max_chunk_bytes(self, bulk, sleep):
+        bulk.side_effect = lambda body: bulk_response(*[201] * (len(body.splitlines()) // 2))
+
+        errors = self.get_bulk_indexer(max_chunk_bytes=2000).run(self.get_actions(6, title='x' * 600))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(bulk.call_count, 3)
+        for call in bulk.call_args_list:
+            self.assertLessEqual(len(call[0][0].encode('utf-8')), 2000)
+
+    def test_action_larger_than_max_chunk_bytes(self, bulk, sleep):
+        bulk.return_value = bulk_response(201)
+
+        errors = self.get_bulk_indexer(max_chunk_bytes=100).run(self.get_actions(1, title='x' * 600))
+
+        # The action is sent by itself
+        self.assertEqual(errors, [])
+        self.assertEqual(bulk.call_count, 1)
+
+    def test_retries_rejected_actions(self, bulk, sleep):
+        bulk.side_effect = [bulk_response(201, 429, 201), bulk_response(201)]
+
+        errors = self.get_bulk_indexer().run(self.get_actions(3))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(bulk.call_count, 2)
+        sleep.assert_called_once_with(1)
+
+        # Only the rejected action is sent again
+        self.assertEqual(json.loads(bulk.call_args[0][0].splitlines()[0]), {'index': {'_index': 'wagtail', '_type': 'book', '_id': 1}})
+
+    def test_retries_rejected_request(self, bulk, sleep):
+        bulk.side_effect = [TransportError(429, 'es_rejected_execution_exception'), bulk_response(201)]
+
+        errors = self.get_bulk_indexer().run(self.get_actions(1))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(bulk.call_count, 2)
+
+    def test_gives_up_after_max_retries(self, bulk, sleep):
+        bulk.return_value = bulk_response(429)
+
+        errors = self.get_bulk_indexer(max_retries=2).run(self.get_actions(1))
+
+        self.assertEqual(errors, [{'index': {'status': 429, 'error': 'Error'}}])
+        self.assertEqual(bulk.call_count, 3)
+        self.assertEqual([call[0][0] for call in sleep.call_args_list], [1, 2])
+
+    def test_doesnt_retry_other_errors(self, bulk, sleep):
+        bulk.return_value = bulk_response(201, 400)
+
+        errors = self.get_bulk_indexer().run(self.get_actions(2))
+
+        self.assertEqual(errors, [{'index': {'status': 400, 'error': 'Error'}}])
+        self.assertEqual(bulk.call_count, 1)
+
+    def test_thread_count(self, bulk, sleep):
+        bulk.side_effect = lambda body: bulk_response(*[201] * (len(body.splitlines()) // 2 - 1), 400)
+
+        errors = self.get_bulk_indexer(chunk_size=10, thread_count=4).run(self.get_actions(100))
+
+        # The errors from every chunk are returned
+        self.assertEqual(bulk.call_count, 10)
+        self.assertEqual(len(errors), 10)
+
+    def test_add_items_raises_errors(self, bulk, sleep):
+        bulk.return_value = bulk_response(400)
+        backend = Elasticsearch2SearchBackend({})
+
+        with self.assertRaises(BulkIndexError):
+            backend.get_index_for_model(models.Book).add_items(models.Book, [models.Book(id=1, title="Hello")])
+
+    def test_backend_settings(self, bulk, sleep):
+        backend = Elasticsearch2SearchBackend({
+            'BULK_CHUNK_SIZE': 100,
+            'BULK_MAX_CHUNK_BYTES': 1000,
+            'BULK_THREAD_COUNT': 4,
+            'BULK_MAX_RETRIES': 5,
+        })
+        bulk_indexer = backend.get_bulk_indexer()
+
+        self.assertEqual(bulk_indexer.chunk_size, 100)
+        self.assertEqual(bulk_indexer.max_chunk_bytes, 1000)
+        self.assertEqual(bulk_indexer.thread_count, 4)
+        self.assertEqual(bulk_indexer.max_retries, 5)
+
+
+class TestElasticsearchBulkIndexerBackoff(TestCase):
+    @mock.patch('time.sleep')
+    def test_backoff_doubles_up_to_max(self, time_sleep):
+        bulk_indexer = ElasticsearchBulkIndexer(Elasticsearch2SearchBackend({}).es)
+
+        for attempt in range(1, 7):
+            bulk_indexer.sleep(attempt)
+
+        self.assertEqual([call[0][0] for call in time_sleep.call_args_list], [2, 4, 8, 16, 32, 60])
+
+
+class TestElasticsearchAtomicIndexRebuilder(TestCase):
+    @mock.patch('elasticsearch.client.IndicesClient.exists_alias', return_value=False)
+    @mock.patch('elasticsearch.client.IndicesClient.put_alias')
+    @mock.patch('elasticsearch.client.IndicesClient.delete')
+    @mock.patch('elasticsearch.client.IndicesClient.refresh')
+    @mock.patch('elasticsearch.client.IndicesClient.put_settings')
+    @mock.patch('elasticsearch.client.IndicesClient.get_settings')
+    @mock.patch('elasticsearch.client.IndicesClient.create')
+    def test_disables_refresh_and_replicas_while_rebuilding(self, create, get_settings, put_settings, *mocks):
+        backend = Elasticsearch2SearchBackend({'ATOMIC_REBUILD': True})
+        rebuilder = backend.get_rebuilder()
+        self.assertIsInstance(rebuilder, ElasticsearchAtomicIndexRebuilder)
+        get_settings.return_value = {
+            rebuilder.index.name: {'settings': {'index': {'number_of_replicas': '2', 'number_of_shards': '5'}}}
+        }
+
+        index = rebuilder.start()
+
+        put_settings.assert_called_once_with(
+            index=index.name, body={'index': {'refresh_interval': '-1', 'number_of_replicas': 0}}
+        )
+
+        rebuilder.finish()
+
+        put_settings.assert_called_with(
+            index=index.name, body={'index': {'refresh_interval': '1s', 'number_of_replicas': '2'}}
+        )
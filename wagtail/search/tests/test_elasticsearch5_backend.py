@@ -491,6 +491,96 @@ class TestElasticsearch5SearchResults(TestCase):
         self.assertEqual(results[1], models.Book.objects.get(id=2))
         self.assertEqual(results[2], models.Book.objects.get(id=1))
 
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_large_slice_doesnt_scroll(self, search):
+        search.return_value = self.construct_search_response([])
+        results = self.get_results()[:200]
+
+        list(results)  # Performs search
+
+        search.assert_called_once_with(
+            from_=0,
+            body={'query': 'QUERY'},
+            _source=False,
+            stored_fields='pk',
+            index='wagtail__searchtests_book',
+            size=200
+        )
+
+    def construct_cursor_search_response(self, results):
+        response = self.construct_search_response(results)
+        for hit in response['hits']['hits']:
+            hit['sort'] = [1.0, hit['fields']['pk'][0]]
+        return response
+
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_cursor_first_page(self, search):
+        search.return_value = self.construct_cursor_search_response([1, 2])
+        results = self.get_results().after()[:2]
+
+        self.assertEqual(list(results), [models.Book.objects.get(id=1), models.Book.objects.get(id=2)])
+        search.assert_called_once_with(
+            body={'query': 'QUERY', 'sort': ['_score', 'pk']},
+            _source=False,
+            stored_fields='pk',
+            index='wagtail__searchtests_book',
+            size=2
+        )
+
+        # The cursor points after the last hit
+        search.return_value = self.construct_cursor_search_response([3])
+        next_results = self.get_results().after(results.next_cursor)[:2]
+
+        self.assertEqual(list(next_results), [models.Book.objects.get(id=3)])
+        search.assert_called_with(
+            body={'query': 'QUERY', 'sort': ['_score', 'pk'], 'search_after': [1.0, '2']},
+            _source=False,
+            stored_fields='pk',
+            index='wagtail__searchtests_book',
+            size=2
+        )
+
+        # There are no more pages
+        self.assertIsNone(next_results.next_cursor)
+
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_cursor_with_ordering(self, search):
+        search.return_value = self.construct_cursor_search_response([])
+        results = self.get_results()
+        results.query_compiler.get_sort.return_value = [{'publication_date_filter': 'desc'}]
+
+        list(results.after()[:10])
+
+        search.assert_called_once_with(
+            body={'query': 'QUERY', 'sort': [{'publication_date_filter': 'desc'}, 'pk']},
+            _source=False,
+            stored_fields='pk',
+            index='wagtail__searchtests_book',
+            size=10
+        )
+
+    @mock.patch('elasticsearch.Elasticsearch.search')
+    def test_cursor_iterate_all_results(self, search):
+        search.side_effect = [
+            self.construct_cursor_search_response(range(1, 101)),
+            self.construct_cursor_search_response([101]),
+        ]
+
+        results = self.get_results().after()
+        list(results)  # Performs search
+
+        # The results are fetched with search_after rather than the scroll API
+        self.assertEqual(search.call_count, 2)
+        self.assertEqual(search.call_args[1]['body']['search_after'], [1.0, '100'])
+        self.assertNotIn('scroll', search.call_args[1])
+        self.assertIsNone(results.next_cursor)
+
+    def test_invalid_cursor(self):
+        results = self.get_results().after('not a cursor')[:10]
+
+        with self.assertRaises(ValueError):
+            list(results)
+
 
 class TestElasticsearch5Mapping(TestCase):
     fixtures = ['search']
@@ -1,13 +1,14 @@
 from datetime import date
 
 import mock
+from django.db import connection, transaction
 from django.test import TestCase, override_settings
 
 from wagtail.tests.search import models
 from wagtail.tests.testapp.models import SimplePage
 from wagtail.tests.utils import WagtailTestUtils
 from wagtail.core.models import Page
-from wagtail.search import index
+from wagtail.search import index, index_queue
 
 
 class TestGetIndexedInstance(TestCase):
@@ -173,3 +174,113 @@ class TestSignalHandlers(TestCase, WagtailTestUtils):
         indexed_object = backend().add.call_args[0][0]
         self.assertEqual(indexed_object.title, "Updated test")
         self.assertEqual(indexed_object.publication_date, date(2017, 10, 18))
+
+
+@mock.patch('wagtail.search.tests.DummySearchBackend', create=True)
+@override_settings(WAGTAILSEARCH_BACKENDS={
+    'default': {
+        'BACKEND': 'wagtail.search.tests.DummySearchBackend'
+    }
+}, WAGTAILSEARCH_QUEUE_INDEX_UPDATES=True)
+class TestIndexQueue(TestCase, WagtailTestUtils):
+    def run_commit_hooks(self):
+        # TestCase never commits its transaction, so run the on_commit callbacks ourselves
+        callbacks, connection.run_on_commit = connection.run_on_commit, []
+        for sids, func in callbacks:
+            func()
+
+    def create_book(self, title="Test"):
+        return models.Book.objects.create(title=title, publication_date=date(2017, 10, 18), number_of_pages=100)
+
+    def test_updates_are_sent_on_commit(self, backend):
+        obj = self.create_book()
+        obj.title = "Updated test"
+        obj.save()
+        obj.save()
+
+        self.assertFalse(backend().add_bulk.mock_calls)
+
+        self.run_commit_hooks()
+
+        # The object is only indexed once, using its saved data
+        backend().add_bulk.assert_called_once_with(models.Book, [obj])
+        self.assertEqual(backend().add_bulk.call_args[0][1][0].title, "Updated test")
+        self.assertFalse(backend().add.mock_calls)
+        self.assertFalse(backend().delete_bulk.mock_calls)
+
+    def test_deleted_objects(self, backend):
+        obj = self.create_book()
+        obj_id = obj.id
+        obj.delete()
+
+        self.run_commit_hooks()
+
+        self.assertFalse(backend().add_bulk.mock_calls)
+        backend().delete_bulk.assert_called_once()
+        model, deleted_objects = backend().delete_bulk.call_args[0]
+        self.assertEqual(model, models.Book)
+        self.assertEqual([deleted_obj.id for deleted_obj in deleted_objects], [obj_id])
+
+    def test_objects_not_in_indexed_objects_are_deleted(self, backend):
+        novel = models.Novel.objects.create(
+            title="Don't index me!",
+            publication_date=date(2017, 10, 18),
+            number_of_pages=100
+        )
+
+        self.run_commit_hooks()
+
+        self.assertFalse(backend().add_bulk.mock_calls)
+        backend().delete_bulk.assert_called_once_with(models.Novel, [novel])
+
+    def test_rolled_back_updates_are_discarded(self, backend):
+        try:
+            with transaction.atomic():
+                self.create_book("Rolled back")
+                raise ValueError
+        except ValueError:
+            pass
+
+        obj = self.create_book()
+        self.run_commit_hooks()
+
+        backend().add_bulk.assert_called_once_with(models.Book, [obj])
+
+    @override_settings(WAGTAILSEARCH_INDEX_UPDATE_BATCH_SIZE=2)
+    def test_batch_size(self, backend):
+        for i in range(5):
+            self.create_book("Test %d" % i)
+
+        # One query for each chunk, plus the prefetches for its authors and tags
+        with self.assertNumQueries(9):
+            self.run_commit_hooks()
+
+        self.assertEqual(
+            [len(call[0][1]) for call in backend().add_bulk.call_args_list],
+            [2, 2, 1]
+        )
+
+    def test_catches_index_error(self, backend):
+        self.create_book()
+        backend().add_bulk.side_effect = ValueError("Test")
+
+        with self.assertLogs('wagtail.search.index', level='ERROR') as cm:
+            self.run_commit_hooks()
+
+        self.assertEqual(len(cm.output), 1)
+        self.assertIn("Exception raised while adding 1 Book objects into the 'default' search backend", cm.output[0])
+
+    @override_settings(WAGTAILSEARCH_BACKGROUND_INDEX_UPDATES=True)
+    def test_background_updates(self, backend):
+        obj = self.create_book()
+
+        with mock.patch.object(index_queue, '_get_executor') as get_executor:
+            self.run_commit_hooks()
+
+        get_executor().submit.assert_called_once()
+        self.assertFalse(backend().add_bulk.mock_calls)
+
+        # Run the batch as the background thread would, without closing the test's connection
+        batch = get_executor().submit.call_args[0][0].__self__
+        batch.run()
+        backend().add_bulk.assert_called_once_with(models.Book, [obj])
@@ -0,0 +1,238 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+
+import mock
+from django.core import management
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from wagtail.core.models import Page
+from wagtail.search.index import get_indexed_models
+from wagtail.search.models import IndexWatermark
+from wagtail.tests.search import models
+from wagtail.tests.testapp.models import SimplePage
+
+
+@mock.patch('wagtail.search.tests.DummySearchBackend', create=True)
+@override_settings(WAGTAILSEARCH_BACKENDS={
+    'default': {
+        'BACKEND': 'wagtail.search.tests.DummySearchBackend'
+    }
+})
+class TestUpdateIndex(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.checkpoint_path = os.path.join(self.temp_dir, 'checkpoint.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_books(self):
+        # Created here, as the search backend isn't mocked in setUp
+        for i in range(5):
+            models.Book.objects.create(title="Book %d" % i, publication_date=date(2017, 10, 18), number_of_pages=100)
+
+        return list(models.Book.get_indexed_objects().order_by('pk').values_list('pk', flat=True))
+
+    def get_index(self, backend):
+        # Put every model in the same index
+        index = mock.MagicMock()
+        index.name = 'test_index'
+        backend().get_index_for_model.return_value = index
+        backend().rebuilder_class.return_value.start.return_value = index
+        return index
+
+    def run_command(self, **options):
+        output = StringIO()
+        management.call_command('update_index', backend_name='default', stdout=output, **options)
+        output.seek(0)
+        return output.read()
+
+    def get_indexed_books(self, index):
+        return [
+            [book.pk for book in call[0][1]]
+            for call in index.add_items.call_args_list
+            if call[0][0] is models.Book
+        ]
+
+    def test_update_index(self, backend):
+        book_pks = self.create_books()
+        index = self.get_index(backend)
+
+        output = self.run_command(chunk_size=2)
+        self.assertEqual(
+            self.get_indexed_books(index),
+            [book_pks[i:i + 2] for i in range(0, len(book_pks), 2)]
+        )
+        backend().rebuilder_class.return_value.finish.assert_called_once_with()
+        self.assertIn("default: searchtests.Book 2/%d objects" % len(book_pks), output)
+
+    def test_resume_from_checkpoint(self, backend):
+        book_pks = self.create_books()
+        index = self.get_index(backend)
+
+        # Fail after the first chunk of books
+        def add_items(model, items):
+            if model is models.Book and items[0].pk != book_pks[0]:
+                raise IOError("Interrupted")
+        index.add_items.side_effect = add_items
+
+        with self.assertRaises(IOError):
+            self.run_command(chunk_size=2, checkpoint=self.checkpoint_path)
+
+        with open(self.checkpoint_path) as f:
+            checkpoint = json.load(f)
+        self.assertEqual(checkpoint['default']['test_index']['last_pk'], {'searchtests.Book': str(book_pks[1])})
+
+        backend().reset_mock()
+        index.add_items.side_effect = None
+
+        output = self.run_command(chunk_size=2, checkpoint=self.checkpoint_path)
+
+        self.assertIn("Resuming rebuild of index test_index", output)
+        self.assertFalse(backend().rebuilder_class.return_value.start.called)
+
+        # Only the remaining books are indexed, along with the models after Book
+        self.assertEqual(sum(self.get_indexed_books(index), []), book_pks[2:])
+        indexed_models = {call[0][0] for call in index.add_items.call_args_list}
+        all_models = get_indexed_models()
+        self.assertFalse(indexed_models & set(all_models[:all_models.index(models.Book)]))
+
+        # The checkpoint is removed once the rebuild is finished
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_checkpoint_with_atomic_rebuild(self, backend):
+        self.get_index(backend)
+        backend().atomic_rebuilder_class = backend().rebuilder_class
+
+        with self.assertRaises(CommandError):
+            self.run_command(checkpoint=self.checkpoint_path)
+
+    def test_prepare_chunk(self, backend):
+        from wagtail.search.management.commands.update_index import prepare_chunk
+
+        book_pks = self.create_books()
+        index = self.get_index(backend)
+        index.prepare_items.side_effect = lambda model, objects: [obj.pk for obj in objects]
+
+        documents, count = prepare_chunk('default', 'searchtests.Book', book_pks[1], book_pks[3])
+
+        self.assertEqual(documents, book_pks[1:4])
+        self.assertEqual(count, 3)
+
+    def test_workers(self, backend):
+        book_pks = self.create_books()
+        index = self.get_index(backend)
+        index.prepare_items.side_effect = lambda model, objects: [obj.pk for obj in objects]
+
+        class SynchronousPool:
+            def __init__(self, processes):
+                pass
+
+            def apply_async(self, func, args):
+                result = mock.Mock()
+                result.get.return_value = func(*args)
+                return result
+
+            def close(self):
+                pass
+
+            def join(self):
+                pass
+
+        with mock.patch('wagtail.search.management.commands.update_index.multiprocessing.Pool', SynchronousPool), \
+                mock.patch('wagtail.search.management.commands.update_index.connections'):
+            self.run_command(chunk_size=2, workers=2)
+
+        # The documents prepared by the workers are added to the index
+        self.assertEqual(
+            [call[0][1] for call in index.add_prepared_items.call_args_list if call[0][0] is models.Book],
+            [book_pks[i:i + 2] for i in range(0, len(book_pks), 2)]
+        )
+        self.assertEqual(self.get_indexed_books(index), [])
+
+    def test_full_rebuild_records_watermark(self, backend):
+        self.get_index(backend)
+        before = timezone.now()
+
+        self.run_command()
+
+        # The watermark is a minute before the start of the run, to allow for objects committed after it started
+        self.assertGreaterEqual(IndexWatermark.get('default'), before - timedelta(seconds=60))
+        self.assertLess(IndexWatermark.get('default'), before)
+
+    @override_settings(WAGTAILSEARCH_INCREMENTAL_UPDATE_MARGIN=0)
+    def test_watermark_margin_setting(self, backend):
+        self.get_index(backend)
+        before = timezone.now()
+
+        self.run_command()
+
+        self.assertGreaterEqual(IndexWatermark.get('default'), before)
+
+    def test_incremental(self, backend):
+        self.create_books()
+        root_page = Page.objects.get(id=2)
+        old_page = root_page.add_child(instance=SimplePage(title="Old", slug="old", content="hello"))
+        old_page.save_revision().publish()
+        new_page = root_page.add_child(instance=SimplePage(title="New", slug="new", content="hello"))
+
+        IndexWatermark.set('default', timezone.now())
+        new_page.save_revision().publish()
+
+        index = self.get_index(backend)
+        index.get_item_pks.side_effect = lambda model: [str(old_page.pk), '9999'] if model is SimplePage else []
+
+        output = self.run_command(incremental=True, delete_stale=True)
+
+        self.assertFalse(backend().rebuilder_class.return_value.start.called)
+        index.refresh.assert_called_once_with()
+
+        # Only the page that was published since the last run is indexed. Books have no timestamp fields
+        indexed = [(call[0][0], [obj.pk for obj in call[0][1]]) for call in index.add_items.call_args_list]
+        self.assertEqual(indexed, [(SimplePage, [new_page.pk])])
+        self.assertIn("searchtests.Book has no search_timestamp_fields", output)
+
+        # Documents for objects that don't exist are deleted
+        index.delete_items.assert_called_once()
+        model, deleted_objects = index.delete_items.call_args[0]
+        self.assertEqual(model, SimplePage)
+        self.assertEqual([obj.pk for obj in deleted_objects], [9999])
+
+    def test_incremental_doesnt_delete_stale_items_by_default(self, backend):
+        IndexWatermark.set('default', timezone.now())
+        index = self.get_index(backend)
+
+        self.run_command(incremental=True)
+
+        self.assertFalse(index.get_item_pks.called)
+        self.assertFalse(index.delete_items.called)
+
+    def test_delete_stale_requires_incremental(self, backend):
+        with self.assertRaises(CommandError):
+            self.run_command(delete_stale=True)
+
+    def test_incremental_without_watermark(self, backend):
+        self.get_index(backend)
+
+        output = self.run_command(incremental=True)
+
+        self.assertIn("hasn't been fully indexed yet, rebuilding", output)
+        self.assertTrue(backend().rebuilder_class.return_value.start.called)
+        self.assertIsNotNone(IndexWatermark.get('default'))
+
+    def test_get_indexed_objects_changed_since(self, backend):
+        self.assertIsNone(models.Book.get_indexed_objects_changed_since(timezone.now()))
+
+        since = timezone.now() - timedelta(minutes=1)
+        root_page = Page.objects.get(id=2)
+        page = root_page.add_child(instance=SimplePage(title="Test", slug="test", content="hello"))
+        self.assertFalse(SimplePage.get_indexed_objects_changed_since(since).exists())
+
+        page.save_revision()
+        self.assertEqual(list(SimplePage.get_indexed_objects_changed_since(since)), [page])
@@ -2,11 +2,11 @@ import datetime
 from io import StringIO
 
 from django.core import management
-from django.test import SimpleTestCase, TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 
 from wagtail.contrib.search_promotions.models import SearchPromotion
 from wagtail.tests.utils import WagtailTestUtils
-from wagtail.search import models
+from wagtail.search import models, query_hits
 from wagtail.search.utils import normalise_query_string, separate_filters_from_query
 
 
@@ -30,6 +30,58 @@ class TestHitCounter(TestCase):
         self.assertEqual(models.Query.get("Hello").hits, 10)
 
 
+    def test_add_hits(self):
+        query = models.Query.get("Hello")
+        today = datetime.date.today()
+
+        # The first hit of the day creates the row, later ones update it
+        models.QueryDailyHits.add_hits(query.id, today, 3)
+        with self.assertNumQueries(1):
+            models.QueryDailyHits.add_hits(query.id, today, 2)
+
+        self.assertEqual(models.QueryDailyHits.objects.get(query=query, date=today).hits, 5)
+
+
+@override_settings(WAGTAILSEARCH_BUFFER_QUERY_HITS=True, WAGTAILSEARCH_QUERY_HITS_FLUSH_SIZE=5)
+class TestBufferedHitCounter(TestCase):
+    def setUp(self):
+        self.addCleanup(query_hits.flush)
+
+    def test_hits_are_buffered(self):
+        query = models.Query.get("Hello")
+
+        with self.assertNumQueries(0):
+            for i in range(4):
+                query.add_hit()
+
+        self.assertEqual(query.hits, 0)
+
+        query_hits.flush()
+        self.assertEqual(query.hits, 4)
+
+    def test_flush_size(self):
+        hello = models.Query.get("Hello")
+        world = models.Query.get("World")
+
+        for i in range(3):
+            hello.add_hit()
+        world.add_hit()
+        self.assertEqual(hello.hits, 0)
+
+        # The fifth hit writes the hits of both queries
+        world.add_hit()
+
+        self.assertEqual(hello.hits, 3)
+        self.assertEqual(world.hits, 2)
+
+    @override_settings(WAGTAILSEARCH_QUERY_HITS_FLUSH_INTERVAL=0)
+    def test_flush_interval(self):
+        query = models.Query.get("Hello")
+        query.add_hit()
+
+        self.assertEqual(query.hits, 1)
+
+
 class TestQueryStringNormalisation(TestCase):
     def setUp(self):
         self.query = models.Query.get("Hello World!")
@@ -108,6 +160,28 @@ class TestQueryPopularity(TestCase):
         self.assertEqual(popular_queries[2], models.Query.get("little popular query"))
 
 
+    def test_query_popularity_since_date(self):
+        today = datetime.date.today()
+        last_month = today - datetime.timedelta(days=30)
+
+        for i in range(10):
+            models.Query.get("old query").add_hit(date=last_month)
+        for i in range(3):
+            models.Query.get("new query").add_hit(date=today)
+        models.Query.get("old query").add_hit(date=today)
+
+        self.assertEqual(list(models.Query.get_most_popular()), [
+            models.Query.get("old query"), models.Query.get("new query")
+        ])
+
+        # Only the hits since the date are counted
+        popular_queries = models.Query.get_most_popular(date_since=today - datetime.timedelta(days=7))
+        self.assertEqual(list(popular_queries), [
+            models.Query.get("new query"), models.Query.get("old query")
+        ])
+        self.assertEqual([query._hits for query in popular_queries], [3, 1])
+
+
 class TestGarbageCollectCommand(TestCase):
     def test_garbage_collect_command(self):
         nowdt = datetime.datetime.now()
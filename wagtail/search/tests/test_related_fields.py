@@ -84,3 +84,29 @@ class TestSelectOnQuerySet(TestCase):
         # Tags should be prefetch_related
         self.assertIn('tags', queryset._prefetch_related_lookups)
         self.assertFalse(queryset.query.select_related)
+
+    def test_select_on_queryset_with_nested_reverse_foreign_key(self):
+        fields = index.RelatedFields('categories', [
+            index.RelatedFields('category', [
+                index.SearchField('name')
+            ])
+        ])
+
+        queryset = fields.select_on_queryset(ManyToManyBlogPage.objects.all())
+
+        # The nested ForeignKey is prefetched through the reverse ForeignKey
+        self.assertEqual(queryset._prefetch_related_lookups, ('categories', 'categories__category'))
+        self.assertFalse(queryset.query.select_related)
+
+    def test_select_on_queryset_with_nested_foreign_key(self):
+        fields = index.RelatedFields('protagonist', [
+            index.RelatedFields('novel', [
+                index.SearchField('title'),
+            ]),
+        ])
+
+        queryset = fields.select_on_queryset(Novel.objects.all())
+
+        # A chain of ForeignKeys should be select_related
+        self.assertFalse(queryset._prefetch_related_lookups)
+        self.assertEqual(queryset.query.select_related, {'protagonist': {'novel': {}}})
@@ -40,3 +40,17 @@ def separate_filters_from_query(query_string):
     query_string = re.sub(filters_regexp, '', query_string).strip()
 
     return filters, query_string
+
+
+def pk_from_string(model, value):
+    """
+    Convert a primary key that has been stored as a string (for example, in the
+    search index) back to its Python value
+    """
+    pk_field = model._meta.pk
+
+    # The primary key of a multi-table inheritance child is a link to its parent
+    while pk_field.remote_field is not None:
+        pk_field = pk_field.target_field
+
+    return pk_field.to_python(value)